@@ -0,0 +1,231 @@
+"""Verifica os orcamentos de consultas SQL das rotas (@query_budget em helpers/metrics.py).
+
+Monta duas bibliotecas sinteticas (pequena e grande), cada uma num banco temporario e num
+processo separado, e chama cada rota com orcamento. Falha (exit 1) quando uma rota:
+  - nao tem URL de exemplo em SAMPLE_URLS;
+  - faz mais consultas que o orcamento;
+  - faz mais consultas com mais dados (padrao N+1).
+Tambem confere que o scan nao faz leituras por arquivo (doadores e notas buscados em lote).
+
+Uso:
+    python benchmarks/check_query_budgets.py
+"""
+import os
+import sys
+import json
+import random
+import shutil
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+
+from run_benchmarks import SRC_DIR, build_library, seed_notes_and_sessions, install_ffmpeg_stub, mutate_library
+
+SCALES = {
+    'pequena': {'courses': 2, 'depth': 2, 'breadth': 2, 'files_per_dir': 4, 'notes': 300, 'sessions': 300},
+    'grande': {'courses': 2, 'depth': 2, 'breadth': 2, 'files_per_dir': 16, 'notes': 3000, 'sessions': 3000},
+}
+
+# URL de exemplo por endpoint; {course_id}, {lesson_id} e {date} vem dos dados gerados
+SAMPLE_URLS = {
+    'courses.list_courses': '/api/courses',
+    'courses.get_course': '/api/courses/{course_id}',
+    'courses.course_completion_percentage': '/api/courses/{course_id}/completed_percentage',
+    'courses.course_watch_time': '/api/courses/{course_id}/watch-time',
+    'courses.library_watch_time': '/api/watch-time',
+    'lessons.list_lessons_for_course': '/api/courses/{course_id}/lessons',
+    'lessons.get_lesson_elapsed_time': '/api/lessons/{lesson_id}',
+    'notes.list_notes': '/api/lessons/{lesson_id}/notes',
+    'notes.list_annotated_lessons': '/api/courses/{course_id}/annotated-lessons',
+    'notes.list_notes_by_date': '/api/notes/by-date?date={date}',
+    'notes.export_lesson_notes': '/api/lessons/{lesson_id}/notes/export/md',
+    'notes.export_course_notes': '/api/courses/{course_id}/notes/export/html',
+    'notes.export_daily_notes': '/api/notes/by-date/export/md?date={date}',
+    'notes.export_lesson_notes_pdf': '/api/lessons/{lesson_id}/notes/export-pdf',
+    'notes.export_course_notes_pdf': '/api/courses/{course_id}/notes/export-pdf',
+    'notes.export_daily_notes_pdf': '/api/notes/by-date/export-pdf?date={date}',
+    'focus.list_focus_sessions': '/api/focus/sessions',
+    'focus.focus_session_stats': '/api/focus/sessions/stats',
+    'focus.get_cycle_config': '/api/focus/cycle-config',
+    'focus.get_timer_state': '/api/focus/timer-state',
+    'study_days.study_heatmap': '/api/study-days/heatmap?year={year}',
+    'study_days.study_day_streak': '/api/study-days/streak',
+    'module_links.get_module_links': '/api/courses/{course_id}/module-links',
+    'module_links.get_distinct_module_link_labels': '/api/module-link-labels',
+    'modules.get_module_tree': '/api/courses/{course_id}/modules?lessons=1',
+    'activity.continue_watching': '/api/continue',
+    'activity.recent_activity': '/api/activity',
+}
+# Rotas que dependem de pacotes opcionais
+OPTIONAL_DEPENDENCIES = {
+    'notes.export_lesson_notes_pdf': 'xhtml2pdf',
+    'notes.export_course_notes_pdf': 'xhtml2pdf',
+    'notes.export_daily_notes_pdf': 'xhtml2pdf',
+}
+# Leituras (SELECT) por arquivo novo aceitas no scan; uma consulta por arquivo daria >= 1
+SCAN_MAX_SELECTS_PER_FILE = 0.1
+
+
+def _count_selects(statements):
+    return sum(1 for s in statements if s.lstrip().upper().startswith('SELECT'))
+
+
+def measure(scale_name, workdir):
+    """Roda num processo proprio: gera os dados da escala e retorna as contagens em JSON."""
+    import importlib.util
+    params = SCALES[scale_name]
+    rng = random.Random(42)
+    library_root = os.path.join(workdir, 'biblioteca')
+    course_paths = build_library(library_root, params, rng)
+
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'budget.sqlite').replace('\\', '/')
+    os.environ['LIBRARY_WATCHER'] = '0'
+    sys.path.insert(0, SRC_DIR)
+    os.makedirs(os.path.join(workdir, 'uploads'), exist_ok=True)
+    os.chdir(workdir)
+
+    from app import app, db, Course, Lesson, Note
+    from helpers.metrics import capture_queries, query_budgets
+    install_ffmpeg_stub('inline', 0, os.path.join(workdir, 'bin'))
+    from utils import list_and_register_lessons, scan_progress
+
+    report = {'endpoints': {}, 'scan': {}}
+    with app.app_context():
+        courses = []
+        for path in course_paths:
+            course = Course(name=os.path.basename(path), path=path)
+            db.session.add(course)
+            db.session.commit()
+            courses.append((course.id, path))
+
+        files = 0
+        with capture_queries() as captured:
+            for course_id, path in courses:
+                list_and_register_lessons(path, course_id)
+                files += scan_progress[course_id]['processed']
+        report['scan']['initial'] = {'selects': _count_selects(captured.statements), 'files': files}
+
+        target_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        seed_notes_and_sessions(params, rng, target_date)
+
+        # Mesmo diretorio cadastrado de novo: todas as aulas tem doador (progresso e notas copiados)
+        duplicate = Course(name='Copia', path=course_paths[0])
+        db.session.add(duplicate)
+        db.session.commit()
+        with capture_queries() as captured:
+            list_and_register_lessons(duplicate.path, duplicate.id)
+        report['scan']['donors'] = {'selects': _count_selects(captured.statements),
+                                    'files': scan_progress[duplicate.id]['processed']}
+
+        mutate_library(course_paths[0], rng)
+        with capture_queries() as captured:
+            list_and_register_lessons(course_paths[0], courses[0][0])
+        report['scan']['rescan_changed'] = {'selects': _count_selects(captured.statements),
+                                            'files': scan_progress[courses[0][0]]['processed']}
+
+        lesson_id = db.session.query(Note.lesson_id).join(Lesson, Note.lesson_id == Lesson.id).filter(
+            Lesson.course_id == courses[0][0]
+        ).group_by(Note.lesson_id).order_by(db.func.count(Note.id).desc()).first()[0]
+        budgets = query_budgets(app)
+        db.session.remove()
+
+    values = {'course_id': courses[0][0], 'lesson_id': lesson_id, 'date': target_date.strftime('%Y-%m-%d'),
+              'year': target_date.year}
+    client = app.test_client()
+    for endpoint, budget in sorted(budgets.items()):
+        template = SAMPLE_URLS.get(endpoint)
+        if template is None:
+            report['endpoints'][endpoint] = {'budget': budget, 'error': 'sem URL de exemplo em SAMPLE_URLS'}
+            continue
+        dependency = OPTIONAL_DEPENDENCIES.get(endpoint)
+        if dependency and importlib.util.find_spec(dependency) is None:
+            report['endpoints'][endpoint] = {'budget': budget, 'skipped': f'{dependency} nao instalado'}
+            continue
+        url = template.format(**values)
+        with app.app_context(), capture_queries() as captured:
+            response = client.get(url)
+            response.get_data()
+        report['endpoints'][endpoint] = {'budget': budget, 'url': url, 'status': response.status_code,
+                                         'queries': captured.count, 'statements': captured.statements}
+    return report
+
+
+def _run_scale(scale_name):
+    workdir = tempfile.mkdtemp(prefix='budget-plataforma-')
+    try:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--measure', scale_name, '--workdir', workdir],
+            capture_output=True, text=True, check=True, cwd=SRC_DIR
+        ).stdout
+    except subprocess.CalledProcessError as e:
+        sys.stderr.write(e.stderr)
+        raise SystemExit(f'Falha ao medir a escala {scale_name}.')
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def check(verbose):
+    small, large = _run_scale('pequena'), _run_scale('grande')
+    failures = []
+
+    print(f"{'endpoint':<46} {'orcamento':>9} {'pequena':>8} {'grande':>7}")
+    for endpoint, result in sorted(large['endpoints'].items()):
+        small_result = small['endpoints'].get(endpoint, {})
+        if 'error' in result:
+            failures.append(f"{endpoint}: {result['error']}")
+            continue
+        if 'skipped' in result:
+            print(f"{endpoint:<46} {result['budget']:>9} {'-':>8} {'-':>7}  ({result['skipped']})")
+            continue
+        flag = ''
+        if result['status'] != 200 or small_result.get('status') != 200:
+            failures.append(f"{endpoint}: status {small_result.get('status')}/{result['status']} em {result['url']}")
+            flag = '  FALHA'
+        elif result['queries'] > result['budget'] or small_result['queries'] > result['budget']:
+            failures.append(f"{endpoint}: {result['queries']} consultas, orcamento {result['budget']}")
+            flag = '  FALHA'
+        elif result['queries'] > small_result['queries']:
+            failures.append(f"{endpoint}: consultas crescem com os dados "
+                            f"({small_result['queries']} -> {result['queries']})")
+            flag = '  FALHA'
+        print(f"{endpoint:<46} {result['budget']:>9} {small_result.get('queries', '-'):>8} "
+              f"{result['queries']:>7}{flag}")
+        if flag and verbose:
+            for statement in result['statements']:
+                print('    ' + ' '.join(statement.split())[:200])
+
+    print()
+    for name, scan in large['scan'].items():
+        per_file = scan['selects'] / scan['files'] if scan['files'] else 0
+        flag = ''
+        if per_file > SCAN_MAX_SELECTS_PER_FILE:
+            failures.append(f"scan {name}: {scan['selects']} leituras para {scan['files']} arquivos")
+            flag = '  FALHA'
+        print(f"scan {name:<41} {small['scan'][name]['selects']:>8} leituras / {scan['selects']} leituras "
+              f"({scan['files']} arquivos){flag}")
+
+    if failures:
+        print('\nOrcamentos de consultas violados:', file=sys.stderr)
+        for failure in failures:
+            print(f'  - {failure}', file=sys.stderr)
+        sys.exit(1)
+    print('\nOrcamentos de consultas OK.')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Verifica os orcamentos de consultas SQL das rotas.')
+    parser.add_argument('-v', '--verbose', action='store_true', help='mostra o SQL das rotas que falharem')
+    parser.add_argument('--measure', choices=sorted(SCALES), help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.workdir)))
+        return
+    check(args.verbose)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,412 @@
+"""Benchmarks do backend com bibliotecas sinteticas.
+
+Gera uma biblioteca de cursos falsa (arvore de pastas profunda, milhares de videos minusculos,
+legendas e PDFs), um banco SQLite temporario com anotacoes e sessoes de foco, e mede:
+scan inicial, rescans, listagem de cursos/aulas, anotacoes por data, exportacoes e estatisticas
+de foco. O ffmpeg e substituido por um stub, entao os numeros medem o codigo da aplicacao.
+
+Uso:
+    python benchmarks/run_benchmarks.py run --preset medium -o resultados.json
+    python benchmarks/run_benchmarks.py compare base.json resultados.json --threshold 1.25
+
+O resultado e um JSON com metadados (commit, python, parametros) e, por benchmark, tempos em ms
+(min/mediana/p95) e numero de consultas SQL. 'compare' falha (exit 1) quando a mediana de algum
+benchmark piora mais que o limite.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime, timedelta
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+PRESETS = {
+    # cursos, profundidade e largura da arvore, arquivos por pasta, anotacoes, sessoes de foco
+    'small': {'courses': 2, 'depth': 2, 'breadth': 3, 'files_per_dir': 10, 'notes': 2000, 'sessions': 2000},
+    'medium': {'courses': 5, 'depth': 3, 'breadth': 4, 'files_per_dir': 15, 'notes': 20000, 'sessions': 20000},
+    'large': {'courses': 10, 'depth': 4, 'breadth': 4, 'files_per_dir': 20, 'notes': 100000, 'sessions': 100000},
+}
+
+VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.webm')
+# Fracao dos arquivos de cada curso alterada antes do rescan com mudancas
+RENAME_RATIO = 0.05
+DELETE_RATIO = 0.02
+ADD_RATIO = 0.02
+STUB_DURATION_SECONDS = 450
+NOTE_HTML = ('<p>Anotacao {i} sobre <strong>o conteudo</strong> da aula</p>'
+             '<ul><li><p>item a</p></li><li>item b<br>linha</li></ul>')
+
+
+# -- Biblioteca sintetica --
+
+def _write_fake_file(path, rng):
+    # Conteudo diferente por arquivo para que a identidade (tamanho + hash) nao colida
+    with open(path, 'wb') as f:
+        f.write(rng.randbytes(rng.randint(64, 512)))
+
+
+def _build_tree(directory, depth, params, rng, counter):
+    os.makedirs(directory, exist_ok=True)
+    for i in range(params['files_per_dir']):
+        counter[0] += 1
+        ext = VIDEO_EXTENSIONS[i % len(VIDEO_EXTENSIONS)]
+        name = f"{i + 1:03d} - Aula {counter[0]}{ext}"
+        _write_fake_file(os.path.join(directory, name), rng)
+        if i % 3 == 0:
+            with open(os.path.join(directory, os.path.splitext(name)[0] + '.srt'), 'w', encoding='utf-8') as f:
+                f.write('1\n00:00:01,000 --> 00:00:02,000\nLegenda\n')
+        if i % 5 == 0:
+            _write_fake_file(os.path.join(directory, f"{i + 1:03d} - Material {counter[0]}.pdf"), rng)
+    if depth > 0:
+        for b in range(params['breadth']):
+            _build_tree(os.path.join(directory, f"{b + 1:02d} - Modulo {b + 1}"), depth - 1, params, rng, counter)
+
+
+def build_library(root, params, rng):
+    courses = []
+    for c in range(params['courses']):
+        path = os.path.join(root, f"Curso {c + 1:02d}")
+        counter = [0]
+        _build_tree(path, params['depth'], params, rng, counter)
+        courses.append(path)
+    return courses
+
+
+def _library_files(course_path):
+    files = []
+    for dirpath, _, names in os.walk(course_path):
+        files.extend(os.path.join(dirpath, n) for n in names
+                     if n.lower().endswith(VIDEO_EXTENSIONS + ('.pdf',)))
+    return sorted(files)
+
+
+def mutate_library(course_path, rng):
+    """Renomeia, remove e adiciona uma fracao dos arquivos do curso (simula uma biblioteca viva)."""
+    files = _library_files(course_path)
+    rng.shuffle(files)
+    n_rename = int(len(files) * RENAME_RATIO)
+    n_delete = int(len(files) * DELETE_RATIO)
+    for path in files[:n_rename]:
+        base, ext = os.path.splitext(path)
+        os.rename(path, f"{base} (renomeado){ext}")
+    for path in files[n_rename:n_rename + n_delete]:
+        os.remove(path)
+    directories = sorted({os.path.dirname(p) for p in files})
+    for i in range(int(len(files) * ADD_RATIO)):
+        _write_fake_file(os.path.join(rng.choice(directories), f"999 - Nova aula {i}.mp4"), rng)
+    return {'renamed': n_rename, 'deleted': n_delete, 'added': int(len(files) * ADD_RATIO)}
+
+
+# -- Stub do ffmpeg --
+
+def install_ffmpeg_stub(mode, probe_ms, bin_dir):
+    """inline: troca a sondagem por uma funcao Python (opcionalmente com atraso de probe_ms).
+    process: coloca um executavel 'ffmpeg' falso no PATH, medindo tambem o custo de criar processos."""
+    import utils
+    if mode == 'inline':
+        def fake_probe(video_path):
+            if probe_ms:
+                time.sleep(probe_ms / 1000)
+            return STUB_DURATION_SECONDS
+        utils.get_video_duration_v1 = fake_probe
+        return
+
+    if os.name == 'nt':
+        raise SystemExit('--ffmpeg process requer um sistema POSIX; use --ffmpeg inline.')
+    os.makedirs(bin_dir, exist_ok=True)
+    stub = os.path.join(bin_dir, 'ffmpeg')
+    delay = f"sleep {probe_ms / 1000:.3f}\n" if probe_ms else ''
+    with open(stub, 'w') as f:
+        f.write('#!/bin/sh\n' + delay +
+                'echo "  Duration: 00:07:30.00, start: 0.000000, bitrate: 1 kb/s" >&2\n')
+    os.chmod(stub, 0o755)
+    os.environ['PATH'] = bin_dir + os.pathsep + os.environ.get('PATH', '')
+
+
+# -- Dados do banco --
+
+def seed_notes_and_sessions(params, rng, target_date):
+    from app import db, Lesson, Note, FocusSession
+    from helpers.focus_stats import rebuild_focus_rollup, rebuild_study_days
+
+    lesson_ids = [row.id for row in db.session.query(Lesson.id).filter(Lesson.is_active == 1)]
+    # Um terco das anotacoes cai no dia medido pelos benchmarks de anotacoes por data
+    notes = []
+    for i in range(params['notes']):
+        day = target_date if i % 3 == 0 else target_date - timedelta(days=rng.randint(1, 180))
+        notes.append({
+            'lesson_id': rng.choice(lesson_ids),
+            'timestamp': float(rng.randint(0, STUB_DURATION_SECONDS)),
+            'content': NOTE_HTML.format(i=i),
+            'created_at': day + timedelta(seconds=rng.randint(0, 86399)),
+        })
+    db.session.execute(Note.__table__.insert(), notes)
+
+    subjects = [f"Materia {i}" for i in range(12)]
+    sessions = []
+    for i in range(params['sessions']):
+        started = target_date - timedelta(days=rng.randint(0, 365), minutes=rng.randint(0, 1200))
+        duration = rng.randint(5, 60) * 60
+        sessions.append({
+            'subject_name': rng.choice(subjects),
+            'subject_id': str(i % 12),
+            'started_at': started,
+            'ended_at': started + timedelta(seconds=duration),
+            'duration_seconds': duration,
+            'mode': 'focus' if i % 5 else 'break',
+            'completed': 1,
+            'date': started.strftime('%Y-%m-%d'),
+            'client_key': f"bench-{i}",
+        })
+    db.session.execute(FocusSession.__table__.insert(), sessions)
+    db.session.commit()
+    rebuild_focus_rollup()
+    rebuild_study_days()
+
+
+# -- Medicao --
+
+class QueryCounter:
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+def _summary(timings, queries, **extra):
+    timings_ms = sorted(t * 1000 for t in timings)
+    p95_index = min(len(timings_ms) - 1, int(round(0.95 * (len(timings_ms) - 1))))
+    result = {
+        'runs': len(timings_ms),
+        'min_ms': round(timings_ms[0], 2),
+        'median_ms': round(statistics.median(timings_ms), 2),
+        'p95_ms': round(timings_ms[p95_index], 2),
+        'mean_ms': round(statistics.fmean(timings_ms), 2),
+        'queries': queries,
+    }
+    result.update(extra)
+    return result
+
+
+def time_request(client, counter, url, repeat):
+    timings = []
+    queries = 0
+    status = None
+    for _ in range(repeat):
+        before = counter.count
+        started = time.perf_counter()
+        response = client.get(url)
+        response.get_data()  # consome respostas em streaming
+        timings.append(time.perf_counter() - started)
+        queries = counter.count - before
+        status = response.status_code
+    if status != 200:
+        return {'url': url, 'status': status, 'error': response.get_data(as_text=True)[:200]}
+    return _summary(timings, queries, url=url, status=status)
+
+
+def time_scan(counter, course_ids_and_paths, label):
+    from utils import list_and_register_lessons, scan_progress
+    timings = []
+    queries = 0
+    files = 0
+    probes = 0
+    for course_id, path in course_ids_and_paths:
+        before = counter.count
+        started = time.perf_counter()
+        list_and_register_lessons(path, course_id)
+        timings.append(time.perf_counter() - started)
+        queries += counter.count - before
+        files += scan_progress[course_id]['processed']
+        probes += scan_progress[course_id].get('probes', 0)
+    total = sum(timings)
+    return _summary(timings, queries, label=label, courses=len(timings), files=files, probes=probes,
+                    total_ms=round(total * 1000, 2),
+                    files_per_second=round(files / total, 1) if total else None)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SRC_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    params = dict(PRESETS[args.preset])
+    for key in params:
+        value = getattr(args, key, None)
+        if value is not None:
+            params[key] = value
+    rng = random.Random(args.seed)
+
+    workdir = tempfile.mkdtemp(prefix='bench-plataforma-')
+    try:
+        library_root = os.path.join(workdir, 'biblioteca')
+        started = time.perf_counter()
+        course_paths = build_library(library_root, params, rng)
+        build_seconds = time.perf_counter() - started
+
+        # O app le a configuracao na importacao: banco temporario, sem observador de pastas
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.sqlite').replace('\\', '/')
+        os.environ['LIBRARY_WATCHER'] = '0'
+        os.environ['SLOW_REQUEST_MS'] = '0'
+        sys.path.insert(0, SRC_DIR)
+        os.makedirs(os.path.join(workdir, 'uploads'), exist_ok=True)
+        os.chdir(workdir)  # uploads/ relativo ao diretorio atual
+
+        from app import app, db, Course
+        install_ffmpeg_stub(args.ffmpeg, args.probe_ms, os.path.join(workdir, 'bin'))
+        client = app.test_client()
+        results = {}
+
+        with app.app_context():
+            counter = QueryCounter(db.engine)
+            courses = []
+            for path in course_paths:
+                course = Course(name=os.path.basename(path), path=path)
+                db.session.add(course)
+                db.session.commit()
+                courses.append((course.id, path))
+
+            results['scan_initial'] = time_scan(counter, courses, 'scan inicial')
+            results['rescan_unchanged'] = time_scan(counter, courses, 'rescan sem mudancas')
+            changes = [mutate_library(path, rng) for _, path in courses]
+            results['rescan_changed'] = time_scan(counter, courses, 'rescan com mudancas')
+            results['rescan_changed']['changes'] = {
+                key: sum(c[key] for c in changes) for key in ('renamed', 'deleted', 'added')}
+
+            target_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+            seed_notes_and_sessions(params, rng, target_date)
+            db.session.remove()
+
+        day = target_date.strftime('%Y-%m-%d')
+        biggest_course = courses[0][0]
+        requests = {
+            'list_courses': '/api/courses',
+            'list_lessons_for_course': f'/api/courses/{biggest_course}/lessons',
+            'notes_by_date': f'/api/notes/by-date?date={day}',
+            'notes_by_date_export_md': f'/api/notes/by-date/export/md?date={day}',
+            'notes_by_date_export_html': f'/api/notes/by-date/export/html?date={day}',
+            'notes_by_date_export_pdf': f'/api/notes/by-date/export-pdf?date={day}',
+            'course_notes_export_pdf': f'/api/courses/{biggest_course}/notes/export-pdf',
+            'focus_stats': '/api/focus/sessions/stats',
+            'focus_stats_month': '/api/focus/sessions/stats?granularity=month',
+        }
+        pdf_available = _module_available('xhtml2pdf')
+        for name, url in requests.items():
+            if 'pdf' in name and not pdf_available:
+                results[name] = {'url': url, 'skipped': 'xhtml2pdf nao instalado'}
+                continue
+            # Exportacoes sao pesadas: menos repeticoes
+            repeat = max(1, args.repeat // 4) if 'export' in name else args.repeat
+            results[name] = time_request(client, counter, url, repeat)
+
+        report = {
+            'meta': {
+                'commit': _git_commit(),
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'preset': args.preset,
+                'params': params,
+                'seed': args.seed,
+                'repeat': args.repeat,
+                'ffmpeg': args.ffmpeg,
+                'probe_ms': args.probe_ms,
+                'library_files': sum(len(_library_files(p)) for p in course_paths),
+                'library_build_seconds': round(build_seconds, 2),
+            },
+            'results': results,
+        }
+    finally:
+        os.chdir(SRC_DIR)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+        else:
+            print(f"Arquivos mantidos em {workdir}", file=sys.stderr)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    print(output)
+
+
+def _module_available(name):
+    import importlib.util
+    return importlib.util.find_spec(name) is not None
+
+
+def compare(args):
+    with open(args.base, encoding='utf-8') as f:
+        base = json.load(f)
+    with open(args.new, encoding='utf-8') as f:
+        new = json.load(f)
+
+    if base['meta'].get('params') != new['meta'].get('params'):
+        print('Aviso: parametros diferentes entre as execucoes; compare com o mesmo preset.', file=sys.stderr)
+
+    regressions = []
+    print(f"{'benchmark':<28} {'base ms':>10} {'novo ms':>10} {'razao':>7} {'consultas':>13}")
+    for name, new_result in new['results'].items():
+        old_result = base['results'].get(name)
+        if not old_result or 'median_ms' not in old_result or 'median_ms' not in new_result:
+            continue
+        ratio = new_result['median_ms'] / old_result['median_ms'] if old_result['median_ms'] else float('inf')
+        queries = f"{old_result['queries']} -> {new_result['queries']}"
+        flag = ''
+        if ratio > args.threshold:
+            flag = '  REGRESSAO'
+            regressions.append(name)
+        print(f"{name:<28} {old_result['median_ms']:>10.2f} {new_result['median_ms']:>10.2f} "
+              f"{ratio:>7.2f} {queries:>13}{flag}")
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) acima de {args.threshold:.2f}x: {', '.join(regressions)}",
+              file=sys.stderr)
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks do backend com bibliotecas sinteticas.')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = sub.add_parser('run', help='gera a biblioteca sintetica e mede')
+    run_parser.add_argument('--preset', choices=sorted(PRESETS), default='small')
+    for key in PRESETS['small']:
+        run_parser.add_argument(f"--{key.replace('_', '-')}", dest=key, type=int, default=None,
+                                help='sobrescreve o valor do preset')
+    run_parser.add_argument('--repeat', type=int, default=20, help='repeticoes por endpoint')
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--ffmpeg', choices=('inline', 'process'), default='inline')
+    run_parser.add_argument('--probe-ms', dest='probe_ms', type=float, default=0,
+                            help='atraso simulado por sondagem do ffmpeg')
+    run_parser.add_argument('-o', '--output', help='arquivo JSON de saida')
+    run_parser.add_argument('--keep', action='store_true', help='mantem biblioteca e banco temporarios')
+    run_parser.set_defaults(func=run)
+
+    compare_parser = sub.add_parser('compare', help='compara dois resultados JSON')
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=1.25,
+                                help='razao maxima aceita entre as medianas (novo / base)')
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -16,12 +16,13 @@ CORS(app)
 
 class Course(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(150), nullable=False)
-    path = db.Column(db.String(255), nullable=False)
+    # Nomes e caminhos vem do disco: Text porque o PostgreSQL aplica o limite de VARCHAR(n)
+    name = db.Column(db.Text, nullable=False)
+    path = db.Column(db.Text, nullable=False)
     extra_paths = db.Column(db.Text, nullable=True)  # JSON array de caminhos extras
     isCoverUrl = db.Column(db.Integer, default=0)
-    fileCover = db.Column(db.String(255), nullable=True)
-    urlCover = db.Column(db.String(255), nullable=True)
+    fileCover = db.Column(db.Text, nullable=True)
+    urlCover = db.Column(db.Text, nullable=True)
     isFavorite = db.Column(db.Integer, default=0)
 
     def get_all_paths(self):
@@ -38,20 +39,44 @@ class Course(db.Model):
         return paths
 
 class Lesson(db.Model):
+    # "Continuar assistindo": aulas mais recentes primeiro
+    __table_args__ = (db.Index('ix_lesson_last_accessed', 'last_accessed_at'),)
     id = db.Column(db.Integer, primary_key=True)
     course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False)
     course = db.relationship('Course', backref=db.backref('lessons', lazy=True))
-    title = db.Column(db.String(150), nullable=False)
+    title = db.Column(db.Text, nullable=False)
     module = db.Column(db.Text)
     hierarchy_path = db.Column(db.Text, nullable=False)
-    video_url = db.Column(db.String(255))
-    pdf_url = db.Column(db.String(255))
-    progressStatus = db.Column(db.Text)
+    video_url = db.Column(db.Text)
+    pdf_url = db.Column(db.Text)
+    # Indice em helpers.lesson_progress.PROGRESS_STATUSES (0 = not_started)
+    progress_status = db.Column(db.SmallInteger, nullable=False, default=0, server_default='0')
     isCompleted = db.Column(db.Integer)
-    time_elapsed = db.Column(db.Text)
-    duration = db.Column(db.Text, nullable=True)
+    # Posicao salva no video e duracao, em segundos
+    elapsed_seconds = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    duration_seconds = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Ultimo progresso registrado (gravado em lote por helpers.activity_log)
+    last_accessed_at = db.Column(db.DateTime, nullable=True)
     subtitle_urls = db.Column(db.Text, nullable=True)  # JSON array de caminhos de legenda
     is_active = db.Column(db.Integer, default=1)
+    # Identidade do arquivo para reconhecer renomeações/movimentações no scan
+    file_id = db.Column(db.String(64), nullable=True)  # "dispositivo:inode"
+    file_size = db.Column(db.BigInteger, nullable=True)
+    content_hash = db.Column(db.String(64), nullable=True)  # SHA-256 de amostras do conteúdo
+
+# Registro somente de insercao da atividade nas aulas (progresso, conclusao), gravado em lotes
+class LessonActivity(db.Model):
+    __tablename__ = 'lesson_activity'
+    __table_args__ = (
+        db.Index('ix_lesson_activity_created', 'created_at'),
+        db.Index('ix_lesson_activity_lesson_created', 'lesson_id', 'created_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    lesson_id = db.Column(db.Integer, db.ForeignKey('lesson.id'), nullable=False)
+    course_id = db.Column(db.Integer, nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # progress, completed, uncompleted
+    position_seconds = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False)
 
 class Note(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -62,6 +87,10 @@ class Note(db.Model):
     created_at = db.Column(db.DateTime, default=db.func.now())
 
 class FocusSession(db.Model):
+    __table_args__ = (
+        db.Index('ix_focus_session_mode_date_started', 'mode', 'date', 'started_at'),
+        db.Index('uq_focus_session_client_key', 'client_key', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     subject_name = db.Column(db.String(150), nullable=False)
     subject_id = db.Column(db.String(50), nullable=False)
@@ -71,11 +100,37 @@ class FocusSession(db.Model):
     mode = db.Column(db.String(20), nullable=False)
     completed = db.Column(db.Integer, default=1)
     date = db.Column(db.String(10), nullable=False)
+    # Chave de idempotencia gerada pelo cliente (fila offline): reenvios nao duplicam a sessao
+    client_key = db.Column(db.String(64), nullable=True)
 
+# Agregado diario das sessoes de foco por materia, mantido em create/delete de sessoes
+class FocusDailyStat(db.Model):
+    __tablename__ = 'focus_daily_stat'
+    __table_args__ = (db.UniqueConstraint('date', 'subject_name', name='uq_focus_daily_stat_date_subject'),)
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.String(10), nullable=False, index=True)
+    subject_name = db.Column(db.String(150), nullable=False)
+    total_seconds = db.Column(db.Integer, nullable=False, default=0)
+    session_count = db.Column(db.Integer, nullable=False, default=0)
+
+# Resumo por dia de estudo (sessoes de foco), mantido em create/delete de sessoes
 class StudyDay(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.String(10), nullable=False, unique=True)  # YYYY-MM-DD
     created_at = db.Column(db.DateTime, default=db.func.now())
+    total_seconds = db.Column(db.Integer, nullable=False, default=0)
+    session_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=db.func.now(), onupdate=db.func.now())
+
+# Sequencia de dias de estudo atual e recorde (linha unica)
+class StudyStreak(db.Model):
+    __tablename__ = 'study_streak'
+    id = db.Column(db.Integer, primary_key=True)
+    current_start = db.Column(db.String(10), nullable=True)
+    current_end = db.Column(db.String(10), nullable=True)
+    longest = db.Column(db.Integer, nullable=False, default=0)
+    longest_start = db.Column(db.String(10), nullable=True)
+    longest_end = db.Column(db.String(10), nullable=True)
 
 class CycleConfig(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -86,9 +141,30 @@ class TimerState(db.Model):
     __tablename__ = 'timer_state'
     id = db.Column(db.Integer, primary_key=True)
     state_json = db.Column(db.Text, nullable=False, default='{}')
+    version = db.Column(db.Integer, nullable=False, default=0)
     updated_at = db.Column(db.DateTime, default=db.func.now(), onupdate=db.func.now())
 
 
+# Arvore de modulos (pastas) de cada curso, mantida pelo scan. position ordena a arvore em
+# pre-ordem, entao um ORDER BY devolve o curso inteiro ja na ordem do sumario. As contagens
+# (aulas ativas, concluidas, duracao) incluem as subpastas.
+class Module(db.Model):
+    __table_args__ = (
+        db.Index('uq_module_course_path', 'course_id', 'path', unique=True),
+        db.Index('ix_module_course_position', 'course_id', 'position'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False)
+    parent_id = db.Column(db.Integer, db.ForeignKey('module.id'), nullable=True)
+    parent = db.relationship('Module', remote_side=[id])
+    name = db.Column(db.Text, nullable=False)
+    path = db.Column(db.Text, nullable=False)  # mesmo valor de Lesson.module
+    depth = db.Column(db.Integer, nullable=False, default=0)
+    position = db.Column(db.Integer, nullable=False, default=0)
+    lesson_count = db.Column(db.Integer, nullable=False, default=0)
+    completed_count = db.Column(db.Integer, nullable=False, default=0)
+    duration_seconds = db.Column(db.Integer, nullable=False, default=0)
+
 class ModuleLink(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False)
@@ -100,50 +176,62 @@ class ModuleLink(db.Model):
 from routes import register_blueprints
 register_blueprints(app)
 
+from helpers.metrics import init_metrics
+init_metrics(app, db)
+
+from helpers.profiler import init_profiler
+init_profiler(app)
+
 with app.app_context():
     db.create_all()
-    # Migração: adicionar coluna isFavorite se não existir (para databases antigas)
-    try:
-        db.session.execute(db.text("SELECT isFavorite FROM course LIMIT 1"))
-    except Exception:
-        db.session.rollback()
-        db.session.execute(db.text("ALTER TABLE course ADD COLUMN isFavorite INTEGER DEFAULT 0"))
-        db.session.commit()
-
-    # Migração: adicionar coluna extra_paths se não existir
-    try:
-        db.session.execute(db.text("SELECT extra_paths FROM course LIMIT 1"))
-    except Exception:
-        db.session.rollback()
-        db.session.execute(db.text("ALTER TABLE course ADD COLUMN extra_paths TEXT"))
-        db.session.commit()
-
-    # Migração: adicionar coluna is_active se não existir
-    try:
-        db.session.execute(db.text("SELECT is_active FROM lesson LIMIT 1"))
-    except Exception:
-        db.session.rollback()
-        db.session.execute(db.text("ALTER TABLE lesson ADD COLUMN is_active INTEGER DEFAULT 1"))
-        db.session.commit()
-
-    # Migração: adicionar coluna subtitle_urls se não existir
-    try:
-        db.session.execute(db.text("SELECT subtitle_urls FROM lesson LIMIT 1"))
-    except Exception:
-        db.session.rollback()
-        db.session.execute(db.text("ALTER TABLE lesson ADD COLUMN subtitle_urls TEXT"))
-        db.session.commit()
-
-    # Migração: adicionar coluna label em module_link se não existir
-    try:
-        db.session.execute(db.text("SELECT label FROM module_link LIMIT 1"))
-    except Exception:
-        db.session.rollback()
-        try:
-            db.session.execute(db.text("ALTER TABLE module_link ADD COLUMN label TEXT DEFAULT 'Questões'"))
-            db.session.commit()
-        except Exception:
-            db.session.rollback()
+    # Migrações: colunas adicionadas depois da criação das tabelas (databases antigas). O DDL é
+    # gerado pelo dialeto, então vale para SQLite e PostgreSQL.
+    from helpers.db_dialect import add_missing_columns, create_missing_indexes
+    add_missing_columns('course',
+                        db.Column('isFavorite', db.Integer, server_default='0'),
+                        db.Column('extra_paths', db.Text))
+    add_missing_columns('lesson',
+                        db.Column('is_active', db.Integer, server_default='1'),
+                        db.Column('subtitle_urls', db.Text),
+                        # Identidade do arquivo
+                        db.Column('file_id', db.String(64)),
+                        db.Column('file_size', db.BigInteger),
+                        db.Column('content_hash', db.String(64)),
+                        # Progresso e duração numéricos (antes texto em progressStatus/time_elapsed/duration)
+                        db.Column('progress_status', db.SmallInteger, nullable=False, server_default='0'),
+                        db.Column('elapsed_seconds', db.Integer, nullable=False, server_default='0'),
+                        db.Column('duration_seconds', db.Integer, nullable=False, server_default='0'),
+                        db.Column('last_accessed_at', db.DateTime))
+    from helpers.lesson_progress import migrate_legacy_progress
+    migrate_legacy_progress()
+    add_missing_columns('module_link', db.Column('label', db.Text, server_default='Questões'))
+    # Colunas de resumo em study_day
+    add_missing_columns('study_day',
+                        db.Column('total_seconds', db.Integer, nullable=False, server_default='0'),
+                        db.Column('session_count', db.Integer, nullable=False, server_default='0'),
+                        db.Column('updated_at', db.DateTime))
+    add_missing_columns('timer_state', db.Column('version', db.Integer, nullable=False, server_default='0'))
+    add_missing_columns('focus_session', db.Column('client_key', db.String(64)))
+
+    # Migração: índices declarados nos modelos (create_all não cria índices em tabelas existentes),
+    # como uq_focus_session_client_key e ix_focus_session_mode_date_started
+    create_missing_indexes()
+
+    # Migração: preencher agregado diário, resumo por dia e sequência a partir das sessões existentes
+    from helpers.focus_stats import rebuild_focus_rollup, rebuild_study_days
+    if not FocusDailyStat.query.first() and FocusSession.query.filter_by(mode='focus').first():
+        rebuild_focus_rollup()
+    if not StudyDay.query.filter(StudyDay.session_count > 0).first() and FocusDailyStat.query.first():
+        rebuild_study_days()
+
+    # Migração: árvore de módulos dos cursos já escaneados
+    from helpers.module_tree import rebuild_all_module_trees
+    if not Module.query.first() and Lesson.query.filter_by(is_active=1).first():
+        rebuild_all_module_trees()
+
+    # Observador opcional das pastas dos cursos (LIBRARY_WATCHER=1)
+    from helpers.library_watcher import init_library_watcher
+    init_library_watcher(app)
 
 if __name__ == '__main__':
     app.run(debug=True, port=9823, host="0.0.0.0")
\ No newline at end of file
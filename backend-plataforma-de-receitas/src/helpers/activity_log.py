@@ -0,0 +1,147 @@
+import time
+import atexit
+import threading
+from datetime import datetime, timedelta, timezone
+
+from app import db, Lesson, LessonActivity
+
+# Atividade nas aulas: o endpoint de progresso so enfileira o evento em memoria; um gravador
+# periodico insere os eventos em lesson_activity (somente insercao) e atualiza
+# lesson.last_accessed_at numa unica transacao por lote. O player envia progresso a cada poucos
+# segundos, entao varios eventos de progresso da mesma aula num lote viram um so.
+FLUSH_INTERVAL_SECONDS = 2
+# Lote cheio: grava sem esperar o intervalo
+FLUSH_MAX_PENDING = 500
+# Eventos guardados para nova tentativa quando a gravacao falha
+MAX_PENDING = 10000
+LOOKUP_CHUNK_SIZE = 500
+# Eventos mais antigos que ACTIVITY_RETENTION_DAYS sao apagados pelo gravador, em lotes
+PRUNE_INTERVAL_SECONDS = 3600
+PRUNE_BATCH_SIZE = 1000
+
+_lock = threading.Lock()
+# Cobre a troca da fila e o commit: quem chama flush_activity enquanto o gravador grava um lote
+# espera esse lote chegar ao banco (senao a leitura seguinte nao veria os eventos em voo)
+_flush_lock = threading.Lock()
+_pending = []
+_flush_requested = threading.Event()
+_flusher = None
+
+
+def _now():
+    # UTC sem fuso, como os defaults func.now() do SQLite
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def record_activity(app, lesson_id, course_id, kind, position_seconds=None):
+    """Enfileira um evento de atividade; a gravacao acontece no proximo lote."""
+    global _flusher
+    with _lock:
+        _pending.append({
+            'lesson_id': lesson_id,
+            'course_id': course_id,
+            'kind': kind,
+            'position_seconds': position_seconds,
+            'created_at': _now(),
+        })
+        full = len(_pending) >= FLUSH_MAX_PENDING
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_loop, args=(app,), name='activity-log-flush')
+            _flusher.daemon = True
+            _flusher.start()
+            atexit.register(flush_activity, app)
+    if full:
+        _flush_requested.set()
+
+
+def _coalesce(events):
+    """Mantem so o ultimo evento de progresso de cada aula no lote (conclusoes ficam todas)."""
+    last_progress = {}
+    for index, event in enumerate(events):
+        if event['kind'] == 'progress':
+            last_progress[event['lesson_id']] = index
+    return [event for index, event in enumerate(events)
+            if event['kind'] != 'progress' or last_progress[event['lesson_id']] == index]
+
+
+def _existing_lessons(lesson_ids):
+    found = set()
+    lesson_ids = list(lesson_ids)
+    for i in range(0, len(lesson_ids), LOOKUP_CHUNK_SIZE):
+        found.update(lesson_id for (lesson_id,) in db.session.query(Lesson.id).filter(
+            Lesson.id.in_(lesson_ids[i:i + LOOKUP_CHUNK_SIZE])))
+    return found
+
+
+def _write(events):
+    # Aulas excluidas enquanto o evento estava na fila sao descartadas
+    existing = _existing_lessons({event['lesson_id'] for event in events})
+    events = [event for event in _coalesce(events) if event['lesson_id'] in existing]
+    if not events:
+        return
+    db.session.execute(db.insert(LessonActivity), events)
+
+    last_access = {}
+    for event in events:
+        last_access[event['lesson_id']] = max(event['created_at'], last_access.get(event['lesson_id'], event['created_at']))
+    table = Lesson.__table__
+    db.session.execute(
+        table.update().where(
+            table.c.id == db.bindparam('lesson_id'),
+            db.or_(table.c.last_accessed_at.is_(None), table.c.last_accessed_at < db.bindparam('accessed_at')),
+        ).values(last_accessed_at=db.bindparam('accessed_at')),
+        [{'lesson_id': lesson_id, 'accessed_at': at} for lesson_id, at in last_access.items()],
+    )
+
+
+def flush_activity(app):
+    """Grava os eventos pendentes. Chamado pelo gravador periodico e antes de leituras que
+    precisam ver o progresso recem-enviado (continuar assistindo)."""
+    with _flush_lock:
+        with _lock:
+            events = list(_pending)
+            _pending.clear()
+        if not events:
+            return
+        try:
+            with app.app_context():
+                _write(events)
+                db.session.commit()
+        except Exception:
+            with _lock:
+                # Volta para a fila (mais antigos primeiro), sem crescer sem limite
+                _pending[:0] = events
+                del _pending[:max(len(_pending) - MAX_PENDING, 0)]
+
+
+def prune_activity(app):
+    """Apaga os eventos mais antigos que ACTIVITY_RETENTION_DAYS (0 guarda tudo), com commit por
+    lote. lesson.last_accessed_at nao depende do log. Retorna quantos eventos foram apagados."""
+    days = app.config.get('ACTIVITY_RETENTION_DAYS', 0)
+    if days <= 0:
+        return 0
+    cutoff = _now() - timedelta(days=days)
+    deleted = 0
+    with app.app_context():
+        while True:
+            ids = [activity_id for (activity_id,) in db.session.query(LessonActivity.id).filter(
+                LessonActivity.created_at < cutoff).limit(PRUNE_BATCH_SIZE)]
+            if not ids:
+                return deleted
+            LessonActivity.query.filter(LessonActivity.id.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
+            deleted += len(ids)
+
+
+def _flush_loop(app):
+    last_prune = None
+    while True:
+        _flush_requested.wait(FLUSH_INTERVAL_SECONDS)
+        _flush_requested.clear()
+        flush_activity(app)
+        if last_prune is None or time.monotonic() - last_prune >= PRUNE_INTERVAL_SECONDS:
+            last_prune = time.monotonic()
+            try:
+                prune_activity(app)
+            except Exception:
+                pass
@@ -0,0 +1,94 @@
+import sqlite3
+
+from sqlalchemy import Table, MetaData, inspect
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.dialects import sqlite, postgresql
+
+from app import db
+
+# Migracoes e upserts que funcionam tanto no SQLite (padrao) quanto no PostgreSQL.
+# Nomes de colunas com maiusculas (isFavorite, progressStatus...) sao sempre citados pelo
+# dialeto: no PostgreSQL um nome sem aspas vira minusculo e nao encontra a coluna.
+
+_UPSERT_DIALECTS = {'sqlite': sqlite, 'postgresql': postgresql}
+# Versoes do SQLite com INSERT ... ON CONFLICT DO UPDATE e com RETURNING
+SQLITE_UPSERT_VERSION = (3, 24, 0)
+SQLITE_RETURNING_VERSION = (3, 35, 0)
+
+
+def add_missing_columns(table_name, *columns):
+    """ALTER TABLE ... ADD COLUMN para as colunas que a tabela ainda nao tem (bancos antigos).
+    O DDL e gerado pelo dialeto: tipo (DATETIME/TIMESTAMP), default e NOT NULL."""
+    existing = {c['name'] for c in inspect(db.engine).get_columns(table_name)}
+    missing = [c for c in columns if c.name not in existing]
+    if not missing:
+        return
+    # Tabela avulsa so para o compilador do dialeto citar nomes e montar o DDL da coluna
+    table = Table(table_name, MetaData(), *missing)
+    quote = db.engine.dialect.identifier_preparer.quote
+    with db.engine.begin() as conn:
+        for column in missing:
+            ddl = CreateColumn(column).compile(dialect=db.engine.dialect)
+            conn.execute(db.text(f"ALTER TABLE {quote(table.name)} ADD COLUMN {ddl}"))
+
+
+def create_missing_indexes():
+    """Cria os indices declarados nos modelos que faltam em tabelas existentes
+    (create_all so cria indices junto com a tabela)."""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+
+
+def add_to_counters(model, keys, increments, insert=True):
+    """Soma increments as colunas da linha identificada por keys (coluna(s) com indice unico),
+    criando a linha se nao existir (insert=True). Retorna os valores novos das colunas somadas,
+    ou None se a linha nao existe e insert=False. Nao faz commit.
+
+    No SQLite e no PostgreSQL e um unico INSERT ... ON CONFLICT DO UPDATE ... RETURNING (ou
+    UPDATE ... RETURNING), atomico mesmo com varios processos escrevendo no mesmo banco. SQLite
+    anterior a 3.35 nao tem RETURNING: os valores sao lidos por um SELECT logo depois, na mesma
+    transacao (que ja segura o lock de escrita); antes de 3.24 e nos demais bancos cai na leitura
+    com SELECT ... FOR UPDATE."""
+    table = model.__table__
+    dialect_name = db.session.get_bind().dialect.name
+    dialect = _UPSERT_DIALECTS.get(dialect_name)
+    use_returning = True
+    if dialect_name == 'sqlite':
+        if sqlite3.sqlite_version_info < SQLITE_UPSERT_VERSION:
+            dialect = None
+        use_returning = sqlite3.sqlite_version_info >= SQLITE_RETURNING_VERSION
+    returning = [table.c[name] for name in increments]
+    # Colunas com onupdate (updated_at) nao sao preenchidas pelo ON CONFLICT sozinhas
+    touched = {c.name: c.onupdate.arg for c in table.columns
+               if c.onupdate is not None and c.onupdate.is_clause_element}
+
+    if dialect is not None:
+        if insert:
+            stmt = dialect.insert(table).values(**keys, **increments)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c[name] for name in keys],
+                set_={**{name: table.c[name] + stmt.excluded[name] for name in increments}, **touched},
+            )
+        else:
+            stmt = db.update(table).where(*[table.c[name] == value for name, value in keys.items()]).values(
+                **{name: table.c[name] + value for name, value in increments.items()}, **touched)
+        if use_returning:
+            row = db.session.execute(stmt.returning(*returning)).first()
+        elif db.session.execute(stmt).rowcount:
+            row = db.session.execute(db.select(*returning).where(
+                *[table.c[name] == value for name, value in keys.items()])).first()
+        else:
+            row = None
+        return dict(row._mapping) if row is not None else None
+
+    row = model.query.filter_by(**keys).with_for_update().first()
+    if row is None:
+        if not insert:
+            return None
+        row = model(**keys, **{name: 0 for name in increments})
+        db.session.add(row)
+    for name, value in increments.items():
+        setattr(row, name, (getattr(row, name) or 0) + value)
+    db.session.flush()
+    return {name: getattr(row, name) for name in increments}
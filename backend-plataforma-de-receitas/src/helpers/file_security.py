@@ -1,30 +1,89 @@
 import os
+import threading
 import unicodedata
+from collections import OrderedDict
+
+# Directories whose normalized-name index is kept in memory (LRU)
+DIR_INDEX_MAX_ENTRIES = 2048
+
+# directory -> (mtime_ns, {NFC name: name on disk})
+_dir_index = OrderedDict()
+_dir_index_lock = threading.Lock()
+
+
+def normalize_path(path):
+    """Canonical (NFC) form used for paths stored in the database."""
+    return unicodedata.normalize('NFC', path) if path else path
+
+
+def directory_index(directory, names=None):
+    """Map of NFC-normalized entry name -> actual name on disk, cached until the directory's
+    mtime changes. Callers that already listed the directory (the scanner) pass names to
+    seed the cache without listing it again. Returns None if the directory can't be read."""
+    try:
+        mtime = os.stat(directory).st_mtime_ns
+    except OSError:
+        return None
+    with _dir_index_lock:
+        cached = _dir_index.get(directory)
+        if cached is not None and cached[0] == mtime:
+            _dir_index.move_to_end(directory)
+            return cached[1]
+
+    if names is None:
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return None
+    index = {unicodedata.normalize('NFC', name): name for name in names}
+    with _dir_index_lock:
+        _dir_index[directory] = (mtime, index)
+        _dir_index.move_to_end(directory)
+        while len(_dir_index) > DIR_INDEX_MAX_ENTRIES:
+            _dir_index.popitem(last=False)
+    return index
+
+
+def _lookup(directory, name):
+    index = directory_index(directory)
+    if not index:
+        return None
+    actual = index.get(unicodedata.normalize('NFC', name))
+    return os.path.join(directory, actual) if actual is not None else None
+
+
+def _resolve_dir(directory):
+    """Actual on-disk form of a directory, resolving each mixed-normalization component."""
+    if not directory or os.path.isdir(directory):
+        return directory
+    for form in ('NFC', 'NFD'):
+        candidate = unicodedata.normalize(form, directory)
+        if os.path.isdir(candidate):
+            return candidate
+    parent, name = os.path.split(directory)
+    if not name or parent == directory:
+        return None
+    resolved_parent = _resolve_dir(parent)
+    if resolved_parent is None:
+        return None
+    resolved = _lookup(resolved_parent, name)
+    return resolved if resolved is not None and os.path.isdir(resolved) else None
 
 
 def resolve_path(path):
     """Resolve a file path handling mixed Unicode normalization (NFC/NFD)."""
-    if os.path.isfile(path):
+    if not path or os.path.isfile(path):
         return path
     # Try full-path normalization first
     for form in ('NFC', 'NFD'):
         normalized = unicodedata.normalize(form, path)
         if os.path.isfile(normalized):
             return normalized
-    # Mixed normalization: directory may be NFC, file may be NFD (or vice-versa)
-    directory = os.path.dirname(path)
-    basename = os.path.basename(path)
-    # Resolve the directory (try both forms)
-    resolved_dir = directory
-    if not os.path.isdir(resolved_dir):
-        for form in ('NFC', 'NFD'):
-            candidate = unicodedata.normalize(form, directory)
-            if os.path.isdir(candidate):
-                resolved_dir = candidate
-                break
-    if os.path.isdir(resolved_dir):
-        nfc_base = unicodedata.normalize('NFC', basename)
-        for entry in os.listdir(resolved_dir):
-            if unicodedata.normalize('NFC', entry) == nfc_base:
-                return os.path.join(resolved_dir, entry)
+    # Mixed normalization: directory may be NFC, file may be NFD (or vice-versa).
+    # Looked up in the cached directory index instead of normalizing every entry on each call.
+    resolved_dir = _resolve_dir(os.path.dirname(path))
+    if resolved_dir is not None:
+        resolved = _lookup(resolved_dir, os.path.basename(path))
+        if resolved is not None:
+            return resolved
     return path
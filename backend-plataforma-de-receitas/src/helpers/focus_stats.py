@@ -0,0 +1,212 @@
+from datetime import date as date_cls, timedelta
+
+from app import db, FocusSession, FocusDailyStat, StudyDay, StudyStreak
+from helpers.db_dialect import add_to_counters
+
+GRANULARITIES = ('day', 'week', 'month', 'year')
+
+
+def apply_session_to_rollup(session, sign=1):
+    """Soma (sign=1) ou subtrai (sign=-1) uma sessao do agregado diario. Nao faz commit."""
+    if session.mode != 'focus':
+        return
+    keys = {'date': session.date, 'subject_name': session.subject_name}
+    counts = add_to_counters(FocusDailyStat, keys, {
+        'total_seconds': sign * (session.duration_seconds or 0),
+        'session_count': sign,
+    }, insert=sign > 0)
+    if counts is None:
+        return
+    if counts['session_count'] <= 0:
+        FocusDailyStat.query.filter_by(**keys).filter(
+            FocusDailyStat.session_count <= 0).delete(synchronize_session=False)
+
+    _apply_session_to_study_day(session, sign)
+
+
+def _apply_session_to_study_day(session, sign):
+    """Atualiza o resumo do dia; quando o dia passa a ter (ou deixa de ter) estudo, atualiza a sequencia."""
+    counts = add_to_counters(StudyDay, {'date': session.date}, {
+        'total_seconds': sign * (session.duration_seconds or 0),
+        'session_count': sign,
+    }, insert=sign > 0)
+    if counts is None:
+        return
+    is_study_day = counts['session_count'] > 0
+    was_study_day = counts['session_count'] - sign > 0
+    if not is_study_day:
+        StudyDay.query.filter(StudyDay.date == session.date,
+                              StudyDay.session_count <= 0).delete(synchronize_session=False)
+
+    if is_study_day and not was_study_day:
+        _extend_streak(session.date)
+    elif was_study_day and not is_study_day:
+        recompute_streak()
+
+
+def _streak_row():
+    # FOR UPDATE: com varios processos no PostgreSQL, a sequencia e atualizada por um de cada vez
+    row = StudyStreak.query.with_for_update().first()
+    if row is None:
+        row = StudyStreak(longest=0)
+        db.session.add(row)
+    return row
+
+
+def _run_length(start, end):
+    return (date_cls.fromisoformat(end) - date_cls.fromisoformat(start)).days + 1
+
+
+def _extend_streak(day_str):
+    """Caso comum (hoje vira dia de estudo logo apos a sequencia atual): O(1).
+    Datas fora de ordem (sessoes retroativas) caem no recalculo completo."""
+    row = _streak_row()
+    next_day = None
+    if row.current_end:
+        next_day = (date_cls.fromisoformat(row.current_end) + timedelta(days=1)).isoformat()
+
+    if next_day is None or day_str > next_day:
+        # Nova sequencia depois de um intervalo
+        row.current_start = row.current_end = day_str
+    elif day_str == next_day:
+        row.current_end = day_str
+    else:
+        recompute_streak()
+        return
+    length = _run_length(row.current_start, row.current_end)
+    if length > (row.longest or 0):
+        row.longest = length
+        row.longest_start, row.longest_end = row.current_start, row.current_end
+
+
+def recompute_streak():
+    """Recalcula sequencia atual (a mais recente) e recorde a partir de study_day."""
+    db.session.flush()
+    row = _streak_row()
+    dates = [d for (d,) in db.session.query(StudyDay.date).filter(
+        StudyDay.session_count > 0).order_by(StudyDay.date.asc())]
+    row.current_start = row.current_end = None
+    row.longest, row.longest_start, row.longest_end = 0, None, None
+    run_start = prev = None
+    for d in dates:
+        current = date_cls.fromisoformat(d)
+        if prev is None or current != prev + timedelta(days=1):
+            run_start = current
+        prev = current
+        length = (current - run_start).days + 1
+        if length > row.longest:
+            row.longest = length
+            row.longest_start, row.longest_end = run_start.isoformat(), d
+    if prev is not None:
+        row.current_start, row.current_end = run_start.isoformat(), prev.isoformat()
+
+
+def get_streak(today=None):
+    """Sequencia atual considerando hoje: vale se terminou hoje ou ontem (ainda pode estudar hoje)."""
+    today = today or date_cls.today()
+    row = StudyStreak.query.first()
+    if row is None or not row.current_end:
+        return {'streak': 0, 'longest': row.longest if row else 0}
+    end = date_cls.fromisoformat(row.current_end)
+    streak = _run_length(row.current_start, row.current_end) if end >= today - timedelta(days=1) else 0
+    return {
+        'streak': streak,
+        'longest': row.longest or 0,
+        'longest_start': row.longest_start,
+        'longest_end': row.longest_end,
+    }
+
+
+def rebuild_study_days():
+    """Recria o resumo por dia a partir de focus_daily_stat e recalcula a sequencia."""
+    StudyDay.query.delete()
+    db.session.execute(db.insert(StudyDay).from_select(
+        ['date', 'total_seconds', 'session_count'],
+        db.select(
+            FocusDailyStat.date,
+            db.func.sum(FocusDailyStat.total_seconds),
+            db.func.sum(FocusDailyStat.session_count),
+        ).group_by(FocusDailyStat.date)
+    ))
+    recompute_streak()
+    db.session.commit()
+
+
+def rebuild_focus_rollup():
+    """Recalcula o agregado diario inteiro a partir de focus_session (um INSERT ... SELECT)."""
+    FocusDailyStat.query.delete()
+    db.session.execute(db.insert(FocusDailyStat).from_select(
+        ['date', 'subject_name', 'total_seconds', 'session_count'],
+        db.select(
+            FocusSession.date,
+            FocusSession.subject_name,
+            db.func.sum(FocusSession.duration_seconds),
+            db.func.count(FocusSession.id),
+        ).where(FocusSession.mode == 'focus').group_by(FocusSession.date, FocusSession.subject_name)
+    ))
+    db.session.commit()
+
+
+def period_key(date_str, granularity):
+    """Chave do periodo de uma data YYYY-MM-DD: dia, semana ISO (YYYY-Www), mes (YYYY-MM) ou ano."""
+    if granularity == 'year':
+        return date_str[:4]
+    if granularity == 'month':
+        return date_str[:7]
+    if granularity == 'week':
+        year, week, _ = date_cls.fromisoformat(date_str).isocalendar()
+        return f"{year}-W{week:02d}"
+    return date_str
+
+
+def _period_expr(granularity):
+    """Expressao SQL com a chave de period_key, para agrupar no banco. None se o banco nao tem
+    como calcular a semana ISO (o agrupamento por semana cai em period_key, por dia)."""
+    column = FocusDailyStat.date
+    if granularity == 'year':
+        return db.func.substr(column, 1, 4)
+    if granularity == 'month':
+        return db.func.substr(column, 1, 7)
+    if granularity != 'week':
+        return column
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return db.func.to_char(db.cast(column, db.Date), 'IYYY-"W"IW')
+    if dialect == 'sqlite':
+        # SQLite < 3.46 nao tem %G/%V: a semana ISO e a da quinta-feira da mesma semana
+        thursday = db.func.date(column, '-3 days', 'weekday 4')
+        week = (db.cast(db.func.strftime('%j', thursday), db.Integer) - 1) // 7 + 1
+        return db.func.strftime('%Y', thursday) + '-W' + db.func.printf('%02d', week)
+    return None
+
+
+def rollup_stats(from_date=None, to_date=None, granularity='day'):
+    """Estatisticas lidas do agregado diario, somadas no banco (GROUP BY materia e GROUP BY periodo)."""
+    filters = []
+    if from_date:
+        filters.append(FocusDailyStat.date >= from_date)
+    if to_date:
+        filters.append(FocusDailyStat.date <= to_date)
+
+    subject_rows = db.session.query(
+        FocusDailyStat.subject_name,
+        db.func.sum(FocusDailyStat.total_seconds),
+        db.func.sum(FocusDailyStat.session_count),
+    ).filter(*filters).group_by(FocusDailyStat.subject_name).all()
+
+    period = _period_expr(granularity)
+    by_period = {}
+    for key, seconds in db.session.query(
+            FocusDailyStat.date if period is None else period,
+            db.func.sum(FocusDailyStat.total_seconds)).filter(*filters).group_by(
+            FocusDailyStat.date if period is None else period):
+        key = period_key(key, granularity) if period is None else key
+        by_period[key] = by_period.get(key, 0) + int(seconds or 0)
+
+    return {
+        'total_seconds': sum(int(seconds or 0) for _, seconds, _ in subject_rows),
+        'total_sessions': sum(int(sessions or 0) for _, _, sessions in subject_rows),
+        'by_subject': {subject: int(seconds or 0) for subject, seconds, _ in subject_rows},
+        'granularity': granularity,
+        'by_period': dict(sorted(by_period.items())),
+    }
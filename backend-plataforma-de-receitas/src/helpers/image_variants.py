@@ -0,0 +1,134 @@
+import os
+import queue
+import threading
+
+# Variantes ficam em uploads/.variants/<subpasta>/<nome>.w<largura>.<formato>
+VARIANT_DIR = '.variants'
+VARIANT_WIDTHS = (320, 640, 1280)
+# Formatos que vale a pena reencodar; GIF fica de fora para nao perder animacao
+CONVERTIBLE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.webp')
+WEBP_QUALITY = 80
+
+_queue = queue.Queue()
+_pending = set()
+_pending_lock = threading.Lock()
+_worker = None
+
+
+def _snap_width(width):
+    """Arredonda a largura pedida para a menor variante que a cobre (limita o numero de arquivos)."""
+    if not width:
+        return 0
+    for w in VARIANT_WIDTHS:
+        if width <= w:
+            return w
+    return 0
+
+
+def variant_subpath(subpath, width, fmt):
+    stem, ext = os.path.splitext(subpath.replace('\\', '/'))
+    ext = f".{fmt}" if fmt else ext.lower()
+    return f"{VARIANT_DIR}/{stem}.w{width}{ext}"
+
+
+def negotiate_variant(subpath, width=None, fmt=None, accepts_webp=False):
+    """Escolhe a variante para a requisicao: ?w= (largura), ?format=webp ou Accept: image/webp.
+    Retorna (largura, formato) ou None quando o original deve ser servido."""
+    if not subpath.lower().endswith(CONVERTIBLE_EXTENSIONS):
+        return None
+    width = _snap_width(width)
+    if fmt not in (None, 'webp'):
+        fmt = None
+    if fmt is None and accepts_webp and not subpath.lower().endswith('.webp'):
+        fmt = 'webp'
+    if not width and not fmt:
+        return None
+    return width, fmt
+
+
+def enqueue_variant(uploads_dir, subpath, width, fmt):
+    """Agenda a geracao de uma variante no worker de background (ignora duplicatas)."""
+    key = (uploads_dir, subpath, width, fmt)
+    with _pending_lock:
+        if key in _pending:
+            return
+        _pending.add(key)
+    _ensure_worker()
+    _queue.put(key)
+
+
+def enqueue_default_variants(uploads_dir, subpath):
+    """Variantes geradas logo apos um upload: WebP no tamanho original e nas larguras padrao."""
+    if not subpath.lower().endswith(CONVERTIBLE_EXTENSIONS):
+        return
+    enqueue_variant(uploads_dir, subpath, 0, 'webp')
+    for width in VARIANT_WIDTHS:
+        enqueue_variant(uploads_dir, subpath, width, 'webp')
+
+
+def remove_variants(uploads_dir, subpath):
+    """Remove as variantes de um original que foi apagado."""
+    stem = os.path.splitext(os.path.basename(subpath))[0]
+    variant_dir = os.path.join(uploads_dir, VARIANT_DIR, os.path.dirname(subpath))
+    if not os.path.isdir(variant_dir):
+        return
+    for entry in os.scandir(variant_dir):
+        if entry.is_file() and entry.name.startswith(f"{stem}.w"):
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+
+def _ensure_worker():
+    global _worker
+    with _pending_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_worker_loop, name='image-variants')
+            _worker.daemon = True
+            _worker.start()
+
+
+def _worker_loop():
+    while True:
+        key = _queue.get()
+        try:
+            generate_variant(*key)
+        except Exception:
+            pass
+        finally:
+            with _pending_lock:
+                _pending.discard(key)
+            _queue.task_done()
+
+
+def generate_variant(uploads_dir, subpath, width, fmt):
+    """Gera uma variante com Pillow. Sem Pillow instalado, as variantes nao sao criadas
+    e o original continua sendo servido."""
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return None
+
+    source = os.path.join(uploads_dir, subpath)
+    target = os.path.join(uploads_dir, variant_subpath(subpath, width, fmt))
+    if not os.path.isfile(source) or os.path.isfile(target):
+        return None
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+
+    with Image.open(source) as img:
+        source_format = img.format
+        img = ImageOps.exif_transpose(img)
+        if width and img.width > width:
+            img.thumbnail((width, width * 10))
+        save_format = 'WEBP' if fmt == 'webp' else (source_format or 'PNG')
+        if save_format == 'JPEG' and img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+
+        tmp = f"{target}.tmp"
+        if save_format == 'WEBP':
+            img.save(tmp, format='WEBP', quality=WEBP_QUALITY, method=4)
+        else:
+            img.save(tmp, format=save_format, optimize=True)
+    os.replace(tmp, target)
+    return target
@@ -0,0 +1,105 @@
+import os
+import time
+import hashlib
+import mimetypes
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from app import Lesson, Course
+from helpers.file_security import resolve_path
+
+# Cache aula -> arquivo (caminho resolvido, tamanho, mtime, mimetype) para servir o conteudo
+# sem consultar o banco nem resolver o caminho a cada requisicao (o player faz varias requisicoes Range).
+# Scans, o observador de pastas e alteracoes de curso invalidam as entradas do curso.
+
+CACHE_MAX_ENTRIES = 4096
+# Entradas mais antigas que isso sao conferidas de novo (arquivo trocado sem scan)
+REVALIDATE_SECONDS = 60
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+mimetypes.add_type('video/mp2t', '.ts')
+mimetypes.add_type('video/x-matroska', '.mkv')
+mimetypes.add_type('video/webm', '.webm')
+
+
+def _inside(path, root):
+    root = os.path.realpath(root).rstrip('/\\')
+    return path == root or path.startswith(root + os.sep)
+
+
+def file_validators(path, st):
+    """(mtime, etag) do arquivo a partir do resultado de stat/fstat."""
+    mtime = datetime.fromtimestamp(st.st_mtime, tz=timezone.utc)
+    etag = hashlib.sha1(f"{path}:{st.st_mtime_ns}:{st.st_size}".encode('utf-8', 'surrogateescape')).hexdigest()[:20]
+    return mtime, etag
+
+
+def _load(lesson_id):
+    lesson = Lesson.query.get(lesson_id)
+    if lesson is None or not lesson.is_active:
+        return None, ('Aula nao encontrada.', 404)
+    file_path = lesson.pdf_url or lesson.video_url
+    course = Course.query.get(lesson.course_id)
+    if not file_path or course is None:
+        return None, ('Aula nao encontrada.', 404)
+
+    path = resolve_path(file_path)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None, ('Arquivo nao encontrado.', 404)
+    # So serve arquivos dentro das pastas cadastradas do curso (links simbolicos resolvidos)
+    real_path = os.path.realpath(path)
+    if not any(_inside(real_path, root) for root in course.get_all_paths()):
+        return None, ('Arquivo fora das pastas do curso.', 403)
+
+    mtime, etag = file_validators(path, st)
+    return {
+        'lesson_id': lesson_id,
+        'course_id': lesson.course_id,
+        'path': path,
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'mtime': mtime,
+        'mimetype': mimetypes.guess_type(path)[0] or 'application/octet-stream',
+        'etag': etag,
+        'checked_at': time.monotonic(),
+    }, None
+
+
+def get_lesson_content(lesson_id):
+    """Retorna (entrada, None) ou (None, (mensagem, status))."""
+    with _cache_lock:
+        entry = _cache.get(lesson_id)
+        if entry is not None and time.monotonic() - entry['checked_at'] < REVALIDATE_SECONDS:
+            _cache.move_to_end(lesson_id)
+            return entry, None
+
+    entry, error = _load(lesson_id)
+    with _cache_lock:
+        if entry is None:
+            _cache.pop(lesson_id, None)
+            return None, error
+        _cache[lesson_id] = entry
+        _cache.move_to_end(lesson_id)
+        while len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return entry, None
+
+
+def invalidate_lesson_content(lesson_id):
+    with _cache_lock:
+        _cache.pop(lesson_id, None)
+
+
+def invalidate_course_content(course_id=None):
+    """Descarta as entradas de um curso (ou todas, sem course_id)."""
+    with _cache_lock:
+        if course_id is None:
+            _cache.clear()
+            return
+        for lesson_id in [k for k, entry in _cache.items() if entry['course_id'] == course_id]:
+            del _cache[lesson_id]
@@ -0,0 +1,140 @@
+import json
+
+from sqlalchemy import inspect
+
+from app import db, Lesson
+
+# Status de progresso da aula, gravado como inteiro (indice nesta tupla) em lesson.progress_status.
+# A API continua recebendo e devolvendo o nome ("not_started", "started", "completed").
+PROGRESS_STATUSES = ('not_started', 'started', 'completed')
+
+# Colunas de texto antigas convertidas pela migracao
+LEGACY_COLUMNS = ('progressStatus', 'time_elapsed', 'duration')
+MIGRATION_CHUNK_SIZE = 500
+
+
+def status_code(name):
+    """Codigo de um nome de status; None se o nome nao existe."""
+    try:
+        return PROGRESS_STATUSES.index(name)
+    except ValueError:
+        return None
+
+
+def status_name(code):
+    if code is None or not 0 <= code < len(PROGRESS_STATUSES):
+        return PROGRESS_STATUSES[0]
+    return PROGRESS_STATUSES[code]
+
+
+def parse_seconds(value):
+    """Segundos inteiros de um numero ou texto ("95", "95.4"); None se invalido."""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        seconds = int(float(value))
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return max(seconds, 0)
+
+
+def serialize_lesson(lesson):
+    """Aula no formato da listagem do curso (carregue Lesson.course junto para nao consultar de novo)."""
+    return {
+        'course_title': lesson.course.name if lesson.course else None,
+        'id': lesson.id,
+        'title': lesson.title,
+        'module': lesson.module,
+        'progressStatus': status_name(lesson.progress_status),
+        'isCompleted': lesson.isCompleted,
+        'hierarchy_path': lesson.hierarchy_path,
+        'time_elapsed': lesson.elapsed_seconds,
+        'video_url': lesson.video_url,
+        'duration': lesson.duration_seconds,
+        'pdf_url': lesson.pdf_url,
+        'subtitle_urls': json.loads(lesson.subtitle_urls) if lesson.subtitle_urls else [],
+    }
+
+
+def watched_seconds_expr():
+    """Segundos assistidos de uma aula: a duracao inteira se concluida, senao a posicao salva
+    (limitada a duracao). CASE em vez de MIN/LEAST de duas colunas, que muda de nome entre bancos."""
+    return db.case(
+        (Lesson.isCompleted == 1, Lesson.duration_seconds),
+        (Lesson.elapsed_seconds > Lesson.duration_seconds, Lesson.duration_seconds),
+        else_=Lesson.elapsed_seconds,
+    )
+
+
+def watch_time(group_by, *filters):
+    """Tempo total, assistido e restante das aulas ativas agrupado por group_by (uma consulta)."""
+    rows = db.session.query(
+        group_by,
+        db.func.count(Lesson.id),
+        db.func.sum(db.case((Lesson.isCompleted == 1, 1), else_=0)),
+        db.func.sum(Lesson.duration_seconds),
+        db.func.sum(watched_seconds_expr()),
+    ).filter(Lesson.is_active == 1, *filters).group_by(group_by).order_by(group_by)
+
+    result = []
+    for key, lessons, completed, total, watched in rows:
+        total, watched = int(total or 0), int(watched or 0)
+        result.append({
+            'key': key,
+            'lessons': lessons,
+            'completed_lessons': int(completed or 0),
+            'total_seconds': total,
+            'watched_seconds': watched,
+            'remaining_seconds': max(total - watched, 0),
+        })
+    return result
+
+
+def _legacy_status(value):
+    code = status_code(value)
+    if code is None:
+        # Texto livre antigo: qualquer valor nao vazio conta como iniciado
+        code = 1 if value else 0
+    return code
+
+
+def _legacy_seconds(value):
+    return parse_seconds(value) or 0
+
+
+def migrate_legacy_progress():
+    """Converte progressStatus/time_elapsed/duration (texto) para as colunas numericas e remove as
+    colunas antigas. Conversao em Python: o CAST de texto invalido difere entre SQLite e PostgreSQL."""
+    existing = {c['name'] for c in inspect(db.engine).get_columns('lesson')}
+    legacy = [name for name in LEGACY_COLUMNS if name in existing]
+    if not legacy:
+        return
+
+    # Cada coluna antiga presente e copiada para a sua nova, mesmo que as outras ja nao existam
+    targets = {
+        'progressStatus': ('progress_status', _legacy_status),
+        'time_elapsed': ('elapsed_seconds', _legacy_seconds),
+        'duration': ('duration_seconds', _legacy_seconds),
+    }
+    table = Lesson.__table__
+    quote = db.engine.dialect.identifier_preparer.quote
+    with db.engine.begin() as conn:
+        for name in legacy:
+            column, convert = targets[name]
+            rows = conn.execute(db.text(
+                f"SELECT id, {quote(name)} FROM lesson WHERE {quote(name)} IS NOT NULL")).fetchall()
+            update = table.update().where(table.c.id == db.bindparam('lesson_id')).values(
+                {column: db.bindparam('value')})
+            for i in range(0, len(rows), MIGRATION_CHUNK_SIZE):
+                conn.execute(update, [{'lesson_id': lesson_id, 'value': convert(value)}
+                                      for lesson_id, value in rows[i:i + MIGRATION_CHUNK_SIZE]])
+
+    # Fora da transacao da copia: se o banco nao suporta DROP COLUMN (SQLite < 3.35), as colunas
+    # ficam, sem uso, e so os valores sao descartados (linhas convertidas nao sao lidas de novo)
+    for name in legacy:
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(db.text(f"ALTER TABLE lesson DROP COLUMN {quote(name)}"))
+        except Exception:
+            with db.engine.begin() as conn:
+                conn.execute(db.text(f"UPDATE lesson SET {quote(name)} = NULL WHERE {quote(name)} IS NOT NULL"))
@@ -0,0 +1,430 @@
+import os
+import time
+import threading
+from datetime import datetime
+
+from app import db, Course, Lesson
+from utils import (SUPPORTED_EXTENSIONS, SUBTITLE_EXTENSIONS, get_scan_lock, refresh_lesson, lessons_by_path,
+                   register_lessons_in_directory, register_new_files, inactive_lessons_by_size, file_identity,
+                   set_lesson_path)
+from helpers.file_security import normalize_path, resolve_path
+from helpers.lesson_content import invalidate_course_content
+from helpers.module_tree import rebuild_module_tree
+
+# Observador opcional das pastas dos cursos (pacote watchdog): inotify/FSEvents/ReadDirectoryChangesW
+# nas pastas locais e varredura periodica (polling) em montagens de rede, onde eventos nao chegam.
+# Os eventos sao agrupados (debounce) e aplicados direto nas aulas, sem reescanear o curso.
+
+# Espera sem novos eventos antes de aplicar (copias grandes geram muitos eventos de modificacao)
+DEBOUNCE_SECONDS = 2.0
+# Aplica mesmo com eventos chegando sem parar
+MAX_DELAY_SECONDS = 30.0
+# Espera antes de tentar de novo quando o curso esta com scan/exclusao em andamento
+BUSY_RETRY_SECONDS = 5.0
+NETWORK_FILESYSTEMS = ('nfs', 'nfs4', 'cifs', 'smbfs', 'smb3', '9p', 'davfs', 'fuse.sshfs', 'fuse.rclone')
+
+watcher_status = {
+    'enabled': False,
+    'available': None,
+    'running': False,
+    'roots': {},
+    'pending': 0,
+    'applied_events': 0,
+    'last_applied_at': None,
+    'last_error': None,
+}
+
+_app = None
+_condition = threading.Condition()
+_events = []
+_first_event_at = None
+_last_event_at = None
+_observers = {}
+_watches = {}
+_started = False
+_start_lock = threading.Lock()
+
+
+# -- Coleta de eventos --
+
+class _EventCollector:
+    """Handler do watchdog (interface dispatch): so enfileira; o trabalho e feito pelo worker."""
+
+    def dispatch(self, event):
+        kind = event.event_type
+        if kind in ('opened', 'closed_no_write'):
+            return
+        if kind == 'modified' and event.is_directory:
+            return
+        dest = getattr(event, 'dest_path', None) or None
+        _push_event(kind, os.fsdecode(event.src_path), os.fsdecode(dest) if dest else None, event.is_directory)
+
+
+def _push_event(kind, src, dest, is_dir):
+    global _first_event_at, _last_event_at
+    with _condition:
+        now = time.monotonic()
+        if not _events:
+            _first_event_at = now
+        _last_event_at = now
+        _events.append((kind, src, dest, is_dir))
+        watcher_status['pending'] = len(_events)
+        _condition.notify_all()
+
+
+def _coalesce(events):
+    """Remove repeticoes de criado/modificado do mesmo arquivo, mantendo a ultima ocorrencia."""
+    last_index = {}
+    for i, (kind, src, dest, is_dir) in enumerate(events):
+        for path in (src, dest):
+            if path:
+                last_index[path] = i
+    result = []
+    for i, event in enumerate(events):
+        kind, src, _, is_dir = event
+        if kind in ('created', 'modified', 'closed') and not is_dir and last_index.get(src) != i:
+            continue
+        result.append(event)
+    return result
+
+
+# -- Mapeamento caminho -> cursos --
+
+def _inside(path, root):
+    root = root.rstrip('/\\')
+    return path == root or path.startswith(root + os.sep)
+
+
+def _courses_for(path):
+    """(course_id, raiz) de cada curso cujas pastas contem path."""
+    result = []
+    for root, course_ids in watcher_status['roots'].items():
+        if _inside(path, root):
+            result.extend((course_id, root) for course_id in course_ids['course_ids'])
+    return result
+
+
+def _hierarchy_for(path, root):
+    """Mesmo formato do scan: pastas relativas a raiz separadas por '/'."""
+    relative = os.path.relpath(os.path.dirname(path), root)
+    return '' if relative == '.' else relative.replace(os.sep, '/')
+
+
+def _dir_hierarchy(path, root):
+    relative = os.path.relpath(path, root)
+    return '' if relative == '.' else relative.replace(os.sep, '/')
+
+
+def _lesson_for_path(course_id, path):
+    # Caminhos sao gravados em NFC; licoes antigas podem ter a forma do disco
+    forms = {normalize_path(path), path}
+    return Lesson.query.filter(
+        Lesson.course_id == course_id,
+        db.or_(Lesson.video_url.in_(forms), Lesson.pdf_url.in_(forms))
+    ).first()
+
+
+# -- Aplicacao dos eventos --
+
+def _is_lesson_file(path):
+    return path.lower().endswith(SUPPORTED_EXTENSIONS)
+
+
+def _is_subtitle_file(path):
+    return path.lower().endswith(SUBTITLE_EXTENSIONS)
+
+
+def _upsert_file(path):
+    if _is_subtitle_file(path):
+        _refresh_subtitles(path)
+        return
+    if not _is_lesson_file(path) or not os.path.isfile(path):
+        return
+    for course_id, root in _courses_for(path):
+        _register_file(course_id, path, _hierarchy_for(path, root))
+
+
+def _register_file(course_id, path, hierarchy_prefix):
+    lesson = _lesson_for_path(course_id, path)
+    if lesson:
+        refresh_lesson(lesson, path, hierarchy_prefix)
+        return
+    # Arquivo que saiu e voltou ao curso (ou foi copiado) reaproveita a licao desativada
+    candidates = inactive_lessons_by_size(course_id, [file_identity(path)[1]])
+    register_new_files(course_id, [(path, hierarchy_prefix)], candidates)
+
+
+def _soft_delete(path, is_dir):
+    if not is_dir and _is_subtitle_file(path):
+        _refresh_subtitles(path)
+        return
+    for course_id, _ in _courses_for(path):
+        if is_dir:
+            for lesson in lessons_by_path(course_id, path).values():
+                lesson.is_active = 0
+        else:
+            lesson = _lesson_for_path(course_id, path)
+            if lesson:
+                lesson.is_active = 0
+
+
+def _created_dir(path):
+    # Pasta criada ou movida de fora para dentro do curso: registrar so o que esta nela
+    if not os.path.isdir(path):
+        return
+    for course_id, root in _courses_for(path):
+        register_lessons_in_directory(course_id, path, _dir_hierarchy(path, root))
+
+
+def _move(src, dest, is_dir):
+    """Renomeia/move aulas preservando progresso e notas. Destino fora do curso = soft delete."""
+    dest_courses = dict(_courses_for(dest))
+    handled = set()
+    for course_id, _ in _courses_for(src):
+        dest_root = dest_courses.get(course_id)
+        if is_dir:
+            src_prefix = normalize_path(src)
+            for old_path, lesson in lessons_by_path(course_id, src).items():
+                if dest_root is None:
+                    lesson.is_active = 0
+                    continue
+                new_path = resolve_path(dest + old_path[len(src_prefix):])
+                set_lesson_path(lesson, new_path)
+                refresh_lesson(lesson, new_path, _hierarchy_for(new_path, dest_root))
+            handled.add(course_id)
+            continue
+
+        lesson = _lesson_for_path(course_id, src)
+        if lesson is None:
+            continue
+        if dest_root is None or not _is_lesson_file(dest):
+            lesson.is_active = 0
+        else:
+            set_lesson_path(lesson, dest)
+            refresh_lesson(lesson, dest, _hierarchy_for(dest, dest_root))
+        handled.add(course_id)
+
+    # Cursos onde a origem nao era conhecida (ex.: movido de fora): tratar como criacao
+    for course_id, dest_root in dest_courses.items():
+        if course_id in handled:
+            continue
+        if is_dir:
+            if os.path.isdir(dest):
+                register_lessons_in_directory(course_id, dest, _dir_hierarchy(dest, dest_root))
+        elif _is_lesson_file(dest) and os.path.isfile(dest):
+            _register_file(course_id, dest, _hierarchy_for(dest, dest_root))
+
+    if not is_dir and _is_subtitle_file(src):
+        _refresh_subtitles(src)
+    if not is_dir and _is_subtitle_file(dest):
+        _refresh_subtitles(dest)
+
+
+def _refresh_subtitles(subtitle_path):
+    """Legenda criada/removida: atualizar subtitle_urls das aulas ativas da mesma pasta."""
+    directory = os.path.dirname(subtitle_path)
+    name = normalize_path(os.path.basename(subtitle_path))
+    subtitle_index = {}
+    for course_id, root in _courses_for(subtitle_path):
+        for file_path, lesson in lessons_by_path(course_id, directory).items():
+            if not lesson.is_active or os.path.dirname(file_path) != normalize_path(directory):
+                continue
+            stem = os.path.splitext(os.path.basename(file_path))[0]
+            if name.startswith(stem + '.'):
+                file_path = resolve_path(file_path)
+                refresh_lesson(lesson, file_path, _hierarchy_for(file_path, root), subtitle_index)
+
+
+def _apply_event(kind, src, dest, is_dir):
+    if kind == 'moved':
+        _move(src, dest, is_dir)
+    elif kind == 'deleted':
+        _soft_delete(src, is_dir)
+    elif is_dir:
+        if kind == 'created':
+            _created_dir(src)
+    else:
+        _upsert_file(src)
+
+
+def _affected_courses(events):
+    course_ids = set()
+    for _, src, dest, _ in events:
+        for path in (src, dest):
+            if path:
+                course_ids.update(course_id for course_id, _ in _courses_for(path))
+    return course_ids
+
+
+def _apply_batch(events):
+    """Aplica um lote com os locks de scan dos cursos afetados. Retorna False se algum
+    curso estiver ocupado (scan completo ou exclusao); o lote volta para a fila."""
+    locks = []
+    try:
+        for course_id in sorted(_affected_courses(events)):
+            lock = get_scan_lock(course_id)
+            if not lock.acquire(blocking=False):
+                return False
+            locks.append(lock)
+        existing = {c.id for c in Course.query.filter(Course.id.in_(_affected_courses(events)))}
+        if existing:
+            for event in events:
+                _apply_event(*event)
+            for course_id in existing:
+                rebuild_module_tree(course_id)
+            db.session.commit()
+            for course_id in existing:
+                invalidate_course_content(course_id)
+        return True
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        for lock in locks:
+            lock.release()
+
+
+def _worker_loop():
+    global _first_event_at
+    while True:
+        with _condition:
+            _condition.wait_for(lambda: _events)
+            while True:
+                now = time.monotonic()
+                quiet = now - _last_event_at
+                if quiet >= DEBOUNCE_SECONDS or now - _first_event_at >= MAX_DELAY_SECONDS:
+                    break
+                _condition.wait(DEBOUNCE_SECONDS - quiet)
+            batch = _coalesce(_events)
+            _events.clear()
+            watcher_status['pending'] = 0
+
+        applied = False
+        try:
+            with _app.app_context():
+                applied = _apply_batch(batch)
+            if applied:
+                watcher_status['applied_events'] += len(batch)
+                watcher_status['last_applied_at'] = datetime.now().isoformat()
+        except Exception as e:
+            applied = True  # lote com erro e descartado; o proximo rescan corrige
+            watcher_status['last_error'] = str(e)
+
+        if not applied:
+            with _condition:
+                _events[:0] = batch
+                _first_event_at = time.monotonic()
+                watcher_status['pending'] = len(_events)
+            time.sleep(BUSY_RETRY_SECONDS)
+
+
+# -- Observadores --
+
+def _mount_fstype(path):
+    try:
+        with open('/proc/mounts', encoding='utf-8') as f:
+            mounts = [line.split()[1:3] for line in f if len(line.split()) >= 3]
+    except OSError:
+        return None
+    real = os.path.realpath(path)
+    best, fstype = '', None
+    for mount_point, mount_type in mounts:
+        mount_point = mount_point.replace('\\040', ' ')
+        if _inside(real, mount_point) and len(mount_point) >= len(best):
+            best, fstype = mount_point, mount_type
+    return fstype
+
+
+def _watch_mode(path):
+    """'polling' para caminhos de rede (UNC ou montagem NFS/SMB) ou se forcado na configuracao."""
+    if _app.config.get('LIBRARY_WATCHER_FORCE_POLLING'):
+        return 'polling'
+    if path.startswith('\\\\') or path.startswith('//'):
+        return 'polling'
+    if _mount_fstype(path) in NETWORK_FILESYSTEMS:
+        return 'polling'
+    return 'native'
+
+
+def _observer(mode):
+    if mode not in _observers:
+        if mode == 'polling':
+            from watchdog.observers.polling import PollingObserver
+            observer = PollingObserver(timeout=_app.config.get('LIBRARY_WATCHER_POLL_INTERVAL', 10))
+        else:
+            from watchdog.observers import Observer
+            observer = Observer()
+        observer.daemon = True
+        observer.start()
+        _observers[mode] = observer
+    return _observers[mode]
+
+
+def refresh_watches():
+    """Sincroniza as pastas observadas com Course.get_all_paths() de todos os cursos.
+    Chamado ao iniciar e quando cursos sao criados, editados ou excluidos. Sem o observador
+    ativo nao faz nada."""
+    if not watcher_status['running']:
+        return
+    roots = {}
+    for course in Course.query.all():
+        for path in course.get_all_paths():
+            if path and os.path.isdir(path):
+                roots.setdefault(path, set()).add(course.id)
+
+    with _start_lock:
+        # Raiz dentro de outra raiz ja observada nao precisa de watch proprio
+        scheduled = [r for r in roots if not any(o != r and _inside(r, o) for o in roots)]
+        for root in list(_watches):
+            if root not in scheduled:
+                mode, watch = _watches.pop(root)
+                _observer(mode).unschedule(watch)
+        for root in scheduled:
+            if root not in _watches:
+                mode = _watch_mode(root)
+                try:
+                    _watches[root] = (mode, _observer(mode).schedule(_EventCollector(), root, recursive=True))
+                except OSError as e:
+                    # Ex.: limite de inotify atingido; cai para polling
+                    watcher_status['last_error'] = str(e)
+                    _watches[root] = ('polling', _observer('polling').schedule(_EventCollector(), root, recursive=True))
+
+        watcher_status['roots'] = {
+            root: {'course_ids': sorted(course_ids),
+                   'mode': _watches[root][0] if root in _watches else 'nested'}
+            for root, course_ids in roots.items()
+        }
+
+
+def start_library_watcher():
+    global _started
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+        try:
+            import watchdog  # noqa: F401
+        except ImportError:
+            watcher_status['available'] = False
+            return
+        watcher_status['available'] = True
+        watcher_status['running'] = True
+        worker = threading.Thread(target=_worker_loop, name='library-watcher')
+        worker.daemon = True
+        worker.start()
+    refresh_watches()
+
+
+def init_library_watcher(app):
+    """Liga o observador se LIBRARY_WATCHER estiver ativo. Inicia na primeira requisicao,
+    assim so o processo que atende (e nao o monitor do reloader) observa as pastas."""
+    global _app
+    _app = app
+    watcher_status['enabled'] = bool(app.config.get('LIBRARY_WATCHER'))
+    if not watcher_status['enabled']:
+        return
+
+    @app.before_request
+    def _start_library_watcher():
+        if not _started:
+            start_library_watcher()
@@ -0,0 +1,286 @@
+import time
+import threading
+from contextlib import contextmanager
+
+from flask import g, request, has_request_context, current_app
+from sqlalchemy import event
+
+# Metricas em memoria no formato texto do Prometheus (sem dependencia externa).
+# Latencia, consultas SQL e tamanho de resposta por rota; scans e sondagens do ffmpeg.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250, 1000)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+PROBE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SCAN_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0)
+# Limite de SQL guardado por requisicao para o log de requisicoes lentas
+SLOW_LOG_MAX_STATEMENTS = 50
+
+METRICS = {
+    'http_request_duration_seconds': ('histogram', 'Latencia das requisicoes por rota', LATENCY_BUCKETS),
+    'http_request_queries': ('histogram', 'Consultas SQL por requisicao', QUERY_COUNT_BUCKETS),
+    'http_request_query_seconds': ('histogram', 'Tempo em SQL por requisicao', LATENCY_BUCKETS),
+    'http_response_size_bytes': ('histogram', 'Tamanho das respostas', SIZE_BUCKETS),
+    'http_requests_total': ('counter', 'Requisicoes por rota e status', None),
+    'db_queries_total': ('counter', 'Consultas SQL executadas (inclui jobs em background)', None),
+    'db_query_seconds_total': ('counter', 'Tempo total em SQL', None),
+    'scan_duration_seconds': ('histogram', 'Duracao dos scans de curso', SCAN_BUCKETS),
+    'scan_files_total': ('counter', 'Arquivos processados pelos scans', None),
+    'scan_last_files_per_second': ('gauge', 'Vazao do ultimo scan de cada curso', None),
+    'scan_last_probe_p95_seconds': ('gauge', 'p95 da sondagem ffmpeg no ultimo scan de cada curso', None),
+    'ffmpeg_probe_seconds': ('histogram', 'Duracao das sondagens de video com ffmpeg', PROBE_BUCKETS),
+    'http_query_budget_exceeded_total': ('counter', 'Requisicoes acima do orcamento de consultas da rota', None),
+}
+
+_lock = threading.Lock()
+_series = {name: {} for name in METRICS}
+# Capturas de SQL ativas na thread (capture_queries)
+_captures = threading.local()
+
+
+class _Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+def _key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def inc(name, value=1, **labels):
+    with _lock:
+        series = _series[name]
+        key = _key(labels)
+        series[key] = series.get(key, 0) + value
+
+
+def set_gauge(name, value, **labels):
+    with _lock:
+        _series[name][_key(labels)] = value
+
+
+def observe(name, value, **labels):
+    with _lock:
+        series = _series[name]
+        key = _key(labels)
+        hist = series.get(key)
+        if hist is None:
+            hist = series[key] = _Histogram(METRICS[name][2])
+        hist.observe(value)
+
+
+def percentile(values, q):
+    """Percentil exato de uma lista pequena (ex.: sondagens de um scan)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _number(value):
+    if isinstance(value, float) and value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    """Todas as metricas no formato de exposicao texto do Prometheus (versao 0.0.4)."""
+    lines = []
+    with _lock:
+        for name, (kind, help_text, _) in METRICS.items():
+            series = _series[name]
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for key, value in sorted(series.items()):
+                if kind != 'histogram':
+                    lines.append(f'{name}{_labels(key)} {_number(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(value.buckets, value.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_labels(key, [("le", _number(float(bound)))])} {cumulative}')
+                lines.append(f'{name}_bucket{_labels(key, [("le", "+Inf")])} {value.count}')
+                lines.append(f'{name}_sum{_labels(key)} {_number(value.sum)}')
+                lines.append(f'{name}_count{_labels(key)} {value.count}')
+    return '\n'.join(lines) + '\n'
+
+
+# -- Captura de consultas e orcamentos por rota --
+
+class QueryCapture:
+    """Consultas SQL executadas dentro de capture_queries(): statements e tempo total."""
+
+    def __init__(self):
+        self.statements = []
+        self.seconds = 0.0
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __len__(self):
+        return len(self.statements)
+
+
+@contextmanager
+def capture_queries(engine=None):
+    """Captura as consultas SQL executadas na thread atual, inclusive as de requisicoes feitas
+    pelo test client:
+
+        with capture_queries() as captured:
+            client.get('/api/courses')
+        assert captured.count <= 2
+
+    Sem engine, usa o do Flask-SQLAlchemy do app atual (requer contexto de app)."""
+    if engine is None:
+        engine = current_app.extensions['sqlalchemy'].engine
+    instrument_engine(engine)
+    capture = QueryCapture()
+    stack = getattr(_captures, 'stack', None)
+    if stack is None:
+        stack = _captures.stack = []
+    stack.append(capture)
+    try:
+        yield capture
+    finally:
+        stack.remove(capture)
+
+
+def query_budget(max_queries):
+    """Declara quantas consultas SQL a rota pode fazer, independente do volume de dados.
+    Estourar o orcamento gera um aviso no log e a metrica http_query_budget_exceeded_total;
+    benchmarks/check_query_budgets.py verifica todas as rotas com orcamento."""
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+def query_budgets(app):
+    """{endpoint: orcamento} das rotas registradas com @query_budget."""
+    budgets = {}
+    for endpoint, view in app.view_functions.items():
+        budget = getattr(view, 'query_budget', None)
+        if budget is not None:
+            budgets[endpoint] = budget
+    return budgets
+
+
+# -- Hooks de requisicao e SQL --
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('query_start')
+    elapsed = time.perf_counter() - starts.pop() if starts else 0.0
+    inc('db_queries_total')
+    inc('db_query_seconds_total', elapsed)
+    for capture in getattr(_captures, 'stack', None) or ():
+        capture.statements.append(statement)
+        capture.seconds += elapsed
+    if has_request_context() and 'metrics_queries' in g:
+        g.metrics_queries += 1
+        g.metrics_query_seconds += elapsed
+        statements = g.get('metrics_statements')
+        if statements is not None and len(statements) < SLOW_LOG_MAX_STATEMENTS:
+            statements.append(f'[{elapsed * 1000:.1f} ms] {statement}')
+
+
+def _start_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_queries = 0
+    g.metrics_query_seconds = 0.0
+    g.metrics_statements = [] if g.get('metrics_slow_ms') else None
+
+
+def _route_label():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def _finish_request(app, status, size):
+    if 'metrics_started' not in g or g.get('metrics_recorded'):
+        return
+    g.metrics_recorded = True
+    elapsed = time.perf_counter() - g.metrics_started
+    route = _route_label()
+    method = request.method
+    inc('http_requests_total', method=method, route=route, status=str(status))
+    observe('http_request_duration_seconds', elapsed, method=method, route=route)
+    observe('http_request_queries', g.metrics_queries, method=method, route=route)
+    observe('http_request_query_seconds', g.metrics_query_seconds, method=method, route=route)
+    if size is not None:
+        observe('http_response_size_bytes', size, method=method, route=route)
+
+    view = app.view_functions.get(request.endpoint) if request.endpoint else None
+    budget = getattr(view, 'query_budget', None)
+    if budget is not None and g.metrics_queries > budget:
+        inc('http_query_budget_exceeded_total', method=method, route=route)
+        app.logger.warning('Orcamento de consultas excedido: %s %s fez %d consultas (orcamento %d)',
+                           method, route, g.metrics_queries, budget)
+
+    slow_ms = app.config.get('SLOW_REQUEST_MS')
+    if slow_ms and elapsed * 1000 >= slow_ms:
+        app.logger.warning(
+            'Requisicao lenta: %s %s -> %s em %.0f ms (%d consultas SQL, %.0f ms em SQL)\n%s',
+            method, request.full_path.rstrip('?'), status, elapsed * 1000, g.metrics_queries,
+            g.metrics_query_seconds * 1000, '\n'.join(g.metrics_statements or []))
+
+
+def instrument_engine(engine):
+    if not event.contains(engine, 'after_cursor_execute', _after_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def init_metrics(app, db):
+    """Liga a coleta: hooks before/after_request e eventos de cursor do SQLAlchemy.
+    METRICS_ENABLED=0 desliga tudo."""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    with app.app_context():
+        instrument_engine(db.engine)
+
+    @app.before_request
+    def _metrics_before_request():
+        g.metrics_slow_ms = app.config.get('SLOW_REQUEST_MS')
+        _start_request()
+
+    @app.after_request
+    def _metrics_after_request(response):
+        # Respostas em streaming (SSE, exportacoes) nao tem tamanho conhecido
+        size = None if response.is_streamed else response.calculate_content_length()
+        _finish_request(app, response.status_code, size)
+        return response
+
+    @app.teardown_request
+    def _metrics_teardown_request(exc):
+        if exc is not None:
+            _finish_request(app, 500, None)
@@ -0,0 +1,145 @@
+import re
+
+from sqlalchemy.orm import joinedload
+
+from app import db, Course, Lesson, Module, ModuleLink
+from helpers.lesson_progress import serialize_lesson
+
+# Tabela module: a hierarquia de pastas de cada curso materializada a partir de Lesson.module,
+# com pai, ordem e contagens por no. A raiz do curso e o no de caminho '' (aulas soltas na pasta
+# do curso e totais do curso). Reconstruida (upsert por caminho, ids estaveis) no fim de cada
+# scan; a conclusao de aulas ajusta as contagens sem reconstruir.
+
+
+def _natural_key(name):
+    """"Aula 2" antes de "Aula 10" (mesma ordem do sidebar: numerica, sem diferenciar maiusculas)."""
+    return [int(part) if part.isdigit() else part.casefold() for part in re.split(r'(\d+)', name)]
+
+
+def _ancestors(path):
+    """'A/B/C' -> ['', 'A', 'A/B', 'A/B/C'] (a raiz do curso e '')."""
+    if not path:
+        return ['']
+    parts = path.split('/')
+    return [''] + ['/'.join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+
+def rebuild_module_tree(course_id):
+    """Sincroniza a arvore de modulos do curso com as aulas ativas. Nao faz commit."""
+    rows = db.session.query(
+        Lesson.module,
+        db.func.count(Lesson.id),
+        db.func.sum(db.case((Lesson.isCompleted == 1, 1), else_=0)),
+        db.func.sum(Lesson.duration_seconds),
+    ).filter(Lesson.course_id == course_id, Lesson.is_active == 1).group_by(Lesson.module)
+
+    # Contagens de cada pasta somadas em todas as pastas acima dela
+    totals = {}
+    for module, lessons, completed, duration in rows:
+        for path in _ancestors(module):
+            counts = totals.setdefault(path, [0, 0, 0])
+            counts[0] += lessons
+            counts[1] += int(completed or 0)
+            counts[2] += int(duration or 0)
+
+    existing = {m.path: m for m in Module.query.filter_by(course_id=course_id)}
+    nodes = {}
+    # Ordenar os caminhos por componentes ja da a pre-ordem (pai antes dos filhos)
+    ordered = sorted(totals, key=lambda p: [_natural_key(part) for part in p.split('/')] if p else [])
+    for position, path in enumerate(ordered):
+        parent_path, _, name = path.rpartition('/')
+        node = existing.pop(path, None)
+        if node is None:
+            node = Module(course_id=course_id, path=path)
+            db.session.add(node)
+        node.name = name
+        node.parent = nodes.get(parent_path) if path else None
+        node.depth = path.count('/') + 1 if path else 0
+        node.position = position
+        node.lesson_count, node.completed_count, node.duration_seconds = totals[path]
+        nodes[path] = node
+
+    # Pastas sem aulas ativas saem da arvore (com elas, todas as subpastas)
+    for node in existing.values():
+        db.session.delete(node)
+
+
+def adjust_completed_counts(course_id, module, delta):
+    """Soma delta a conclusao do modulo da aula e de todos os modulos acima. Nao faz commit."""
+    if not delta:
+        return
+    Module.query.filter(Module.course_id == course_id, Module.path.in_(_ancestors(module))).update(
+        {Module.completed_count: Module.completed_count + delta}, synchronize_session=False)
+
+
+def delete_module_tree(course_id):
+    """Remove a arvore do curso (exclusao do curso). Nao faz commit."""
+    Module.query.filter_by(course_id=course_id).update({Module.parent_id: None}, synchronize_session=False)
+    Module.query.filter_by(course_id=course_id).delete(synchronize_session=False)
+
+
+def _serialize_node(node):
+    return {
+        'id': node.id,
+        'name': node.name,
+        'path': node.path,
+        'depth': node.depth,
+        'lesson_count': node.lesson_count,
+        'completed_count': node.completed_count,
+        'duration_seconds': node.duration_seconds,
+        'completion_percentage': node.completed_count / node.lesson_count * 100 if node.lesson_count else 0,
+        'links': [],
+        'lessons': [],
+        'children': [],
+    }
+
+
+def module_tree(course_id, include_lessons=False):
+    """Sumario do curso: totais do curso e modulos aninhados na ordem do scan, com contagens e
+    links de questoes. Com include_lessons, cada no traz as suas aulas completas (uma consulta a mais)."""
+    root = None
+    by_id = {}
+    by_path = {}
+    for node in Module.query.filter_by(course_id=course_id).order_by(Module.position):
+        item = _serialize_node(node)
+        by_id[node.id] = item
+        by_path[node.path] = item
+        parent = by_id.get(node.parent_id)
+        if parent is not None:
+            parent['children'].append(item)
+        elif not node.path:
+            root = item
+    if root is None:
+        # Curso sem aulas ativas (ou ainda nao escaneado)
+        root = _serialize_node(Module(path='', name='', depth=0, lesson_count=0, completed_count=0,
+                                      duration_seconds=0))
+        by_path[''] = root
+
+    for link in ModuleLink.query.filter_by(course_id=course_id).order_by(ModuleLink.id):
+        item = by_path.get(link.module_name)
+        if item is not None and item is not root:
+            item['links'].append({'id': link.id, 'label': link.label or 'Questoes', 'url': link.questions_url})
+
+    if include_lessons:
+        # Mesmo formato de /api/courses/<id>/lessons: o sidebar do curso le as aulas daqui
+        lessons = Lesson.query.filter(Lesson.course_id == course_id, Lesson.is_active == 1).options(
+            joinedload(Lesson.course))
+        for lesson in sorted(lessons, key=lambda l: _natural_key(l.title)):
+            by_path.get(lesson.module or '', root)['lessons'].append(serialize_lesson(lesson))
+
+    return {
+        'course_id': course_id,
+        'lesson_count': root['lesson_count'],
+        'completed_count': root['completed_count'],
+        'duration_seconds': root['duration_seconds'],
+        'completion_percentage': root['completion_percentage'],
+        'lessons': root['lessons'],
+        'modules': root['children'],
+    }
+
+
+def rebuild_all_module_trees():
+    """Preenche a arvore de todos os cursos (bancos anteriores a tabela module)."""
+    for (course_id,) in db.session.query(Course.id):
+        rebuild_module_tree(course_id)
+    db.session.commit()
@@ -0,0 +1,121 @@
+import os
+import re
+import glob
+import time
+import threading
+
+from app import db, Note
+from helpers.image_variants import remove_variants
+
+# Imagens de anotacoes sao salvas como <img src="http://host:porta/uploads/note-images/...">
+NOTE_IMAGE_SRC_RE = re.compile(r'src="[^"]*?/uploads/(note-images/[^"?#]+)[^"]*"')
+# Qualquer mencao a um arquivo de note-images (HTML das notas ou JSON exportado)
+NOTE_IMAGE_REF_RE = re.compile(r'note-images/([0-9A-Za-z_.-]+)')
+
+# Imagens recem-enviadas ainda podem nao estar salvas em nenhuma nota
+GC_GRACE_SECONDS = 24 * 3600
+
+# Estado do ultimo GC (mesmo padrao de scan_progress)
+gc_progress = {"running": False, "done": True}
+_gc_lock = threading.Lock()
+
+
+def note_images_dir(root_path):
+    return os.path.join(root_path, 'uploads', 'note-images')
+
+
+def referenced_images(content):
+    """Nomes de arquivo de note-images referenciados em um HTML de anotacao."""
+    return {os.path.basename(m) for m in NOTE_IMAGE_SRC_RE.findall(content or '')}
+
+
+def count_image_references(root_path):
+    """Contagem de referencias por arquivo: notas no banco + exportacoes JSON de cursos deletados."""
+    counts = {}
+    for (content,) in db.session.query(Note.content).filter(
+        Note.content.like('%note-images/%')
+    ).yield_per(500):
+        for name in NOTE_IMAGE_REF_RE.findall(content):
+            counts[name] = counts.get(name, 0) + 1
+
+    export_dir = os.path.join(root_path, 'uploads', 'notas-exportadas')
+    for export_file in glob.glob(os.path.join(export_dir, '*.json')):
+        try:
+            with open(export_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    for name in NOTE_IMAGE_REF_RE.findall(line):
+                        counts[name] = counts.get(name, 0) + 1
+        except (IOError, UnicodeDecodeError):
+            continue
+    return counts
+
+
+def release_note_images(names, root_path, grace_seconds=GC_GRACE_SECONDS):
+    """Remove imagens que deixaram de ser referenciadas apos editar/excluir uma nota.
+    Chamar depois do commit; exportacoes JSON tambem contam como referencia. Arquivos enviados
+    (ou reenviados, o upload deduplicado renova o mtime) dentro da carencia ficam: podem estar
+    numa nota ainda nao salva; o GC periodico remove depois."""
+    if not names:
+        return 0
+    upload_dir = note_images_dir(root_path)
+    counts = None
+    removed = 0
+    now = time.time()
+    for name in names:
+        try:
+            if now - os.stat(os.path.join(upload_dir, name)).st_mtime < grace_seconds:
+                continue
+        except FileNotFoundError:
+            pass  # so as variantes ainda podem existir
+        still_used = db.session.query(Note.id).filter(
+            Note.content.like(f'%note-images/{name}%')
+        ).first()
+        if still_used:
+            continue
+        if counts is None:
+            counts = count_image_references(root_path)
+        if counts.get(name):
+            continue
+        try:
+            os.remove(os.path.join(upload_dir, name))
+            removed += 1
+        except FileNotFoundError:
+            pass
+        remove_variants(os.path.dirname(upload_dir), f"note-images/{name}")
+    return removed
+
+
+def gc_note_images(root_path, grace_seconds=GC_GRACE_SECONDS):
+    """Varre note-images e remove arquivos sem nenhuma referencia (respeitando a carencia)."""
+    if not _gc_lock.acquire(blocking=False):
+        return None
+    try:
+        gc_progress.clear()
+        gc_progress.update({"running": True, "done": False, "scanned": 0, "removed": 0, "freed_bytes": 0})
+
+        counts = count_image_references(root_path)
+        upload_dir = note_images_dir(root_path)
+        now = time.time()
+        if os.path.isdir(upload_dir):
+            for entry in os.scandir(upload_dir):
+                if not entry.is_file():
+                    continue
+                gc_progress["scanned"] += 1
+                stat = entry.stat()
+                if counts.get(entry.name) or now - stat.st_mtime < grace_seconds:
+                    continue
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    continue
+                remove_variants(os.path.dirname(upload_dir), f"note-images/{entry.name}")
+                gc_progress["removed"] += 1
+                gc_progress["freed_bytes"] += stat.st_size
+
+        gc_progress.update({"running": False, "done": True, "referenced": len(counts)})
+        return dict(gc_progress)
+    except Exception:
+        gc_progress.update({"running": False, "done": True, "error": True})
+        raise
+    finally:
+        _gc_lock.release()
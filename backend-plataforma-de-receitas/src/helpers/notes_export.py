@@ -0,0 +1,399 @@
+import os
+import re
+import base64
+import hashlib
+import mimetypes
+import tempfile
+from html import escape
+from html.parser import HTMLParser
+from itertools import groupby, chain
+
+from app import db, Course, Lesson, Note
+from helpers.notes_pdf import format_timestamp_pdf, pdf_css, generate_pdf
+from helpers.note_images import NOTE_IMAGE_SRC_RE
+
+
+# -- Camada de consulta compartilhada --
+#
+# Cada consulta devolve um "documento": titulo, subtitulo e as linhas (Note, Lesson, Course)
+# ja ordenadas, mais as funcoes que definem a secao e o cabecalho de cada aula.
+# As linhas sao lidas em lotes (yield_per) e agrupadas em uma unica passada.
+
+def _sub_path(lesson, sep):
+    parts = lesson.module.split("/")[1:] if lesson.module and "/" in lesson.module else []
+    return sep.join(p.strip() for p in parts if p.strip())
+
+
+def _notes_rows():
+    return db.session.query(Note, Lesson, Course).join(
+        Lesson, Note.lesson_id == Lesson.id
+    ).join(
+        Course, Lesson.course_id == Course.id
+    )
+
+
+def query_lesson_notes(lesson):
+    """Anotacoes de uma aula (a Lesson ja carregada pela rota). Retorna None se ela nao tiver anotacoes."""
+    lesson_id = lesson.id
+    if not db.session.query(Note.id).filter_by(lesson_id=lesson_id).first():
+        return None
+
+    course = Course.query.get(lesson.course_id)
+    path_parts = []
+    if course and course.name:
+        path_parts.append(course.name)
+    if lesson.module:
+        path_parts.extend(p.strip() for p in lesson.module.split("/")[1:] if p.strip())
+    path_parts.append(lesson.title)
+
+    return {
+        'title': " > ".join(path_parts),
+        'subtitle': None,
+        'filename': f"notas-{lesson.title}",
+        'fallback_filename': f"notas-aula-{lesson_id}",
+        'rows': _notes_rows().filter(Note.lesson_id == lesson_id)
+                             .order_by(Note.timestamp.asc()).yield_per(500),
+        'section_key': lambda l, c: None,
+        'lesson_heading': lambda l, c: None,
+    }
+
+
+def query_course_notes(course_id):
+    """Anotacoes de um curso agrupadas por modulo > aula. Retorna None se nao houver anotacoes."""
+    course = Course.query.get(course_id)
+    has_notes = db.session.query(Note.id).join(Lesson, Note.lesson_id == Lesson.id).filter(
+        Lesson.course_id == course_id,
+        Lesson.is_active == 1
+    ).first()
+    if course is None or not has_notes:
+        return None
+
+    def lesson_heading(lesson, _course):
+        sub_path = "/".join(lesson.module.split("/")[1:]) if lesson.module and "/" in lesson.module else ""
+        return f"{sub_path} > {lesson.title}" if sub_path else lesson.title
+
+    return {
+        'title': course.name,
+        'subtitle': "Anotacoes do curso",
+        'filename': f"notas-{course.name}",
+        'fallback_filename': f"notas-curso-{course_id}",
+        'rows': _notes_rows().filter(
+            Lesson.course_id == course_id,
+            Lesson.is_active == 1
+        ).order_by(Lesson.hierarchy_path.asc(), Lesson.id.asc(), Note.timestamp.asc()).yield_per(500),
+        'section_key': lambda l, c: l.module.split("/")[0] if l.module else "(Raiz)",
+        'lesson_heading': lesson_heading,
+    }
+
+
+def query_daily_notes(date_obj, next_day):
+    """Anotacoes criadas em um dia, agrupadas por curso > aula. Retorna None se nao houver anotacoes."""
+    in_range = (Note.created_at >= date_obj, Note.created_at < next_day)
+    totals = db.session.query(
+        db.func.count(Note.id),
+        db.func.count(db.distinct(Lesson.course_id))
+    ).join(Lesson, Note.lesson_id == Lesson.id).filter(*in_range).one()
+    total_notes, total_courses = totals
+    if not total_notes:
+        return None
+
+    def lesson_heading(lesson, _course):
+        sub_path = _sub_path(lesson, " > ")
+        return f"{sub_path} > {lesson.title}" if sub_path else lesson.title
+
+    return {
+        'title': f"Revisao do dia {date_obj.strftime('%d/%m/%Y')}",
+        'subtitle': f"{total_notes} anotacoes em {total_courses} curso(s)",
+        'filename': f"revisao-{date_obj.strftime('%Y-%m-%d')}",
+        'fallback_filename': f"revisao-{date_obj.strftime('%Y-%m-%d')}",
+        'rows': _notes_rows().filter(*in_range).order_by(
+            Course.name.asc(), Course.id.asc(), Lesson.hierarchy_path.asc(), Lesson.id.asc(), Note.timestamp.asc()
+        ).yield_per(500),
+        'section_key': lambda l, c: c.name,
+        'lesson_heading': lesson_heading,
+    }
+
+
+def iter_sections(doc):
+    """Agrupa as linhas ordenadas em secao > aula > notas sem materializar a lista inteira.
+    Gera (titulo_secao, aulas), onde aulas gera (lesson, course, cabecalho, notas)."""
+    rows = doc['rows']
+    for section, section_rows in groupby(rows, key=lambda r: doc['section_key'](r[1], r[2])):
+        yield section, _iter_lessons(doc, section_rows)
+
+
+def _iter_lessons(doc, rows):
+    for _, lesson_rows in groupby(rows, key=lambda r: r[1].id):
+        note, lesson, course = next(lesson_rows)
+        notes = chain([note], (r[0] for r in lesson_rows))
+        yield lesson, course, doc['lesson_heading'](lesson, course), notes
+
+
+def note_link(doc, lesson, note):
+    """URL do frontend que abre a aula no instante da anotacao."""
+    base = doc.get('link_base')
+    if not base:
+        return None
+    return f"{base.rstrip('/')}/cursos/{lesson.course_id}?aula={lesson.id}&t={int(note.timestamp)}"
+
+
+def note_image_path(doc, relative):
+    """Caminho local de uma imagem referenciada (note-images/...), ou None se estiver fora de uploads."""
+    uploads_dir = doc.get('uploads_dir')
+    if not uploads_dir:
+        return None
+    root = os.path.realpath(uploads_dir)
+    full = os.path.realpath(os.path.join(root, relative))
+    if not full.startswith(root + os.sep) or not os.path.isfile(full):
+        return None
+    return full
+
+
+# -- HTML / PDF --
+
+def _iter_html(doc, css, inline_images=False, with_links=False):
+    image_cache = {}
+
+    def inline(match):
+        path = note_image_path(doc, match.group(1))
+        if not path:
+            return match.group(0)
+        if path not in image_cache:
+            mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+            with open(path, 'rb') as f:
+                image_cache[path] = f"data:{mimetype};base64,{base64.b64encode(f.read()).decode('ascii')}"
+        return f'src="{image_cache[path]}"'
+
+    yield f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{escape(doc['title'])}</title><style>{css}</style></head>
+<body>
+    <h1>{escape(doc['title'])}</h1>
+"""
+    if doc['subtitle']:
+        yield f'    <p class="course-name">{escape(doc["subtitle"])}</p>\n'
+
+    for section, lessons in iter_sections(doc):
+        if section is not None:
+            yield f'<h2>{escape(section)}</h2>'
+        for lesson, course, heading, notes in lessons:
+            if heading is not None:
+                yield f'<h3>{escape(heading)}</h3>'
+            for n in notes:
+                stamp = format_timestamp_pdf(n.timestamp)
+                link = note_link(doc, lesson, n) if with_links else None
+                if link:
+                    stamp = f'<a href="{escape(link)}">{stamp}</a>'
+                content = NOTE_IMAGE_SRC_RE.sub(inline, n.content) if inline_images else n.content
+                yield f'''
+                <div class="note">
+                    <p class="timestamp">{stamp}</p>
+                    {content}
+                </div>'''
+
+    yield "\n</body></html>"
+
+
+def render_pdf(doc):
+    """PDF via xhtml2pdf (mais lento: passa por um motor de layout)."""
+    return generate_pdf("".join(_iter_html(doc, pdf_css())))
+
+
+def render_html(doc):
+    """HTML unico e autocontido: CSS embutido e imagens como data URI."""
+    css = pdf_css().replace("@page { size: A4; margin: 2cm 2.5cm; }", "body { max-width: 800px; margin: 2em auto; }")
+    return _iter_html(doc, css, inline_images=True, with_links=True)
+
+
+# -- Markdown --
+
+class _MarkdownConverter(HTMLParser):
+    """Conversor HTML -> Markdown de uma passada para o subconjunto gerado pelo editor (tiptap)."""
+
+    INLINE = {'strong': '**', 'b': '**', 'em': '*', 'i': '*', 's': '~~', 'del': '~~', 'code': '`'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out = []
+        self.lists = []
+        self.in_pre = False
+        self.href = None
+        self.quote = 0
+        self.after_marker = False
+
+    def _newline(self):
+        if self.after_marker:
+            # <p> logo apos o marcador de <li>: manter na mesma linha
+            return
+        prefix = "> " * self.quote
+        self.out.append("\n" + prefix)
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag in self.INLINE and not self.in_pre:
+            self.out.append(self.INLINE[tag])
+        elif tag in ('p', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'):
+            self._newline()
+            if tag.startswith('h') and len(tag) == 2:
+                self.out.append("#" * min(int(tag[1]) + 2, 6) + " ")
+        elif tag == 'br':
+            self.out.append("\\")
+            self._newline()
+        elif tag in ('ul', 'ol'):
+            self.lists.append([tag, 0])
+        elif tag == 'li':
+            self.after_marker = False
+            self._newline()
+            indent = "   " * (len(self.lists) - 1)
+            if self.lists and self.lists[-1][0] == 'ol':
+                self.lists[-1][1] += 1
+                self.out.append(f"{indent}{self.lists[-1][1]}. ")
+            else:
+                self.out.append(f"{indent}- ")
+            self.after_marker = True
+            return
+        elif tag == 'pre':
+            self.in_pre = True
+            self._newline()
+            self.out.append("```")
+            self._newline()
+        elif tag == 'blockquote':
+            self.quote += 1
+            self._newline()
+        elif tag == 'a':
+            self.href = attrs.get('href')
+            self.out.append("[")
+        elif tag == 'img':
+            self.out.append(f"![{attrs.get('alt') or ''}]({attrs.get('src') or ''})")
+        self.after_marker = False
+
+    def handle_endtag(self, tag):
+        if tag in self.INLINE and not self.in_pre:
+            self.out.append(self.INLINE[tag])
+        elif tag in ('ul', 'ol'):
+            if self.lists:
+                self.lists.pop()
+        elif tag == 'pre':
+            self.in_pre = False
+            self._newline()
+            self.out.append("```")
+        elif tag == 'blockquote':
+            self.quote = max(0, self.quote - 1)
+        elif tag == 'a':
+            self.out.append(f"]({self.href or ''})")
+            self.href = None
+
+    def handle_data(self, data):
+        if not self.in_pre:
+            data = re.sub(r'\s+', ' ', data)
+        if data.strip():
+            self.after_marker = False
+        self.out.append(data)
+
+    def result(self):
+        text = re.sub(r'[ \t]+\n', "\n", "".join(self.out))
+        return re.sub(r'\n{3,}', "\n\n", text).strip()
+
+
+def html_to_markdown(html):
+    parser = _MarkdownConverter()
+    parser.feed(html or "")
+    parser.close()
+    return parser.result()
+
+
+def render_markdown(doc):
+    yield f"# {doc['title']}\n\n"
+    if doc['subtitle']:
+        yield f"_{doc['subtitle']}_\n\n"
+    for section, lessons in iter_sections(doc):
+        if section is not None:
+            yield f"## {section}\n\n"
+        for lesson, course, heading, notes in lessons:
+            if heading is not None:
+                yield f"### {heading}\n\n"
+            for n in notes:
+                stamp = format_timestamp_pdf(n.timestamp)
+                link = note_link(doc, lesson, n)
+                yield f"**[{stamp}]({link})**\n\n" if link else f"**{stamp}**\n\n"
+                yield html_to_markdown(n.content) + "\n\n"
+
+
+# -- Anki (.apkg) --
+
+ANKI_MODEL_ID = 1607392319
+ANKI_MODEL_CSS = ".card { font-family: Helvetica, Arial, sans-serif; font-size: 18px; text-align: left; }" \
+                 " .path { color: #555; font-size: 14px; } img { max-width: 100%; }"
+
+
+def _anki_id(value):
+    """Id estavel (31 bits) a partir de uma string, para que reimportar atualize em vez de duplicar."""
+    return int(hashlib.sha1(value.encode('utf-8')).hexdigest()[:8], 16) >> 1
+
+
+def render_anki(doc):
+    """Baralho Anki: um cartao por anotacao (frente = aula + instante, verso = conteudo).
+    Imagens referenciadas sao empacotadas como midia do baralho."""
+    import genanki
+
+    model = genanki.Model(
+        ANKI_MODEL_ID,
+        'Plataforma de Cursos - Anotacao',
+        fields=[{'name': 'Aula'}, {'name': 'Instante'}, {'name': 'Anotacao'}, {'name': 'Id'}],
+        templates=[{
+            'name': 'Anotacao',
+            'qfmt': '<div class="path">{{Aula}}</div><div>{{Instante}}</div>',
+            'afmt': '{{FrontSide}}<hr id="answer">{{Anotacao}}',
+        }],
+        css=ANKI_MODEL_CSS,
+    )
+    deck = genanki.Deck(_anki_id(doc['title']), doc['title'])
+    media = {}
+
+    def to_media(match):
+        path = note_image_path(doc, match.group(1))
+        if not path:
+            return match.group(0)
+        name = os.path.basename(path)
+        media[name] = path
+        return f'src="{escape(name)}"'
+
+    for section, lessons in iter_sections(doc):
+        for lesson, course, heading, notes in lessons:
+            breadcrumb = " > ".join(p for p in (section, heading) if p) or doc['title']
+            for n in notes:
+                stamp = format_timestamp_pdf(n.timestamp)
+                link = note_link(doc, lesson, n)
+                instant = f'<a href="{escape(link)}">{stamp}</a>' if link else stamp
+                deck.add_note(genanki.Note(
+                    model=model,
+                    fields=[escape(breadcrumb), instant, NOTE_IMAGE_SRC_RE.sub(to_media, n.content), str(n.id)],
+                    guid=genanki.guid_for('plataforma-cursos-note', n.id),
+                ))
+
+    # genanki so grava em arquivo; o temporario e removido pelo chamador apos o envio
+    fd, out_path = tempfile.mkstemp(suffix='.apkg')
+    os.close(fd)
+    package = genanki.Package(deck)
+    package.media_files = list(media.values())
+    package.write_to_file(out_path)
+    return out_path
+
+
+# -- Registro de exportadores --
+#
+# 'kind' define como a rota entrega o resultado:
+#   stream -> gerador de str enviado em partes
+#   buffer -> BytesIO (ou None em caso de erro)
+#   file   -> caminho de arquivo temporario
+
+EXPORTERS = {}
+
+
+def register_exporter(fmt, render, mimetype, extension, kind):
+    EXPORTERS[fmt] = {'render': render, 'mimetype': mimetype, 'extension': extension, 'kind': kind}
+
+
+register_exporter('pdf', render_pdf, 'application/pdf', 'pdf', 'buffer')
+register_exporter('md', render_markdown, 'text/markdown; charset=utf-8', 'md', 'stream')
+register_exporter('html', render_html, 'text/html; charset=utf-8', 'html', 'stream')
+register_exporter('anki', render_anki, 'application/apkg', 'apkg', 'file')
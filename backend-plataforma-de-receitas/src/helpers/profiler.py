@@ -0,0 +1,256 @@
+import os
+import sys
+import time
+import uuid
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import request
+
+# Profiler por amostragem para investigar scans, exportacoes e requisicoes lentas.
+# Uma sessao escolhe um alvo; so as threads que estiverem executando esse alvo sao amostradas
+# (sys._current_frames) e o resultado vira pilhas colapsadas (formato do flamegraph.pl / speedscope)
+# em uploads/profiles. Sem sessao ativa, profiled() so compara uma variavel global.
+
+TARGETS = ('scan', 'export', 'add-all', 'path')
+DEFAULT_INTERVAL_MS = 5
+MIN_INTERVAL_MS = 1
+DEFAULT_DURATION_SECONDS = 60
+MAX_DURATION_SECONDS = 900
+# Pilhas mais profundas que isso sao truncadas na raiz
+MAX_STACK_DEPTH = 200
+PROFILES_SUBDIR = 'profiles'
+
+_SRC_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_session = None
+_session_lock = threading.Lock()
+# Ultimas sessoes finalizadas (resumo), mais recente primeiro
+_history = []
+HISTORY_SIZE = 20
+
+
+class _Session:
+    def __init__(self, target, path_prefix, interval, duration, output_dir):
+        self.id = uuid.uuid4().hex[:8]
+        self.target = target
+        self.path_prefix = path_prefix
+        self.interval = interval
+        self.deadline = time.monotonic() + duration
+        self.output_dir = output_dir
+        self.started_at = datetime.now()
+        self.stacks = Counter()
+        self.samples = 0
+        self.threads = {}  # ident -> [rotulo, profundidade de profiled() aninhados]
+        self.lock = threading.Lock()  # threads, stacks, samples e closed
+        self.closed = False
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.result = None
+
+    def attach(self, ident, label):
+        with self.lock:
+            entry = self.threads.get(ident)
+            if entry is None:
+                self.threads[ident] = [label, 1]
+            else:
+                entry[1] += 1
+
+    def detach(self, ident):
+        with self.lock:
+            entry = self.threads.get(ident)
+            if entry is not None:
+                entry[1] -= 1
+                if entry[1] <= 0:
+                    del self.threads[ident]
+
+    def status(self):
+        return {
+            'id': self.id,
+            'target': self.target,
+            'path': self.path_prefix,
+            'interval_ms': round(self.interval * 1000, 2),
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'seconds_left': max(0, round(self.deadline - time.monotonic(), 1)),
+            'samples': self.samples,
+            'threads': len(self.threads),
+        }
+
+
+def _frame_label(code):
+    filename = code.co_filename
+    if filename.startswith(_SRC_ROOT):
+        filename = os.path.relpath(filename, _SRC_ROOT)
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(';', ':')
+
+
+def _collapse(frame, label):
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        names.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    names.append(label)
+    return ';'.join(reversed(names))
+
+
+def _sample_loop(session):
+    while not session.stop_event.wait(session.interval):
+        if time.monotonic() >= session.deadline:
+            break
+        with session.lock:
+            targets = {ident: entry[0] for ident, entry in session.threads.items()}
+        if not targets:
+            continue
+        frames = sys._current_frames()
+        collected = [_collapse(frames[ident], label) for ident, label in targets.items() if ident in frames]
+        del frames
+        with session.lock:
+            # stop_session pode ter gravado o perfil sem esperar esta thread (join com timeout)
+            if session.closed:
+                break
+            session.stacks.update(collected)
+            session.samples += len(collected)
+    _finish(session)
+
+
+def _finish(session):
+    global _session
+    with _session_lock:
+        if _session is session:
+            _session = None
+        if session.result is not None:
+            return session.result
+        with session.lock:
+            session.closed = True
+            stacks = Counter(session.stacks)
+
+        filename = None
+        if stacks:
+            os.makedirs(session.output_dir, exist_ok=True)
+            filename = f"{session.started_at.strftime('%Y%m%d-%H%M%S')}-{session.target}-{session.id}.folded"
+            with open(os.path.join(session.output_dir, filename), 'w', encoding='utf-8') as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+
+        session.result = {
+            **session.status(),
+            'seconds_left': 0,
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+            'file': filename,
+            'url': f"/uploads/{PROFILES_SUBDIR}/{filename}" if filename else None,
+            'top_frames': _top_frames(stacks),
+        }
+        _history.insert(0, session.result)
+        del _history[HISTORY_SIZE:]
+        return session.result
+
+
+def _top_frames(stacks, limit=15):
+    """Funcoes com mais amostras no topo da pilha (tempo proprio)."""
+    self_time = Counter()
+    for stack, count in stacks.items():
+        self_time[stack.rsplit(';', 1)[-1]] += count
+    total = sum(self_time.values()) or 1
+    return [{'frame': frame, 'samples': count, 'percent': round(count * 100 / total, 1)}
+            for frame, count in self_time.most_common(limit)]
+
+
+def start_session(target, output_dir, path_prefix=None, interval_ms=DEFAULT_INTERVAL_MS,
+                  duration_seconds=DEFAULT_DURATION_SECONDS):
+    """Inicia uma sessao; retorna (status, erro). So uma sessao por vez."""
+    global _session
+    if target not in TARGETS:
+        return None, f'Alvo invalido. Use: {", ".join(TARGETS)}'
+    if target == 'path' and not (path_prefix or '').startswith('/'):
+        return None, 'Informe o caminho da requisicao (ex.: /api/courses).'
+    interval = max(MIN_INTERVAL_MS, interval_ms) / 1000
+    duration = min(max(1, duration_seconds), MAX_DURATION_SECONDS)
+
+    with _session_lock:
+        if _session is not None:
+            return None, 'Ja existe uma sessao de profiling ativa.'
+        session = _Session(target, path_prefix if target == 'path' else None, interval, duration, output_dir)
+        _session = session
+    session.thread = threading.Thread(target=_sample_loop, args=(session,), name='sampling-profiler', daemon=True)
+    session.thread.start()
+    return session.status(), None
+
+
+def stop_session():
+    """Encerra a sessao ativa e grava o perfil; None se nao havia sessao."""
+    session = _session
+    if session is None:
+        return None
+    session.stop_event.set()
+    if session.thread is not None:
+        session.thread.join(timeout=5)  # a thread de amostragem grava o perfil ao sair
+    return _finish(session)
+
+
+def profiler_status():
+    session = _session
+    return {
+        'active': session.status() if session is not None else None,
+        'recent': list(_history),
+    }
+
+
+def list_profiles(output_dir):
+    if not os.path.isdir(output_dir):
+        return []
+    profiles = []
+    for entry in os.scandir(output_dir):
+        if entry.is_file() and entry.name.endswith('.folded'):
+            st = entry.stat()
+            profiles.append({
+                'file': entry.name,
+                'url': f"/uploads/{PROFILES_SUBDIR}/{entry.name}",
+                'size': st.st_size,
+                'modified_at': datetime.fromtimestamp(st.st_mtime).isoformat(timespec='seconds'),
+            })
+    return sorted(profiles, key=lambda p: p['modified_at'], reverse=True)
+
+
+@contextmanager
+def profiled(kind):
+    """Marca a thread atual como executando um alvo (scan, export, add-all) enquanto durar o bloco.
+    Tambem serve como decorador. Sem sessao ativa para esse alvo, nao faz nada."""
+    session = _session
+    if session is None or session.target != kind:
+        yield
+        return
+    ident = threading.get_ident()
+    session.attach(ident, kind)
+    try:
+        yield
+    finally:
+        session.detach(ident)
+
+
+def profiled_iter(kind, iterable):
+    """Como profiled(), para respostas em streaming: amostra enquanto o corpo e gerado."""
+    with profiled(kind):
+        yield from iterable
+
+
+def init_profiler(app):
+    """Registra os hooks do alvo 'path'. Com PROFILER_ENABLED desligado nada e registrado."""
+    if not app.config.get('PROFILER_ENABLED'):
+        return
+
+    @app.before_request
+    def _profiler_before_request():
+        session = _session
+        if session is not None and session.target == 'path' and request.path.startswith(session.path_prefix):
+            session.attach(threading.get_ident(), f"{request.method} {request.path}")
+            request.environ['profiler.session'] = session
+
+    @app.teardown_request
+    def _profiler_teardown_request(exc):
+        session = request.environ.pop('profiler.session', None)
+        if session is not None:
+            session.detach(threading.get_ident())
@@ -0,0 +1,108 @@
+import os
+import re
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+SUBTITLE_MIMETYPE = 'text/vtt; charset=utf-8'
+# Legendas convertidas mantidas em memoria (chave: caminho + mtime + tamanho)
+CACHE_MAX_ENTRIES = 256
+GZIP_LEVEL = 6
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+_TIMESTAMP_RE = re.compile(r'(\d{1,2}:)?(\d{1,2}):(\d{2})[,.](\d{1,3})')
+_ARROW_LINE_RE = re.compile(r'^\s*(\S+)\s*-->\s*(\S+)(.*)$')
+# Tags que o WebVTT nao entende: <font ...>, estilos ASS como {\an8}
+_FONT_TAG_RE = re.compile(r'</?font[^>]*>', re.IGNORECASE)
+_ASS_TAG_RE = re.compile(r'\{\\[^}]*\}')
+
+
+def decode_subtitle(raw):
+    """Decodifica bytes de legenda: BOM (UTF-8/UTF-16), UTF-8 e, por fim, CP1252/Latin-1,
+    comuns em legendas antigas em portugues."""
+    if raw.startswith(b'\xef\xbb\xbf'):
+        return raw[3:].decode('utf-8', errors='replace')
+    if raw.startswith((b'\xff\xfe', b'\xfe\xff')):
+        return raw.decode('utf-16', errors='replace')
+    try:
+        return raw.decode('utf-8')
+    except UnicodeDecodeError:
+        pass
+    try:
+        return raw.decode('cp1252')
+    except UnicodeDecodeError:
+        return raw.decode('latin-1')
+
+
+def _vtt_timestamp(value):
+    match = _TIMESTAMP_RE.fullmatch(value)
+    if not match:
+        return value
+    hours = (match.group(1) or '0:')[:-1]
+    return f"{int(hours):02d}:{int(match.group(2)):02d}:{match.group(3)}.{match.group(4).ljust(3, '0')}"
+
+
+def srt_to_vtt(text):
+    """Converte SRT em WebVTT: cabecalho, virgula -> ponto nos tempos e remocao de tags sem suporte."""
+    text = text.replace('\r\n', '\n').replace('\r', '\n').lstrip('\ufeff')
+    lines = ['WEBVTT', '']
+    for line in text.split('\n'):
+        arrow = _ARROW_LINE_RE.match(line)
+        if arrow:
+            start, end, settings = arrow.groups()
+            lines.append(f"{_vtt_timestamp(start)} --> {_vtt_timestamp(end)}{settings}")
+            continue
+        lines.append(_ASS_TAG_RE.sub('', _FONT_TAG_RE.sub('', line)))
+    return '\n'.join(lines).rstrip('\n') + '\n'
+
+
+def normalize_vtt(text):
+    text = text.replace('\r\n', '\n').replace('\r', '\n').lstrip('\ufeff')
+    if not text.startswith('WEBVTT'):
+        text = 'WEBVTT\n\n' + text
+    return text
+
+
+def convert_subtitle(path):
+    with open(path, 'rb') as f:
+        text = decode_subtitle(f.read())
+    if path.lower().endswith('.srt'):
+        return srt_to_vtt(text)
+    return normalize_vtt(text)
+
+
+def get_vtt(path):
+    """Retorna {'body', 'etag', 'mtime', 'gzip'} da legenda convertida, do cache se o arquivo
+    nao mudou (mesmo mtime e tamanho). gzip e gerado na primeira requisicao que aceitar."""
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None:
+            _cache.move_to_end(key)
+            return entry
+
+    body = convert_subtitle(path).encode('utf-8')
+    entry = {
+        'body': body,
+        'etag': hashlib.sha1(f"{path}:{st.st_mtime_ns}:{st.st_size}".encode('utf-8', 'surrogateescape')).hexdigest()[:20],
+        'mtime': st.st_mtime,
+        'gzip': None,
+    }
+    with _cache_lock:
+        # Versao anterior do mesmo arquivo nao sera mais pedida
+        for old_key in [k for k in _cache if k[0] == path]:
+            del _cache[old_key]
+        _cache[key] = entry
+        while len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return entry
+
+
+def gzipped(entry):
+    if entry['gzip'] is None:
+        entry['gzip'] = gzip.compress(entry['body'], compresslevel=GZIP_LEVEL, mtime=0)
+    return entry['gzip']
@@ -0,0 +1,306 @@
+import re
+import copy
+import json
+import time
+import atexit
+import threading
+from collections import deque
+
+from app import db, TimerState
+
+# Estado "quente" do timer: mantido em memoria e gravado no banco periodicamente.
+# Cada alteracao incrementa a versao; escritas com versao esperada diferente sao rejeitadas.
+# Com varios processos no mesmo banco, a gravacao e um compare-and-swap na versao lida do banco
+# (synced_version): quem perde adota o estado do banco, e cada processo confere a versao gravada
+# a cada intervalo para receber as alteracoes dos outros.
+FLUSH_INTERVAL_SECONDS = 5
+# Historico curto de deltas para enviar apenas o patch a quem esta uma versao atras
+PATCH_LOG_SIZE = 100
+SUBSCRIBER_HEARTBEAT_SECONDS = 15
+
+_condition = threading.Condition()
+_hot = {'loaded': False, 'version': 0, 'state': {}, 'dirty': False, 'synced_version': 0}
+_patch_log = deque(maxlen=PATCH_LOG_SIZE)
+_flusher = None
+_flush_lock = threading.Lock()
+
+
+class JsonPatchError(ValueError):
+    pass
+
+
+class VersionConflict(Exception):
+    def __init__(self, version, state):
+        super().__init__('versao desatualizada')
+        self.version = version
+        self.state = state
+
+
+# -- JSON Patch (RFC 6902) --
+
+# Indice de array do RFC 6901: sem sinal nem zeros a esquerda ("-1" e "+1" nao sao indices)
+_ARRAY_INDEX = re.compile(r'0|[1-9][0-9]*')
+
+
+def _parse_pointer(path):
+    if not isinstance(path, str):
+        raise JsonPatchError(f'Caminho invalido: {path!r}')
+    if path == '':
+        return []
+    if not path.startswith('/'):
+        raise JsonPatchError(f'Caminho invalido: {path}')
+    return [p.replace('~1', '/').replace('~0', '~') for p in path[1:].split('/')]
+
+
+def _array_index(token):
+    if not _ARRAY_INDEX.fullmatch(token):
+        raise JsonPatchError(f'Indice invalido: {token}')
+    return int(token)
+
+
+def _resolve_parent(doc, tokens):
+    target = doc
+    for token in tokens[:-1]:
+        if isinstance(target, list):
+            index = _array_index(token)
+            if index >= len(target):
+                raise JsonPatchError(f'Indice invalido: {token}')
+            target = target[index]
+        elif isinstance(target, dict) and token in target:
+            target = target[token]
+        else:
+            raise JsonPatchError(f'Caminho inexistente: {token}')
+    return target
+
+
+def _list_index(target, token, allow_end=False):
+    if allow_end and token == '-':
+        return len(target)
+    index = _array_index(token)
+    limit = len(target) if allow_end else len(target) - 1
+    if index > limit:
+        raise JsonPatchError(f'Indice fora do intervalo: {token}')
+    return index
+
+
+def _get(doc, tokens):
+    if not tokens:
+        return doc
+    parent = _resolve_parent(doc, tokens)
+    token = tokens[-1]
+    if isinstance(parent, list):
+        return parent[_list_index(parent, token)]
+    if isinstance(parent, dict) and token in parent:
+        return parent[token]
+    raise JsonPatchError(f'Caminho inexistente: {token}')
+
+
+def _add(doc, tokens, value):
+    if not tokens:
+        return value
+    parent = _resolve_parent(doc, tokens)
+    token = tokens[-1]
+    if isinstance(parent, list):
+        parent.insert(_list_index(parent, token, allow_end=True), value)
+    elif isinstance(parent, dict):
+        parent[token] = value
+    else:
+        raise JsonPatchError(f'Destino invalido: {token}')
+    return doc
+
+
+def _remove(doc, tokens):
+    if not tokens:
+        raise JsonPatchError('Nao e possivel remover a raiz')
+    parent = _resolve_parent(doc, tokens)
+    token = tokens[-1]
+    if isinstance(parent, list):
+        return parent.pop(_list_index(parent, token))
+    if isinstance(parent, dict) and token in parent:
+        return parent.pop(token)
+    raise JsonPatchError(f'Caminho inexistente: {token}')
+
+
+def apply_json_patch(doc, operations):
+    """Aplica uma lista de operacoes JSON Patch sobre uma copia de doc e retorna o resultado."""
+    if not isinstance(operations, list):
+        raise JsonPatchError('O patch deve ser uma lista de operacoes')
+    doc = copy.deepcopy(doc)
+    for op in operations:
+        if not isinstance(op, dict) or 'op' not in op or 'path' not in op:
+            raise JsonPatchError('Operacao invalida')
+        tokens = _parse_pointer(op['path'])
+        kind = op['op']
+        if kind == 'add':
+            doc = _add(doc, tokens, copy.deepcopy(op.get('value')))
+        elif kind == 'remove':
+            _remove(doc, tokens)
+        elif kind == 'replace':
+            if tokens:
+                _remove(doc, tokens)
+            doc = _add(doc, tokens, copy.deepcopy(op.get('value')))
+        elif kind == 'move':
+            value = _remove(doc, _parse_pointer(op.get('from', '')))
+            doc = _add(doc, tokens, value)
+        elif kind == 'copy':
+            value = copy.deepcopy(_get(doc, _parse_pointer(op.get('from', ''))))
+            doc = _add(doc, tokens, value)
+        elif kind == 'test':
+            if _get(doc, tokens) != op.get('value'):
+                raise JsonPatchError(f'Teste falhou em {op["path"]}')
+        else:
+            raise JsonPatchError(f'Operacao desconhecida: {kind}')
+    return doc
+
+
+# -- Estado quente --
+
+def _load_row():
+    """(versao, estado) gravados no banco, ou None se ainda nao ha linha."""
+    row = TimerState.query.order_by(TimerState.id).first()
+    if row is None:
+        return None
+    state = {}
+    if row.state_json:
+        try:
+            state = json.loads(row.state_json)
+        except (json.JSONDecodeError, TypeError):
+            state = {}
+    return row.version or 0, state
+
+
+def _ensure_loaded(app):
+    """Carrega o estado do banco na primeira chamada e inicia o gravador periodico."""
+    global _flusher
+    if _hot['loaded']:
+        return
+    version, state = _load_row() or (0, {})
+    _hot.update({'loaded': True, 'version': version, 'synced_version': version, 'state': state, 'dirty': False})
+
+    if _flusher is None:
+        _flusher = threading.Thread(target=_flush_loop, args=(app,), name='timer-state-flush')
+        _flusher.daemon = True
+        _flusher.start()
+        atexit.register(flush_timer_state, app)
+
+
+def get_timer_state(app):
+    with _condition:
+        _ensure_loaded(app)
+        return _hot['version'], _hot['state']
+
+
+def _commit_change(new_state, patch, client_id):
+    _hot['state'] = new_state
+    _hot['version'] += 1
+    _hot['dirty'] = True
+    _patch_log.append({'version': _hot['version'], 'patch': patch, 'client_id': client_id})
+    _condition.notify_all()
+    return _hot['version']
+
+
+def replace_timer_state(app, state, expected_version=None, client_id=None):
+    """Substitui o estado inteiro (PUT/sendBeacon). Sem expected_version, ultimo a escrever vence."""
+    with _condition:
+        _ensure_loaded(app)
+        if expected_version is not None and expected_version != _hot['version']:
+            raise VersionConflict(_hot['version'], _hot['state'])
+        return _commit_change(state, [{'op': 'replace', 'path': '', 'value': state}], client_id)
+
+
+def patch_timer_state(app, operations, expected_version, client_id=None):
+    """Aplica um delta JSON Patch se expected_version for a versao atual. Retorna a nova versao."""
+    with _condition:
+        _ensure_loaded(app)
+        if expected_version != _hot['version']:
+            raise VersionConflict(_hot['version'], _hot['state'])
+        new_state = apply_json_patch(_hot['state'], operations)
+        if new_state == _hot['state']:
+            return _hot['version']
+        return _commit_change(new_state, operations, client_id)
+
+
+def changes_since(version):
+    """Patches desde version (se ainda estiverem no historico) ou None para enviar o estado inteiro."""
+    entries = [e for e in _patch_log if e['version'] > version]
+    if not entries or entries[0]['version'] != version + 1:
+        return None
+    return entries
+
+
+def wait_for_change(app, version, timeout=SUBSCRIBER_HEARTBEAT_SECONDS):
+    """Bloqueia ate a versao mudar (ou timeout). Retorna (versao, evento) ou (version, None)."""
+    with _condition:
+        _ensure_loaded(app)
+        _condition.wait_for(lambda: _hot['version'] != version, timeout=timeout)
+        if _hot['version'] == version:
+            return version, None
+        entries = changes_since(version)
+        if entries is not None:
+            return _hot['version'], {'version': _hot['version'], 'patches': entries}
+        return _hot['version'], {'version': _hot['version'], 'state': _hot['state']}
+
+
+# -- Persistencia periodica --
+
+def _store(version, state, base_version):
+    """Grava o estado se a versao no banco ainda for base_version. Retorna False se outro
+    processo gravou antes. Nao faz commit."""
+    values = {'state_json': json.dumps(state, ensure_ascii=False), 'version': version}
+    row_id = db.session.query(TimerState.id).order_by(TimerState.id).limit(1).scalar()
+    if row_id is None:
+        # Id fixo: se dois processos criam a linha ao mesmo tempo, o segundo falha na chave primaria
+        db.session.execute(db.insert(TimerState).values(id=1, **values))
+        return True
+    result = db.session.execute(db.update(TimerState).where(
+        TimerState.id == row_id, TimerState.version == base_version).values(**values))
+    return result.rowcount == 1
+
+
+def _adopt(row_version, state):
+    """Troca o estado em memoria pelo gravado por outro processo. A versao nunca volta: se a do
+    banco nao passa da local, o estado adotado ganha a versao seguinte e e regravado, para os
+    inscritos e os outros processos verem a mudanca. Chamado com _condition."""
+    version = max(row_version, _hot['version'] + 1)
+    _hot.update({'version': version, 'synced_version': row_version, 'state': state,
+                 'dirty': version != row_version})
+    # Os patches locais nao levam ao estado adotado: os inscritos recebem o estado inteiro
+    _patch_log.clear()
+    _condition.notify_all()
+
+
+def flush_timer_state(app):
+    """Grava o estado se mudou e adota o que outro processo gravou desde a ultima gravacao."""
+    with _flush_lock:
+        with _condition:
+            if not _hot['loaded']:
+                return
+            dirty, version, state = _hot['dirty'], _hot['version'], _hot['state']
+            base_version = _hot['synced_version']
+            _hot['dirty'] = False
+        try:
+            with app.app_context():
+                if dirty and _store(version, state, base_version):
+                    db.session.commit()
+                    with _condition:
+                        _hot['synced_version'] = version
+                    return
+                db.session.rollback()
+                row = _load_row()
+        except Exception:
+            if dirty:
+                with _condition:
+                    _hot['dirty'] = True
+            return
+        if row is None:
+            return
+        with _condition:
+            # Alteracoes locais feitas sobre a versao que perdeu a disputa sao descartadas
+            if row[0] != _hot['synced_version']:
+                _adopt(*row)
+
+
+def _flush_loop(app):
+    while True:
+        time.sleep(FLUSH_INTERVAL_SECONDS)
+        flush_timer_state(app)
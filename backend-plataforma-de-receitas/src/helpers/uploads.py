@@ -0,0 +1,54 @@
+import os
+import re
+import hashlib
+import tempfile
+
+CHUNK_SIZE = 64 * 1024
+
+# Arquivos com nome derivado do conteudo (capas e imagens de notas) podem ser cacheados para sempre
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Pastas de uploads/ gravadas por store_content_addressed ('' = capas, na raiz)
+CONTENT_ADDRESSED_DIRS = ('', 'note-images')
+_HASH_NAME = re.compile(r'[0-9a-f]{64}')
+
+
+def store_content_addressed(stream, upload_dir, ext):
+    """Grava o upload em disco em blocos, calculando o SHA-256 no caminho.
+    O nome final e o hash do conteudo: bytes identicos sao armazenados uma unica vez.
+    Retorna o nome do arquivo."""
+    os.makedirs(upload_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=upload_dir, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+
+        filename = f"{digest.hexdigest()}{ext}"
+        final_path = os.path.join(upload_dir, filename)
+        if os.path.exists(final_path):
+            os.remove(tmp_path)
+            # Renovar mtime para a carencia do GC valer a partir deste reenvio
+            os.utime(final_path, None)
+        else:
+            os.replace(tmp_path, final_path)
+        return filename
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def is_content_addressed(subpath):
+    """True se o subcaminho de uploads/ e um arquivo com nome de hash (ou uma variante dele, em
+    .variants/, que mantem o hash no inicio do nome). Os demais (capas antigas, exportacoes,
+    perfis) podem ser sobrescritos com o mesmo nome."""
+    parts = subpath.replace('\\', '/').split('/')
+    if parts[0] == '.variants':
+        parts = parts[1:]
+    directory, name = '/'.join(parts[:-1]), parts[-1]
+    return directory in CONTENT_ADDRESSED_DIRS and _HASH_NAME.fullmatch(name.split('.')[0]) is not None
@@ -5,7 +5,11 @@ from .focus import bp as focus_bp
 from .files import bp as files_bp
 from .daily_readings import bp as daily_readings_bp
 from .module_links import bp as module_links_bp
+from .modules import bp as modules_bp
 from .study_days import bp as study_days_bp
+from .metrics import bp as metrics_bp
+from .profiler import bp as profiler_bp
+from .activity import bp as activity_bp
 
 
 def register_blueprints(app):
@@ -16,4 +20,8 @@ def register_blueprints(app):
     app.register_blueprint(files_bp)
     app.register_blueprint(daily_readings_bp)
     app.register_blueprint(module_links_bp)
+    app.register_blueprint(modules_bp)
     app.register_blueprint(study_days_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(profiler_bp)
+    app.register_blueprint(activity_bp)
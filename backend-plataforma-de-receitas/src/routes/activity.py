@@ -0,0 +1,81 @@
+from flask import Blueprint, request, jsonify, current_app
+
+from app import db, Course, Lesson, LessonActivity
+from helpers.metrics import query_budget
+from helpers.activity_log import flush_activity
+
+bp = Blueprint('activity', __name__)
+
+MAX_LIMIT = 100
+
+
+def _limit(default):
+    return max(1, min(request.args.get('limit', default, type=int), MAX_LIMIT))
+
+
+def _timestamp(value):
+    return value.isoformat() if value else None
+
+
+# Orcamento inclui a gravacao dos eventos pendentes (ate 3 consultas) antes da leitura
+@bp.route('/api/continue', methods=['GET'])
+@query_budget(4)
+def continue_watching():
+    """Aulas em andamento tocadas mais recentemente, de todos os cursos (?limit=, padrao 10)."""
+    flush_activity(current_app._get_current_object())
+    rows = db.session.query(
+        Lesson.id, Lesson.title, Lesson.module, Lesson.hierarchy_path, Lesson.video_url, Lesson.pdf_url,
+        Lesson.elapsed_seconds, Lesson.duration_seconds, Lesson.last_accessed_at,
+        Course.id.label('course_id'), Course.name.label('course_name'),
+        Course.isCoverUrl, Course.fileCover, Course.urlCover,
+    ).join(Course, Lesson.course_id == Course.id).filter(
+        Lesson.last_accessed_at.isnot(None),
+        Lesson.is_active == 1,
+        db.func.coalesce(Lesson.isCompleted, 0) != 1,
+    ).order_by(Lesson.last_accessed_at.desc(), Lesson.id.desc()).limit(_limit(10))
+
+    return jsonify([{
+        'id': r.id,
+        'title': r.title,
+        'module': r.module,
+        'hierarchy_path': r.hierarchy_path,
+        'video_url': r.video_url,
+        'pdf_url': r.pdf_url,
+        'time_elapsed': r.elapsed_seconds,
+        'duration': r.duration_seconds,
+        'progress_percentage': min(r.elapsed_seconds / r.duration_seconds * 100, 100) if r.duration_seconds else 0,
+        'last_accessed_at': _timestamp(r.last_accessed_at),
+        'course': {
+            'id': r.course_id,
+            'name': r.course_name,
+            'isCoverUrl': r.isCoverUrl,
+            'fileCover': r.fileCover,
+            'urlCover': r.urlCover,
+        },
+    } for r in rows])
+
+
+@bp.route('/api/activity', methods=['GET'])
+@query_budget(4)
+def recent_activity():
+    """Atividade recente nas aulas, mais nova primeiro (?limit=, padrao 50; ?before=<id> pagina)."""
+    flush_activity(current_app._get_current_object())
+    query = db.session.query(
+        LessonActivity.id, LessonActivity.kind, LessonActivity.position_seconds, LessonActivity.created_at,
+        Lesson.id.label('lesson_id'), Lesson.title, Course.id.label('course_id'), Course.name.label('course_name'),
+    ).join(Lesson, LessonActivity.lesson_id == Lesson.id).join(Course, Lesson.course_id == Course.id)
+    before = request.args.get('before', type=int)
+    if before:
+        query = query.filter(LessonActivity.id < before)
+    rows = query.order_by(LessonActivity.id.desc()).limit(_limit(50))
+
+    return jsonify([{
+        'id': r.id,
+        'kind': r.kind,
+        'position_seconds': r.position_seconds,
+        'created_at': _timestamp(r.created_at),
+        'lesson_id': r.lesson_id,
+        'lesson_title': r.title,
+        'course_id': r.course_id,
+        'course_name': r.course_name,
+    } for r in rows])
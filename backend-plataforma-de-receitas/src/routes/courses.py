@@ -1,15 +1,36 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, abort
 from werkzeug.utils import secure_filename
 import os
 import json
 import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-from app import db, Course, Lesson, Note
-from utils import list_and_register_lessons, scan_data_directory_and_register_courses, scan_progress, get_scan_lock
+from app import db, Course, Lesson, LessonActivity, Note, ModuleLink
+from utils import list_and_register_lessons, register_courses_in_directory, scan_progress, get_scan_lock
+from helpers.uploads import store_content_addressed
+from helpers.image_variants import enqueue_default_variants, remove_variants
+from helpers.library_watcher import refresh_watches, watcher_status
+from helpers.metrics import query_budget
+from helpers.profiler import profiled
+from helpers.lesson_content import invalidate_course_content
+from helpers.lesson_progress import watch_time
+from helpers.module_tree import delete_module_tree
+from helpers.activity_log import flush_activity
 
 bp = Blueprint('courses', __name__)
 
+# Progresso de exclusao por course_id (mesmo formato de consulta de scan_progress)
+delete_progress = {}
+DELETE_BATCH_SIZE = 500
+
+# Importacoes automaticas (add-all) por batch_id; o progresso de cada curso fica em scan_progress
+import_batches = {}
+_scan_executor = None
+_scan_executor_lock = threading.Lock()
+
 
 def _serialize_course(c, completion_map=None):
     extra = []
@@ -28,7 +49,29 @@ def _serialize_course(c, completion_map=None):
     return result
 
 
+def _store_cover(image_file):
+    """Salva a capa com o hash do conteudo como nome e agenda as variantes otimizadas."""
+    upload_dir = os.path.join(current_app.root_path, current_app.config['UPLOAD_FOLDER'])
+    ext = os.path.splitext(secure_filename(image_file.filename))[1].lower()
+    filename = store_content_addressed(image_file.stream, upload_dir, ext)
+    enqueue_default_variants(upload_dir, filename)
+    return filename
+
+
+def _release_cover(file_cover):
+    """Remove a capa (e variantes) se nenhum outro curso usa o mesmo arquivo."""
+    if not file_cover or Course.query.filter_by(fileCover=file_cover).first():
+        return
+    upload_dir = os.path.join(current_app.root_path, current_app.config['UPLOAD_FOLDER'])
+    try:
+        os.remove(os.path.join(upload_dir, file_cover))
+    except FileNotFoundError:
+        pass
+    remove_variants(upload_dir, file_cover)
+
+
 @bp.route('/api/courses', methods=['GET'])
+@query_budget(3)
 def list_courses():
     page = request.args.get('page', None, type=int)
     per_page = request.args.get('per_page', 12, type=int)
@@ -47,12 +90,16 @@ def list_courses():
         completion_map[row.course_id] = (completed / total * 100) if total > 0 else 0
 
     # Se nao enviar page, retorna tudo (retrocompativel)
+    # Cursos com exclusao em andamento ja nao aparecem na listagem
+    deleting = [cid for cid, p in delete_progress.items() if not p.get('done')]
+    query = Course.query.filter(Course.id.notin_(deleting)) if deleting else Course.query
+
     if page is None:
-        courses = Course.query.all()
+        courses = query.all()
         return jsonify([_serialize_course(c, completion_map) for c in courses])
 
     per_page = min(per_page, 100)
-    pagination = Course.query.paginate(page=page, per_page=per_page, error_out=False)
+    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
     courses = pagination.items
     return jsonify({
         'data': [_serialize_course(c, completion_map) for c in courses],
@@ -85,9 +132,7 @@ def add_course():
     if not isCoverUrl:
         image_file = request.files.get('imageFile')
         if image_file:
-            filename = secure_filename(image_file.filename)
-            fileCover = filename
-            image_file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], filename))
+            fileCover = _store_cover(image_file)
         else:
             fileCover = None
     else:
@@ -131,13 +176,72 @@ def add_course():
     thread = threading.Thread(target=scan_lessons_background)
     thread.daemon = True
     thread.start()
+    refresh_watches()
 
     extra = extra_paths if extra_paths else []
     return jsonify({'id': course.id, 'name': course.name, 'path': course.path, 'extra_paths': extra, 'isCoverUrl': course.isCoverUrl, 'fileCover': course.fileCover, 'urlCover': course.urlCover, 'isFavorite': course.isFavorite}), 201
 
 
+def _get_scan_executor():
+    """Pool limitado para scans de cursos: caminhar pastas e sondar videos e I/O, entao varios
+    cursos avancam ao mesmo tempo sem abrir uma thread por curso."""
+    global _scan_executor
+    with _scan_executor_lock:
+        if _scan_executor is None:
+            _scan_executor = ThreadPoolExecutor(max_workers=max(1, current_app.config.get('SCAN_MAX_WORKERS', 4)),
+                                                thread_name_prefix='course-scan')
+        return _scan_executor
+
+
+@profiled('add-all')
+def _scan_course_job(app_obj, batch, course_id, path):
+    with app_obj.app_context():
+        try:
+            list_and_register_lessons(path, course_id)
+        except Exception:
+            db.session.rollback()
+            scan_progress[course_id] = {"total": 0, "processed": 0, "current_file": "", "done": True, "error": True}
+            batch['failed'].append(course_id)
+        finally:
+            batch['finished'].append(course_id)
+            if len(batch['finished']) == len(batch['course_ids']):
+                batch['done'] = True
+                batch['finished_at'] = datetime.now().isoformat()
+                refresh_watches()
+
+
+def _batch_progress(batch):
+    total_files = processed_files = 0
+    scanning = []
+    for course_id in batch['course_ids']:
+        progress = scan_progress.get(course_id) or {}
+        total_files += progress.get('total', 0)
+        processed_files += min(progress.get('processed', 0), progress.get('total', 0))
+        if course_id not in batch['finished'] and not progress.get('queued') and progress:
+            scanning.append({'courseId': course_id, 'course_name': progress.get('course_name', ''),
+                             'current_file': progress.get('current_file', '')})
+    total_courses = len(batch['course_ids'])
+    return {
+        'batch_id': batch['batch_id'],
+        'path': batch['path'],
+        'course_ids': batch['course_ids'],
+        'total_courses': total_courses,
+        'done_courses': len(batch['finished']),
+        'failed_courses': list(batch['failed']),
+        'scanning': scanning,
+        'total_files': total_files,
+        'processed_files': processed_files,
+        'percentage': round(len(batch['finished']) * 100 / total_courses) if total_courses else 100,
+        'done': batch['done'],
+        'started_at': batch['started_at'],
+        'finished_at': batch.get('finished_at'),
+    }
+
+
 @bp.route('/api/courses/add-all', methods=['POST'])
 def add_courses_automatically():
+    """Cria os cursos de todas as subpastas numa transacao e escaneia as aulas em background,
+    em paralelo. Responde na hora com batch_id; progresso em /api/courses/import-batches/<batch_id>."""
     data = request.get_json(silent=True) or {}
     scan_path = data.get('path', '')
 
@@ -146,11 +250,45 @@ def add_courses_automatically():
     if not os.path.isdir(scan_path):
         return jsonify({'error': f'O caminho nao existe ou nao e uma pasta: {scan_path}'}), 400
 
-    added = scan_data_directory_and_register_courses(scan_path)
-    return jsonify({'added': added}), 201
+    courses = register_courses_in_directory(scan_path)
+    if not courses:
+        return jsonify({'added': 0, 'batch_id': None, 'course_ids': []}), 200
+
+    batch_id = uuid.uuid4().hex
+    batch = {
+        'batch_id': batch_id,
+        'path': scan_path,
+        'course_ids': [c.id for c in courses],
+        'finished': [],
+        'failed': [],
+        'done': False,
+        'started_at': datetime.now().isoformat(),
+    }
+    import_batches[batch_id] = batch
+
+    # Cursos na fila aparecem como em andamento (scan-progress sem entrada responde done)
+    for course in courses:
+        scan_progress[course.id] = {"total": 0, "processed": 0, "current_file": "", "current_module": "",
+                                    "course_name": course.name, "done": False, "queued": True}
+
+    app_obj = current_app._get_current_object()
+    executor = _get_scan_executor()
+    for course in courses:
+        executor.submit(_scan_course_job, app_obj, batch, course.id, course.path)
+
+    return jsonify({'added': len(courses), 'batch_id': batch_id, 'course_ids': batch['course_ids']}), 202
+
+
+@bp.route('/api/courses/import-batches/<batch_id>', methods=['GET'])
+def get_import_batch(batch_id):
+    batch = import_batches.get(batch_id)
+    if batch is None:
+        return jsonify({'error': 'Importacao nao encontrada.'}), 404
+    return jsonify(_batch_progress(batch)), 200
 
 
 @bp.route('/api/courses/<int:course_id>', methods=['GET'])
+@query_budget(1)
 def get_course(course_id):
     course = Course.query.get_or_404(course_id)
     return jsonify({'id': course.id, 'name': course.name, 'isFavorite': course.isFavorite})
@@ -205,11 +343,17 @@ def get_scan_progress(course_id):
     return jsonify(scan_progress[course_id]), 200
 
 
+@bp.route('/api/library-watcher', methods=['GET'])
+def get_library_watcher_status():
+    return jsonify(watcher_status), 200
+
+
 @bp.route('/api/courses/<int:course_id>', methods=['PUT'])
 def update_course(course_id):
     course = Course.query.get_or_404(course_id)
     old_path = course.path
     old_extra_paths = course.extra_paths
+    old_cover = course.fileCover
     course.name = request.form['name']
     course.path = request.form['path']
 
@@ -241,18 +385,19 @@ def update_course(course_id):
     else:
         image_file = request.files.get('imageFile')
         if image_file:
-            filename = secure_filename(image_file.filename)
-            course.fileCover = filename
+            course.fileCover = _store_cover(image_file)
             course.isCoverUrl = 0
             course.urlCover = None
-            image_file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], filename))
         else:
             course.fileCover = course.fileCover
     db.session.commit()
+    if old_cover != course.fileCover:
+        _release_cover(old_cover)
 
     # Re-scan se path principal ou extra_paths mudaram
     new_extra_json = json.dumps(extra_paths) if extra_paths else None
     if old_path != course.path or old_extra_paths != new_extra_json:
+        invalidate_course_content(course_id)
         app_obj = current_app._get_current_object()
 
         def rescan_background():
@@ -265,86 +410,226 @@ def update_course(course_id):
         thread = threading.Thread(target=rescan_background)
         thread.daemon = True
         thread.start()
+        refresh_watches()
 
     extra = extra_paths if extra_paths else []
     return jsonify({'id': course.id, 'name': course.name, 'path': course.path, 'extra_paths': extra, 'isCoverUrl': course.isCoverUrl, 'fileCover': course.fileCover, 'urlCover': course.urlCover, 'isFavorite': course.isFavorite})
 
 
+def _export_course_notes_streaming(course, progress):
+    """Grava as notas do curso em uploads/notas-exportadas lendo-as em lotes do cursor.
+    Uma nota por linha dentro de "notes", para nao montar a lista inteira em memoria."""
+    total = db.session.query(db.func.count(Note.id)).join(Lesson, Note.lesson_id == Lesson.id) \
+        .filter(Lesson.course_id == course.id).scalar() or 0
+    progress['total_notes'] = total
+    if not total:
+        return None
+
+    export_dir = os.path.join(current_app.root_path, 'uploads', 'notas-exportadas')
+    os.makedirs(export_dir, exist_ok=True)
+    safe_name = course.name.replace(' ', '_').replace('/', '-').replace('\\', '-')[:50]
+    export_filename = f'notas_{safe_name}_{course.id}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
+    export_path = os.path.join(export_dir, export_filename)
+
+    rows = db.session.query(
+        Note, Lesson.title, Lesson.module, Lesson.hierarchy_path
+    ).join(Lesson, Note.lesson_id == Lesson.id).filter(
+        Lesson.course_id == course.id
+    ).order_by(Note.id.asc()).yield_per(DELETE_BATCH_SIZE)
+
+    def dump(value):
+        return json.dumps(value, ensure_ascii=False)
+
+    tmp_path = f"{export_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write('{\n')
+        f.write(f'  "course_name": {dump(course.name)},\n')
+        f.write(f'  "course_path": {dump(course.path)},\n')
+        f.write(f'  "exported_at": {dump(datetime.now().isoformat())},\n')
+        f.write(f'  "total_notes": {total},\n')
+        f.write('  "notes": [')
+        written = 0
+        for n, title, module, hierarchy_path in rows:
+            f.write(',\n    ' if written else '\n    ')
+            f.write(dump({
+                'note_id': n.id,
+                'lesson_title': title,
+                'lesson_module': module or '',
+                'hierarchy_path': hierarchy_path or '',
+                'timestamp': n.timestamp,
+                'content': n.content,
+                'created_at': n.created_at.isoformat() if n.created_at else None,
+            }))
+            written += 1
+            progress['exported_notes'] = written
+        f.write('\n  ]\n}\n')
+    os.replace(tmp_path, export_path)
+    return export_path
+
+
+def _delete_in_batches(model, id_query, progress, key):
+    """Apaga as linhas em lotes com commit por lote, liberando o lock de escrita entre eles."""
+    while True:
+        ids = [row[0] for row in id_query.limit(DELETE_BATCH_SIZE).all()]
+        if not ids:
+            return
+        model.query.filter(model.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        progress[key] += len(ids)
+
+
+def delete_course_job(course_id):
+    """Exclusao em background: exporta as notas, apaga notas e aulas em lotes e por fim o curso."""
+    progress = delete_progress[course_id]
+    lock = get_scan_lock(course_id)
+    # Esperar um scan em andamento terminar para nao recriar aulas durante a exclusao
+    lock.acquire()
+    try:
+        course = Course.query.get(course_id)
+        if course is None:
+            progress.update({'stage': 'done', 'done': True})
+            return
+
+        progress['stage'] = 'exporting'
+        export_path = _export_course_notes_streaming(course, progress)
+
+        progress['stage'] = 'deleting_notes'
+        _delete_in_batches(Note, db.session.query(Note.id).join(Lesson, Note.lesson_id == Lesson.id)
+                           .filter(Lesson.course_id == course_id), progress, 'deleted_notes')
+
+        # Eventos ainda na fila do registro de atividade entram antes de apagar o historico
+        flush_activity(current_app._get_current_object())
+        _delete_in_batches(LessonActivity, db.session.query(LessonActivity.id)
+                           .filter(LessonActivity.course_id == course_id), progress, 'deleted_activity')
+
+        progress['stage'] = 'deleting_lessons'
+        progress['total_lessons'] = Lesson.query.filter_by(course_id=course_id).count()
+        _delete_in_batches(Lesson, db.session.query(Lesson.id).filter(Lesson.course_id == course_id),
+                           progress, 'deleted_lessons')
+
+        # Links e arvore de modulos tem course_id NOT NULL: remover antes do curso
+        ModuleLink.query.filter_by(course_id=course_id).delete(synchronize_session=False)
+        delete_module_tree(course_id)
+        file_cover = course.fileCover
+        db.session.delete(course)
+        db.session.commit()
+        invalidate_course_content(course_id)
+        _release_cover(file_cover)
+
+        refresh_watches()
+        progress.update({'stage': 'done', 'done': True, 'message': 'Curso e aulas associadas deletados'})
+        if export_path:
+            progress['notes_exported'] = progress['exported_notes']
+            progress['notes_export_path'] = export_path
+    finally:
+        lock.release()
+
+
 @bp.route('/api/courses/<int:course_id>', methods=['DELETE'])
 def delete_course(course_id):
     course = Course.query.get_or_404(course_id)
 
-    # Exportar notas antes de deletar
-    lessons = Lesson.query.filter_by(course_id=course_id).all()
-    lesson_ids = [l.id for l in lessons]
-    exported_notes = []
-    notes_export_path = None
-
-    if lesson_ids:
-        notes = Note.query.filter(Note.lesson_id.in_(lesson_ids)).all()
-        if notes:
-            # Montar dados de exportacao com contexto da aula
-            lesson_map = {l.id: l for l in lessons}
-            for n in notes:
-                lesson = lesson_map.get(n.lesson_id)
-                exported_notes.append({
-                    'note_id': n.id,
-                    'lesson_title': lesson.title if lesson else 'Desconhecida',
-                    'lesson_module': lesson.module if lesson else '',
-                    'hierarchy_path': lesson.hierarchy_path if lesson else '',
-                    'timestamp': n.timestamp,
-                    'content': n.content,
-                    'created_at': n.created_at.isoformat() if n.created_at else None,
-                })
-
-            # Salvar arquivo de exportacao
-            export_dir = os.path.join(current_app.root_path, 'uploads', 'notas-exportadas')
-            os.makedirs(export_dir, exist_ok=True)
-            safe_name = course.name.replace(' ', '_').replace('/', '-').replace('\\', '-')[:50]
-            export_filename = f'notas_{safe_name}_{course_id}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
-            notes_export_path = os.path.join(export_dir, export_filename)
-
-            with open(notes_export_path, 'w', encoding='utf-8') as f:
-                json.dump({
-                    'course_name': course.name,
-                    'course_path': course.path,
-                    'exported_at': datetime.now().isoformat(),
-                    'total_notes': len(exported_notes),
-                    'notes': exported_notes,
-                }, f, ensure_ascii=False, indent=2)
-
-            # Deletar notas do banco
-            Note.query.filter(Note.lesson_id.in_(lesson_ids)).delete(synchronize_session=False)
-
-    Lesson.query.filter_by(course_id=course_id).delete()
-
-    if course.fileCover:
-        try:
-            os.remove(os.path.join(current_app.config['UPLOAD_FOLDER'], course.fileCover))
-        except FileNotFoundError:
-            pass
+    if course_id in delete_progress and not delete_progress[course_id].get('done'):
+        return jsonify({'error': 'Exclusao ja em andamento.', 'courseId': course_id, 'already_deleting': True}), 409
 
-    db.session.delete(course)
-    db.session.commit()
+    delete_progress[course_id] = {
+        'course_name': course.name, 'stage': 'queued', 'done': False,
+        'total_notes': 0, 'exported_notes': 0, 'deleted_notes': 0,
+        'total_lessons': 0, 'deleted_lessons': 0, 'deleted_activity': 0,
+    }
+
+    app_obj = current_app._get_current_object()
+
+    def delete_background():
+        with app_obj.app_context():
+            try:
+                delete_course_job(course_id)
+            except Exception:
+                db.session.rollback()
+                delete_progress[course_id].update({'done': True, 'error': True})
+
+    thread = threading.Thread(target=delete_background)
+    thread.daemon = True
+    thread.start()
+
+    return jsonify({'message': 'Exclusao iniciada', 'courseId': course_id}), 202
 
-    result = {'message': 'Curso e aulas associadas deletados'}
-    if exported_notes:
-        result['notes_exported'] = len(exported_notes)
-        result['notes_export_path'] = notes_export_path
-    return jsonify(result)
+
+@bp.route('/api/courses/<int:course_id>/delete-progress', methods=['GET'])
+def get_delete_progress(course_id):
+    if course_id not in delete_progress:
+        return jsonify({'stage': 'done', 'done': True}), 200
+    return jsonify(delete_progress[course_id]), 200
+
+
+@bp.route('/api/courses/<int:course_id>/delete-progress/stream', methods=['GET'])
+def stream_delete_progress(course_id):
+    """Server-Sent Events com o progresso da exclusao ate a conclusao."""
+    def events():
+        last = None
+        while True:
+            state = dict(delete_progress.get(course_id) or {'stage': 'done', 'done': True})
+            if state != last:
+                yield f"data: {json.dumps(state, ensure_ascii=False)}\n\n"
+                last = state
+            if state.get('done'):
+                return
+            time.sleep(0.5)
+
+    response = current_app.response_class(events(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 
 @bp.route('/api/courses/<int:course_id>/completed_percentage', methods=['GET'])
+@query_budget(1)
 def course_completion_percentage(course_id):
-    Course.query.get_or_404(course_id)
-
-    total_lessons = Lesson.query.filter_by(course_id=course_id, is_active=1).count()
+    # Existencia do curso, total e concluidas numa unica consulta (sem linha: curso inexistente)
+    row = db.session.query(
+        db.func.count(Lesson.id),
+        db.func.sum(db.case((Lesson.isCompleted == 1, 1), else_=0))
+    ).select_from(Course).outerjoin(
+        Lesson, db.and_(Lesson.course_id == Course.id, Lesson.is_active == 1)
+    ).filter(Course.id == course_id).group_by(Course.id).first()
+    if row is None:
+        abort(404)
+    total_lessons, completed_lessons = row
 
     if total_lessons == 0:
         return jsonify({'completion_percentage': 0})
 
-    completed_lessons = Lesson.query.filter_by(course_id=course_id, isCompleted=1, is_active=1).count()
-
     completion_percentage = (completed_lessons / total_lessons) * 100
 
     return jsonify({'completion_percentage': completion_percentage})
+
+
+def _sum_watch_time(groups):
+    totals = {'lessons': 0, 'completed_lessons': 0, 'total_seconds': 0, 'watched_seconds': 0, 'remaining_seconds': 0}
+    for group in groups:
+        for field in totals:
+            totals[field] += group[field]
+    return totals
+
+
+@bp.route('/api/courses/<int:course_id>/watch-time', methods=['GET'])
+@query_budget(2)
+def course_watch_time(course_id):
+    """Tempo total, assistido e restante do curso (segundos), no total e por modulo."""
+    Course.query.get_or_404(course_id)
+    modules = watch_time(Lesson.module, Lesson.course_id == course_id)
+    for module in modules:
+        module['module'] = module.pop('key') or ''
+    return jsonify({'course_id': course_id, **_sum_watch_time(modules), 'modules': modules})
+
+
+@bp.route('/api/watch-time', methods=['GET'])
+@query_budget(2)
+def library_watch_time():
+    """Tempo total, assistido e restante (segundos) de todos os cursos, por curso."""
+    courses = watch_time(Lesson.course_id)
+    names = dict(db.session.query(Course.id, Course.name))
+    courses = [course for course in courses if course['key'] in names]
+    for course in courses:
+        course['course_id'] = course.pop('key')
+        course['course_name'] = names[course['course_id']]
+    return jsonify({**_sum_watch_time(courses), 'courses': courses})
@@ -1,9 +1,18 @@
-from flask import Blueprint, request, jsonify, send_file, send_from_directory, current_app
+from flask import Blueprint, request, jsonify, send_file, send_from_directory, current_app, abort
+from werkzeug.security import safe_join
+from werkzeug.wsgi import wrap_file
 import os
 import subprocess
 import shutil
+from datetime import datetime, timezone
 
 from video_utils import open_video
+from utils import SUBTITLE_EXTENSIONS
+from helpers.file_security import resolve_path
+from helpers.lesson_content import get_lesson_content, invalidate_lesson_content, file_validators
+from helpers.subtitles import SUBTITLE_MIMETYPE, get_vtt, gzipped
+from helpers.uploads import IMMUTABLE_CACHE_CONTROL, is_content_addressed
+from helpers.image_variants import negotiate_variant, variant_subpath, enqueue_variant
 
 bp = Blueprint('files', __name__)
 
@@ -15,7 +24,7 @@ def index():
 
 @bp.route("/serve-content", methods=['GET'])
 def serve_lesson_content():
-    path = request.args.get('path')
+    path = resolve_path(request.args.get('path') or '')
 
     if not os.path.exists(path):
         return jsonify({'error': 'Arquivo nao encontrado.'}), 404
@@ -27,10 +36,70 @@ def serve_lesson_content():
     return send_file(path)
 
 
+@bp.route('/api/lessons/<int:lesson_id>/content', methods=['GET'])
+def serve_lesson_file(lesson_id):
+    """Arquivo da aula pelo id. O caminho vem do cache de conteudo, entao as requisicoes Range
+    da reproducao nao consultam o banco; tamanho e mtime vem do fstat do arquivo aberto.
+    So serve arquivos dentro das pastas do curso."""
+    entry, error = get_lesson_content(lesson_id)
+    if error:
+        message, status = error
+        return jsonify({'error': message}), status
+
+    if entry['path'].lower().endswith((".ts", ".mkv")):
+        open_video(entry['path'])
+        return send_from_directory("assets", "video-aviso-reproducao.mp4")
+
+    try:
+        f = open(entry['path'], 'rb')
+    except OSError:
+        invalidate_lesson_content(lesson_id)
+        return jsonify({'error': 'Arquivo nao encontrado.'}), 404
+
+    # A entrada pode ter ate REVALIDATE_SECONDS: os cabecalhos seguem o arquivo que foi aberto
+    st = os.fstat(f.fileno())
+    if st.st_size != entry['size'] or st.st_mtime_ns != entry['mtime_ns']:
+        invalidate_lesson_content(lesson_id)
+    mtime, etag = file_validators(entry['path'], st)
+
+    response = current_app.response_class(wrap_file(request.environ, f), mimetype=entry['mimetype'],
+                                          direct_passthrough=True)
+    response.content_length = st.st_size
+    response.last_modified = mtime
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request, accept_ranges=True, complete_length=st.st_size)
+
+
+@bp.route('/api/subtitles', methods=['GET'])
+def serve_subtitle():
+    """Legenda (.srt ou .vtt) sempre como WebVTT em UTF-8. A conversao fica em cache ate o
+    arquivo mudar; responde com gzip quando aceito e 304 para If-None-Match/If-Modified-Since."""
+    path = request.args.get('path', '')
+    if not path.lower().endswith(SUBTITLE_EXTENSIONS):
+        return jsonify({'error': 'Arquivo de legenda invalido.'}), 400
+    path = resolve_path(path)
+    if not os.path.isfile(path):
+        return jsonify({'error': 'Arquivo nao encontrado.'}), 404
+
+    entry = get_vtt(path)
+    use_gzip = 'gzip' in request.accept_encodings
+    response = current_app.response_class(gzipped(entry) if use_gzip else entry['body'])
+    response.headers['Content-Type'] = SUBTITLE_MIMETYPE
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.set_etag(entry['etag'] + ('-gz' if use_gzip else ''))
+    response.last_modified = datetime.fromtimestamp(entry['mtime'], tz=timezone.utc)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    return response.make_conditional(request)
+
+
 @bp.route('/api/open-file', methods=['POST'])
 def open_file_externally():
     data = request.get_json(silent=True) or {}
-    file_path = data.get('path', '')
+    # Caminhos vindos do banco podem estar em NFC e o arquivo em NFD (ou o contrario)
+    file_path = resolve_path(data.get('path') or '')
 
     if not file_path or not os.path.isfile(file_path):
         return jsonify({'error': 'Arquivo nao encontrado.'}), 404
@@ -46,15 +115,49 @@ def open_file_externally():
             return jsonify({'error': f'Nao foi possivel abrir o arquivo: {str(e)}'}), 500
 
 
+def _send_upload(upload_dir, subpath):
+    """Serve um arquivo de uploads/, trocando por uma variante otimizada quando pedida
+    (?w=<largura>, ?format=webp ou Accept: image/webp) e ja gerada em background."""
+    upload_dir = os.path.join(current_app.root_path, upload_dir)
+    if safe_join(upload_dir, subpath) is None:
+        abort(404)
+    variant = negotiate_variant(
+        subpath,
+        width=request.args.get('w', None, type=int),
+        fmt=request.args.get('format', None),
+        accepts_webp='image/webp' in request.accept_mimetypes,
+    )
+
+    response = None
+    if variant:
+        width, fmt = variant
+        candidate = variant_subpath(subpath, width, fmt)
+        if os.path.isfile(os.path.join(upload_dir, candidate)):
+            response = send_from_directory(upload_dir, candidate)
+        elif os.path.isfile(os.path.join(upload_dir, subpath)):
+            enqueue_variant(upload_dir, subpath, width, fmt)
+
+    # Cache permanente so para nomes de hash; os demais revalidam com ETag/Last-Modified
+    cache_control = IMMUTABLE_CACHE_CONTROL if is_content_addressed(subpath) else 'no-cache'
+    if response is None:
+        response = send_from_directory(upload_dir, subpath)
+        if variant and cache_control != 'no-cache':
+            # Variante ainda sendo gerada: nao fixar o original no cache do navegador
+            cache_control = 'public, max-age=60'
+
+    response.headers['Cache-Control'] = cache_control
+    response.vary.add('Accept')
+    return response
+
+
 @bp.route('/uploads/<filename>')
 def uploaded_file(filename):
-    return send_from_directory(current_app.config['UPLOAD_FOLDER'], filename)
+    return _send_upload(current_app.config['UPLOAD_FOLDER'], filename)
 
 
 @bp.route('/uploads/<path:subpath>')
 def uploaded_file_subpath(subpath):
-    upload_dir = os.path.join(current_app.root_path, 'uploads')
-    return send_from_directory(upload_dir, subpath)
+    return _send_upload('uploads', subpath)
 
 
 @bp.route('/api/open-app', methods=['POST'])
@@ -1,20 +1,23 @@
 from flask import Blueprint, request, jsonify, current_app
 import json
-from datetime import datetime
+import base64
+from datetime import datetime, date as date_cls
+from sqlalchemy.exc import IntegrityError
 
-from app import db, FocusSession, CycleConfig, TimerState
+from app import db, FocusSession, CycleConfig
+from helpers import timer_state
+from helpers.metrics import query_budget
+from helpers.focus_stats import GRANULARITIES, apply_session_to_rollup, rollup_stats
 
 bp = Blueprint('focus', __name__)
 
 
-@bp.route('/api/focus/sessions', methods=['GET'])
-def list_focus_sessions():
-    date = request.args.get('date', None)
-    query = FocusSession.query
-    if date:
-        query = query.filter_by(date=date)
-    sessions = query.order_by(FocusSession.started_at.desc()).all()
-    return jsonify([{
+SESSION_FIELDS = ('id', 'subject_name', 'subject_id', 'started_at', 'ended_at',
+                  'duration_seconds', 'mode', 'completed', 'date')
+
+
+def _serialize_session(s):
+    return {
         'id': s.id,
         'subject_name': s.subject_name,
         'subject_id': s.subject_id,
@@ -24,86 +27,284 @@ def list_focus_sessions():
         'mode': s.mode,
         'completed': s.completed,
         'date': s.date,
-    } for s in sessions])
+    }
+
+
+def _encode_cursor(s):
+    raw = json.dumps([s.started_at.isoformat(), s.id])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(cursor):
+    try:
+        started_at, session_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return datetime.fromisoformat(started_at), int(session_id)
+    except (ValueError, TypeError):
+        return None
+
+
+@bp.route('/api/focus/sessions', methods=['GET'])
+@query_budget(1)
+def list_focus_sessions():
+    """Lista sessoes (mais recentes primeiro). Filtros: date, from, to, subject_id, subject, mode.
+    Com limit, pagina por cursor em (started_at, id) e devolve next_cursor;
+    format=columnar devolve uma lista por campo em vez de um objeto por sessao."""
+    date = request.args.get('date', None)
+    from_date = request.args.get('from', None)
+    to_date = request.args.get('to', None)
+    subject_id = request.args.get('subject_id', None)
+    subject_name = request.args.get('subject', None)
+    mode = request.args.get('mode', None)
+    limit = request.args.get('limit', None, type=int)
+    cursor = request.args.get('cursor', None)
+    columnar = request.args.get('format') == 'columnar'
+
+    query = FocusSession.query
+    if mode:
+        query = query.filter(FocusSession.mode == mode)
+    if date:
+        query = query.filter(FocusSession.date == date)
+    if from_date:
+        query = query.filter(FocusSession.date >= from_date)
+    if to_date:
+        query = query.filter(FocusSession.date <= to_date)
+    if subject_id:
+        query = query.filter(FocusSession.subject_id == subject_id)
+    if subject_name:
+        query = query.filter(FocusSession.subject_name == subject_name)
+
+    if cursor:
+        position = _decode_cursor(cursor)
+        if position is None:
+            return jsonify({'error': 'Cursor invalido.'}), 400
+        started_at, session_id = position
+        query = query.filter(db.or_(
+            FocusSession.started_at < started_at,
+            db.and_(FocusSession.started_at == started_at, FocusSession.id < session_id)
+        ))
+
+    query = query.order_by(FocusSession.started_at.desc(), FocusSession.id.desc())
+
+    # Sem limit, retorna tudo (retrocompativel)
+    if limit is None:
+        sessions = query.all()
+        next_cursor = None
+    else:
+        limit = max(1, min(limit, 500))
+        sessions = query.limit(limit + 1).all()
+        next_cursor = _encode_cursor(sessions[limit - 1]) if len(sessions) > limit else None
+        sessions = sessions[:limit]
+
+    if columnar:
+        data = {field: [] for field in SESSION_FIELDS}
+        for s in sessions:
+            for field, value in _serialize_session(s).items():
+                data[field].append(value)
+    else:
+        data = [_serialize_session(s) for s in sessions]
+
+    if limit is None and not columnar:
+        return jsonify(data)
+    return jsonify({'data': data, 'next_cursor': next_cursor})
+
+
+SESSION_REQUIRED_FIELDS = ('subject_name', 'subject_id', 'started_at', 'ended_at', 'duration_seconds', 'mode', 'date')
+# Limite de sessoes por lote da fila offline
+BATCH_MAX_SESSIONS = 1000
+CLIENT_KEY_MAX_LENGTH = 64
+# Campos de texto e o tamanho da coluna: outro tipo (ou texto maior) so falharia no flush do lote inteiro
+SESSION_TEXT_FIELDS = (('subject_name', 150), ('subject_id', 50), ('mode', 20))
+
+
+def _build_session(data):
+    """Valida o payload e monta a FocusSession (sem adicionar a sessao do banco).
+    Retorna (session, None) ou (None, mensagem de erro)."""
+    if not isinstance(data, dict):
+        return None, 'Sessao invalida'
+    for field in SESSION_REQUIRED_FIELDS:
+        if field not in data:
+            return None, f'Campo obrigatorio: {field}'
+    client_key = data.get('client_key')
+    if client_key is not None and (not isinstance(client_key, str) or not client_key
+                                   or len(client_key) > CLIENT_KEY_MAX_LENGTH):
+        return None, 'client_key invalido'
+    subject_id = data['subject_id']
+    if isinstance(subject_id, int) and not isinstance(subject_id, bool):
+        subject_id = str(subject_id)
+    text = {'subject_name': data['subject_name'], 'subject_id': subject_id, 'mode': data['mode']}
+    for field, max_length in SESSION_TEXT_FIELDS:
+        if not isinstance(text[field], str) or len(text[field]) > max_length:
+            return None, f'Campo invalido: {field}'
+    try:
+        session = FocusSession(
+            subject_name=text['subject_name'],
+            subject_id=text['subject_id'],
+            started_at=datetime.fromisoformat(data['started_at']),
+            ended_at=datetime.fromisoformat(data['ended_at']),
+            duration_seconds=int(data['duration_seconds']),
+            mode=text['mode'],
+            completed=1 if data.get('completed', True) else 0,
+            # YYYY-MM-DD: o agregado e a sequencia de dias fazem date.fromisoformat nesse campo
+            date=date_cls.fromisoformat(data['date']).isoformat(),
+            client_key=client_key,
+        )
+    except (TypeError, ValueError):
+        return None, 'Formato de data ou duracao invalido'
+    return session, None
 
 
 @bp.route('/api/focus/sessions', methods=['POST'])
 def create_focus_session():
     data = request.get_json(silent=True) or {}
-    required = ['subject_name', 'subject_id', 'started_at', 'ended_at', 'duration_seconds', 'mode', 'date']
-    for field in required:
-        if field not in data:
-            return jsonify({'error': f'Campo obrigatorio: {field}'}), 400
-
-    session = FocusSession(
-        subject_name=data['subject_name'],
-        subject_id=data['subject_id'],
-        started_at=datetime.fromisoformat(data['started_at']),
-        ended_at=datetime.fromisoformat(data['ended_at']),
-        duration_seconds=data['duration_seconds'],
-        mode=data['mode'],
-        completed=1 if data.get('completed', True) else 0,
-        date=data['date'],
-    )
-    db.session.add(session)
+    session, error = _build_session(data)
+    if error:
+        return jsonify({'error': error}), 400
+
+    # Reenvio da mesma sessao (mesma client_key): devolve a ja gravada
+    if session.client_key:
+        existing = FocusSession.query.filter_by(client_key=session.client_key).first()
+        if existing:
+            return jsonify(_serialize_session(existing)), 200
+
+    try:
+        db.session.add(session)
+        apply_session_to_rollup(session)
+        db.session.commit()
+    except IntegrityError:
+        # Envio concorrente da mesma client_key gravou primeiro: devolve a ja gravada, como no lote
+        db.session.rollback()
+        existing = session.client_key and FocusSession.query.filter_by(client_key=session.client_key).first()
+        if not existing:
+            raise
+        return jsonify(_serialize_session(existing)), 200
+
+    return jsonify(_serialize_session(session)), 201
+
+
+def _existing_client_keys(keys):
+    found = set()
+    keys = list(keys)
+    for i in range(0, len(keys), 500):
+        chunk = keys[i:i + 500]
+        found.update(k for (k,) in db.session.query(FocusSession.client_key).filter(
+            FocusSession.client_key.in_(chunk)))
+    return found
+
+
+def _insert_batch(items):
+    """Insere numa unica transacao as sessoes (payloads ja validados) cuja client_key ainda nao existe.
+    Retorna (criadas, chaves ja existentes)."""
+    existing = _existing_client_keys(item['client_key'] for item in items)
+    created = []
+    for item in items:
+        if item['client_key'] in existing:
+            continue
+        session, _ = _build_session(item)
+        db.session.add(session)
+        apply_session_to_rollup(session)
+        created.append(session)
     db.session.commit()
+    return created, existing
 
+
+@bp.route('/api/focus/sessions/batch', methods=['POST'])
+def create_focus_sessions_batch():
+    """Ingestao em lote da fila offline do cliente.
+    Body: {"sessions": [{..., "client_key": "<uuid>"}]}. Sessoes com client_key ja gravada
+    (ou repetida no lote) sao ignoradas; as novas entram numa unica transacao.
+    Resposta: {"created": [...], "duplicates": [client_key], "errors": [{index, client_key, error}]}"""
+    data = request.get_json(silent=True) or {}
+    items = data.get('sessions')
+    if not isinstance(items, list):
+        return jsonify({'error': 'Informe sessions como lista'}), 400
+    if len(items) > BATCH_MAX_SESSIONS:
+        return jsonify({'error': f'Maximo de {BATCH_MAX_SESSIONS} sessoes por lote'}), 400
+
+    valid = []
+    errors = []
+    duplicates = []
+    seen = set()
+    for index, item in enumerate(items):
+        client_key = item.get('client_key') if isinstance(item, dict) else None
+        if not client_key:
+            errors.append({'index': index, 'client_key': None, 'error': 'client_key obrigatorio'})
+            continue
+        _, error = _build_session(item)
+        if error:
+            errors.append({'index': index, 'client_key': client_key, 'error': error})
+            continue
+        if client_key in seen:
+            duplicates.append(client_key)
+            continue
+        seen.add(client_key)
+        valid.append(item)
+
+    try:
+        created, existing = _insert_batch(valid)
+    except IntegrityError:
+        # Outro envio concorrente gravou alguma das chaves: refaz a deduplicacao uma vez
+        db.session.rollback()
+        created, existing = _insert_batch(valid)
+
+    duplicates.extend(item['client_key'] for item in valid if item['client_key'] in existing)
     return jsonify({
-        'id': session.id,
-        'subject_name': session.subject_name,
-        'subject_id': session.subject_id,
-        'started_at': session.started_at.isoformat(),
-        'ended_at': session.ended_at.isoformat(),
-        'duration_seconds': session.duration_seconds,
-        'mode': session.mode,
-        'completed': session.completed,
-        'date': session.date,
-    }), 201
+        'created': [_serialize_session(s) | {'client_key': s.client_key} for s in created],
+        'duplicates': duplicates,
+        'errors': errors,
+    })
 
 
 @bp.route('/api/focus/sessions/<int:session_id>', methods=['DELETE'])
 def delete_focus_session(session_id):
     session = FocusSession.query.get_or_404(session_id)
+    apply_session_to_rollup(session, sign=-1)
     db.session.delete(session)
     db.session.commit()
     return jsonify({'message': 'Sessao excluida.'})
 
 
 @bp.route('/api/focus/sessions/stats', methods=['GET'])
+@query_budget(2)
 def focus_session_stats():
     from_date = request.args.get('from', None)
     to_date = request.args.get('to', None)
+    granularity = request.args.get('granularity', None)
+
+    # Com granularity, responde a partir do agregado diario (semana/mes/ano)
+    if granularity:
+        if granularity not in GRANULARITIES:
+            return jsonify({'error': f'granularity invalida. Use: {", ".join(GRANULARITIES)}'}), 400
+        return jsonify(rollup_stats(from_date, to_date, granularity))
 
-    query = FocusSession.query.filter_by(mode='focus')
+    filters = [FocusSession.mode == 'focus']
     if from_date:
-        query = query.filter(FocusSession.date >= from_date)
+        filters.append(FocusSession.date >= from_date)
     if to_date:
-        query = query.filter(FocusSession.date <= to_date)
+        filters.append(FocusSession.date <= to_date)
 
-    sessions = query.all()
+    subject_rows = db.session.query(
+        FocusSession.subject_name,
+        db.func.sum(FocusSession.duration_seconds).label('total_seconds'),
+        db.func.count(FocusSession.id).label('sessions')
+    ).filter(*filters).group_by(FocusSession.subject_name).all()
 
-    total_seconds = sum(s.duration_seconds for s in sessions)
-    total_sessions = len(sessions)
-    by_subject = {}
-    by_date = {}
-
-    for s in sessions:
-        by_subject.setdefault(s.subject_name, 0)
-        by_subject[s.subject_name] += s.duration_seconds
-        by_date.setdefault(s.date, 0)
-        by_date[s.date] += s.duration_seconds
+    date_rows = db.session.query(
+        FocusSession.date,
+        db.func.sum(FocusSession.duration_seconds).label('total_seconds')
+    ).filter(*filters).group_by(FocusSession.date).all()
 
     return jsonify({
-        'total_seconds': total_seconds,
-        'total_sessions': total_sessions,
-        'by_subject': by_subject,
-        'by_date': by_date,
+        'total_seconds': sum(row.total_seconds or 0 for row in subject_rows),
+        'total_sessions': sum(row.sessions for row in subject_rows),
+        'by_subject': {row.subject_name: row.total_seconds or 0 for row in subject_rows},
+        'by_date': {row.date: row.total_seconds or 0 for row in date_rows},
     })
 
 
 # -- Cycle Config --
 
 @bp.route('/api/focus/cycle-config', methods=['GET'])
+@query_budget(1)
 def get_cycle_config():
     config = CycleConfig.query.first()
     if not config:
@@ -128,26 +329,96 @@ def save_cycle_config():
 
 
 # -- Timer State (persistencia cross-browser) --
+#
+# O estado fica em memoria (helpers/timer_state) com uma versao que cresce a cada alteracao.
+# Clientes enviam deltas JSON Patch com a versao esperada; escritas desatualizadas recebem 409.
+
+def _timer_state_response(version, state, status=200):
+    response = jsonify(state)
+    response.status_code = status
+    response.headers['X-State-Version'] = str(version)
+    return response
+
+
+def _expected_version(data=None):
+    value = request.headers.get('If-Match') or request.args.get('expected_version')
+    if value is None and isinstance(data, dict):
+        value = data.get('expected_version')
+    if value is None:
+        return None
+    try:
+        return int(str(value).strip('"'))
+    except ValueError:
+        return -1
+
 
 @bp.route('/api/focus/timer-state', methods=['GET'])
+@query_budget(1)
 def get_timer_state():
-    row = TimerState.query.first()
-    if not row or not row.state_json:
-        return jsonify({})
-    return current_app.response_class(row.state_json, mimetype='application/json')
+    version, state = timer_state.get_timer_state(current_app._get_current_object())
+    if request.args.get('with_version'):
+        return jsonify({'version': version, 'state': state})
+    return _timer_state_response(version, state)
 
 
 @bp.route('/api/focus/timer-state', methods=['PUT', 'POST'])
 def save_timer_state():
-    data = request.get_json(silent=True)
+    data = request.get_json(silent=True, force=True)
     if data is None:
         return jsonify({'error': 'JSON invalido'}), 400
 
-    row = TimerState.query.first()
-    if row:
-        row.state_json = json.dumps(data, ensure_ascii=False)
-    else:
-        row = TimerState(state_json=json.dumps(data, ensure_ascii=False))
-        db.session.add(row)
-    db.session.commit()
-    return jsonify(data)
+    try:
+        version = timer_state.replace_timer_state(
+            current_app._get_current_object(), data,
+            expected_version=_expected_version(),
+            client_id=request.args.get('client_id'),
+        )
+    except timer_state.VersionConflict as conflict:
+        return jsonify({'error': 'Versao desatualizada', 'version': conflict.version,
+                        'state': conflict.state}), 409
+    return _timer_state_response(version, data)
+
+
+@bp.route('/api/focus/timer-state', methods=['PATCH'])
+def patch_timer_state():
+    """Corpo: {"expected_version": n, "patch": [operacoes JSON Patch], "client_id": "..."}"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or 'patch' not in data:
+        return jsonify({'error': 'Envie "patch" e "expected_version".'}), 400
+    expected = _expected_version(data)
+    if expected is None:
+        return jsonify({'error': 'expected_version e obrigatorio.'}), 428
+
+    try:
+        version = timer_state.patch_timer_state(
+            current_app._get_current_object(), data['patch'], expected, client_id=data.get('client_id'))
+    except timer_state.VersionConflict as conflict:
+        return jsonify({'error': 'Versao desatualizada', 'version': conflict.version,
+                        'state': conflict.state}), 409
+    except timer_state.JsonPatchError as e:
+        return jsonify({'error': f'Patch invalido: {e}'}), 422
+    return jsonify({'version': version})
+
+
+@bp.route('/api/focus/timer-state/events', methods=['GET'])
+def timer_state_events():
+    """Server-Sent Events: envia patches (ou o estado inteiro) a cada nova versao."""
+    app_obj = current_app._get_current_object()
+    version = request.args.get('since', None, type=int)
+    if version is None:
+        version, _ = timer_state.get_timer_state(app_obj)
+
+    def events():
+        current = version
+        yield f"event: hello\ndata: {json.dumps({'version': current})}\n\n"
+        while True:
+            current, event = timer_state.wait_for_change(app_obj, current)
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+    response = current_app.response_class(events(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
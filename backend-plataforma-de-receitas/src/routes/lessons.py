@@ -1,13 +1,17 @@
-from flask import Blueprint, request, jsonify
-import json
+from flask import Blueprint, request, jsonify, current_app
 from sqlalchemy.orm import joinedload
 
 from app import db, Lesson
+from helpers.metrics import query_budget
+from helpers.lesson_progress import status_code, parse_seconds, serialize_lesson
+from helpers.module_tree import adjust_completed_counts
+from helpers.activity_log import record_activity
 
 bp = Blueprint('lessons', __name__)
 
 
 @bp.route('/api/courses/<int:course_id>/lessons', methods=['GET'])
+@query_budget(2)
 def list_lessons_for_course(course_id):
     page = request.args.get('page', None, type=int)
     per_page = request.args.get('per_page', 50, type=int)
@@ -21,31 +25,15 @@ def list_lessons_for_course(course_id):
     if search:
         query = query.filter(Lesson.title.ilike(f'%{search}%'))
 
-    def serialize(lesson):
-        return {
-            'course_title': lesson.course.name if lesson.course else None,
-            'id': lesson.id,
-            'title': lesson.title,
-            'module': lesson.module,
-            'progressStatus': lesson.progressStatus,
-            'isCompleted': lesson.isCompleted,
-            'hierarchy_path': lesson.hierarchy_path,
-            'time_elapsed': lesson.time_elapsed,
-            'video_url': lesson.video_url,
-            'duration': lesson.duration,
-            'pdf_url': lesson.pdf_url,
-            'subtitle_urls': json.loads(lesson.subtitle_urls) if lesson.subtitle_urls else [],
-        }
-
     # Se nao enviar page, retorna tudo (retrocompativel)
     if page is None:
         lessons = query.all()
-        return jsonify([serialize(l) for l in lessons])
+        return jsonify([serialize_lesson(l) for l in lessons])
 
     per_page = min(per_page, 200)
     pagination = query.paginate(page=page, per_page=per_page, error_out=False)
     return jsonify({
-        'data': [serialize(l) for l in pagination.items],
+        'data': [serialize_lesson(l) for l in pagination.items],
         'page': pagination.page,
         'per_page': pagination.per_page,
         'total': pagination.total,
@@ -61,16 +49,30 @@ def update_lesson_for_end_progress():
     is_completed = data.get('isCompleted')
     time_elapsed = data.get('time_elapsed', None)
 
+    status = status_code(progress_status) if progress_status else None
+    if progress_status and status is None:
+        return jsonify({'error': 'progressStatus invalido'}), 400
+    elapsed_seconds = parse_seconds(time_elapsed)
+    if time_elapsed is not None and elapsed_seconds is None:
+        return jsonify({'error': 'time_elapsed invalido'}), 400
+
     lesson = Lesson.query.get(lesson_id)
     if lesson:
-        if progress_status:
-            lesson.progressStatus = progress_status
+        if status is not None:
+            lesson.progress_status = status
         if is_completed is not None:
+            delta = (1 if is_completed else 0) - (1 if lesson.isCompleted == 1 else 0)
+            if lesson.is_active:
+                adjust_completed_counts(lesson.course_id, lesson.module, delta)
             lesson.isCompleted = is_completed
-        if time_elapsed is not None:
-            lesson.time_elapsed = time_elapsed
+        if elapsed_seconds is not None:
+            lesson.elapsed_seconds = elapsed_seconds
 
         db.session.commit()
+        # Registro de atividade e "continuar assistindo" (gravados em lote)
+        kind = 'progress' if is_completed is None else ('completed' if is_completed else 'uncompleted')
+        record_activity(current_app._get_current_object(), lesson.id, lesson.course_id, kind,
+                        lesson.elapsed_seconds)
         return jsonify({'message': 'Progresso da licao atualizado com sucesso'})
     else:
         return jsonify({'error': 'Licao nao encontrada'}), 404
@@ -85,6 +87,16 @@ def batch_update_lessons():
     if not lesson_ids or is_completed is None:
         return jsonify({'error': 'lessonIds e isCompleted sao obrigatorios'}), 400
 
+    # Contagens da arvore de modulos: so as aulas ativas que mudam de estado, por modulo
+    completed = 1 if is_completed else 0
+    changed = db.session.query(Lesson.course_id, Lesson.module, db.func.count(Lesson.id)).filter(
+        Lesson.id.in_(lesson_ids),
+        Lesson.is_active == 1,
+        db.func.coalesce(Lesson.isCompleted, 0) != completed,
+    ).group_by(Lesson.course_id, Lesson.module)
+    for course_id, module, count in changed.all():
+        adjust_completed_counts(course_id, module, count if completed else -count)
+
     Lesson.query.filter(Lesson.id.in_(lesson_ids)).update(
         {'isCompleted': is_completed},
         synchronize_session='fetch'
@@ -95,6 +107,7 @@ def batch_update_lessons():
 
 
 @bp.route('/api/lessons/<int:lesson_id>', methods=['GET'])
+@query_budget(1)
 def get_lesson_elapsed_time(lesson_id):
     lesson = Lesson.query.get_or_404(lesson_id)
-    return jsonify({"elapsedTime": lesson.time_elapsed})
+    return jsonify({"elapsedTime": lesson.elapsed_seconds})
@@ -0,0 +1,12 @@
+from flask import Blueprint, current_app
+
+from helpers import metrics
+
+bp = Blueprint('metrics', __name__)
+
+
+@bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    response = current_app.response_class(metrics.render(), mimetype='text/plain')
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    return response
@@ -1,11 +1,13 @@
 from flask import Blueprint, request, jsonify
 
 from app import db, ModuleLink
+from helpers.metrics import query_budget
 
 bp = Blueprint('module_links', __name__)
 
 
 @bp.route('/api/courses/<int:course_id>/module-links', methods=['GET'])
+@query_budget(1)
 def get_module_links(course_id):
     links = ModuleLink.query.filter_by(course_id=course_id).all()
     result = {}
@@ -61,6 +63,7 @@ def delete_module_link(link_id):
 
 
 @bp.route('/api/module-link-labels', methods=['GET'])
+@query_budget(1)
 def get_distinct_module_link_labels():
     rows = db.session.query(db.distinct(ModuleLink.label)).all()
     labels = sorted([row[0] for row in rows if row[0]])
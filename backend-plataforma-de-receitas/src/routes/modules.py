@@ -0,0 +1,16 @@
+from flask import Blueprint, request, jsonify
+
+from app import Course
+from helpers.metrics import query_budget
+from helpers.module_tree import module_tree
+
+bp = Blueprint('modules', __name__)
+
+
+@bp.route('/api/courses/<int:course_id>/modules', methods=['GET'])
+@query_budget(4)
+def get_module_tree(course_id):
+    """Sumario do curso (arvore de modulos com progresso). ?lessons=1 inclui as aulas de cada modulo."""
+    Course.query.get_or_404(course_id)
+    include_lessons = request.args.get('lessons', '0') == '1'
+    return jsonify(module_tree(course_id, include_lessons=include_lessons))
@@ -1,27 +1,43 @@
-from flask import Blueprint, request, jsonify, send_file, current_app
+from flask import Blueprint, request, jsonify, send_file, current_app, stream_with_context
 from werkzeug.utils import secure_filename
 import os
 import json
-import uuid
+import threading
 from collections import OrderedDict
 from datetime import datetime, timedelta
+from urllib.parse import urlsplit
 
 from app import db, Lesson, Course, Note
-from helpers.notes_pdf import format_timestamp_pdf, pdf_css, generate_pdf
+from helpers.metrics import query_budget
+from helpers.profiler import profiled, profiled_iter
+from helpers.notes_export import EXPORTERS, query_lesson_notes, query_course_notes, query_daily_notes
+from helpers.uploads import store_content_addressed
+from helpers.image_variants import enqueue_default_variants
+from helpers.note_images import (
+    referenced_images, release_note_images, gc_note_images, gc_progress, note_images_dir
+)
 
 bp = Blueprint('notes', __name__)
 
+# Limite de operacoes por requisicao em massa
+BULK_MAX_OPERATIONS = 5000
 
-@bp.route('/api/lessons/<int:lesson_id>/notes', methods=['GET'])
-def list_notes(lesson_id):
-    notes = Note.query.filter_by(lesson_id=lesson_id).order_by(Note.timestamp.asc()).all()
-    return jsonify([{
+
+def _serialize_note(n):
+    return {
         'id': n.id,
         'lesson_id': n.lesson_id,
         'timestamp': n.timestamp,
         'content': n.content,
         'created_at': n.created_at.isoformat() if n.created_at else None,
-    } for n in notes])
+    }
+
+
+@bp.route('/api/lessons/<int:lesson_id>/notes', methods=['GET'])
+@query_budget(1)
+def list_notes(lesson_id):
+    notes = Note.query.filter_by(lesson_id=lesson_id).order_by(Note.timestamp.asc()).all()
+    return jsonify([_serialize_note(n) for n in notes])
 
 
 @bp.route('/api/lessons/<int:lesson_id>/notes', methods=['POST'])
@@ -38,13 +54,7 @@ def create_note(lesson_id):
     db.session.add(note)
     db.session.commit()
 
-    return jsonify({
-        'id': note.id,
-        'lesson_id': note.lesson_id,
-        'timestamp': note.timestamp,
-        'content': note.content,
-        'created_at': note.created_at.isoformat() if note.created_at else None,
-    }), 201
+    return jsonify(_serialize_note(note)), 201
 
 
 @bp.route('/api/notes/<int:note_id>', methods=['PUT'])
@@ -56,27 +66,230 @@ def update_note(note_id):
     if not content:
         return jsonify({'error': 'O conteudo da anotacao e obrigatorio.'}), 400
 
+    dropped_images = referenced_images(note.content) - referenced_images(content)
     note.content = content
     db.session.commit()
+    release_note_images(dropped_images, current_app.root_path)
 
-    return jsonify({
-        'id': note.id,
-        'lesson_id': note.lesson_id,
-        'timestamp': note.timestamp,
-        'content': note.content,
-        'created_at': note.created_at.isoformat() if note.created_at else None,
-    })
+    return jsonify(_serialize_note(note))
 
 
 @bp.route('/api/notes/<int:note_id>', methods=['DELETE'])
 def delete_note(note_id):
     note = Note.query.get_or_404(note_id)
+    images = referenced_images(note.content)
     db.session.delete(note)
     db.session.commit()
+    release_note_images(images, current_app.root_path)
     return jsonify({'message': 'Anotacao excluida.'})
 
 
+# -- Operacoes em massa --
+
+def _is_id(value):
+    # bool e subclasse de int: true/false no JSON nao podem virar a nota/aula 1 ou 0
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _note_content(item):
+    # Conteudo sem espacos nas pontas; None quando o campo veio com outro tipo que nao texto
+    content = item.get('content')
+    if content is None:
+        return ''
+    return content.strip() if isinstance(content, str) else None
+
+
+def _note_timestamp(item):
+    timestamp = item.get('timestamp', 0)
+    if isinstance(timestamp, bool):
+        raise TypeError('timestamp booleano')
+    return float(timestamp)
+
+
+@bp.route('/api/notes/bulk', methods=['POST'])
+def bulk_note_operations():
+    """Aplica varias operacoes de anotacao em uma unica transacao.
+    Corpo: {"operations": [{"op": "create", "lesson_id", "timestamp", "content"},
+                           {"op": "update", "id", "content"}, {"op": "delete", "id"}]}
+    Itens invalidos sao ignorados e reportados; o resultado segue a ordem das operacoes."""
+    data = request.get_json(silent=True) or {}
+    operations = data.get('operations')
+    if not isinstance(operations, list):
+        return jsonify({'error': 'Envie a lista "operations".'}), 400
+    if len(operations) > BULK_MAX_OPERATIONS:
+        return jsonify({'error': f'Maximo de {BULK_MAX_OPERATIONS} operacoes por requisicao.'}), 400
+
+    # Carregar aulas e notas referenciadas com uma consulta cada
+    lesson_ids = {op.get('lesson_id') for op in operations
+                  if isinstance(op, dict) and op.get('op') == 'create' and _is_id(op.get('lesson_id'))}
+    note_ids = {op.get('id') for op in operations
+                if isinstance(op, dict) and op.get('op') in ('update', 'delete') and _is_id(op.get('id'))}
+    existing_lessons = {row.id for row in db.session.query(Lesson.id).filter(Lesson.id.in_(lesson_ids))} \
+        if lesson_ids else set()
+    notes_by_id = {n.id: n for n in Note.query.filter(Note.id.in_(note_ids))} if note_ids else {}
+
+    results = []
+    created = []
+    released_images = set()
+    for index, op in enumerate(operations):
+        kind = op.get('op') if isinstance(op, dict) else None
+        content = _note_content(op) if isinstance(op, dict) else ''
+
+        if kind == 'create':
+            if not _is_id(op.get('lesson_id')) or op['lesson_id'] not in existing_lessons:
+                results.append({'index': index, 'op': kind, 'status': 'error', 'error': 'Aula nao encontrada.'})
+                continue
+            if content is None:
+                results.append({'index': index, 'op': kind, 'status': 'error', 'error': 'Conteudo invalido.'})
+                continue
+            if not content:
+                results.append({'index': index, 'op': kind, 'status': 'error',
+                                'error': 'O conteudo da anotacao e obrigatorio.'})
+                continue
+            try:
+                timestamp = _note_timestamp(op)
+            except (TypeError, ValueError):
+                results.append({'index': index, 'op': kind, 'status': 'error', 'error': 'Timestamp invalido.'})
+                continue
+            note = Note(lesson_id=op['lesson_id'], timestamp=timestamp, content=content)
+            db.session.add(note)
+            created.append((len(results), note))
+            results.append({'index': index, 'op': kind, 'status': 'ok'})
+
+        elif kind in ('update', 'delete'):
+            note = notes_by_id.get(op.get('id')) if _is_id(op.get('id')) else None
+            if note is None:
+                results.append({'index': index, 'op': kind, 'status': 'error', 'error': 'Anotacao nao encontrada.'})
+                continue
+            if kind == 'update':
+                if content is None:
+                    results.append({'index': index, 'op': kind, 'status': 'error', 'error': 'Conteudo invalido.'})
+                    continue
+                if not content:
+                    results.append({'index': index, 'op': kind, 'status': 'error',
+                                    'error': 'O conteudo da anotacao e obrigatorio.'})
+                    continue
+                released_images |= referenced_images(note.content) - referenced_images(content)
+                note.content = content
+            else:
+                released_images |= referenced_images(note.content)
+                db.session.delete(note)
+                del notes_by_id[note.id]
+            results.append({'index': index, 'op': kind, 'status': 'ok', 'id': note.id})
+
+        else:
+            results.append({'index': index, 'op': kind, 'status': 'error', 'error': 'Operacao invalida.'})
+
+    db.session.flush()
+    for position, note in created:
+        results[position]['id'] = note.id
+    db.session.commit()
+    release_note_images(released_images, current_app.root_path)
+
+    return jsonify({
+        'applied': sum(1 for r in results if r['status'] == 'ok'),
+        'failed': sum(1 for r in results if r['status'] == 'error'),
+        'results': results,
+    })
+
+
+@bp.route('/api/notes/import', methods=['POST'])
+def import_exported_notes():
+    """Restaura um arquivo de uploads/notas-exportadas (gerado ao deletar um curso).
+    As notas sao associadas as aulas do curso por hierarchy_path + titulo. O curso e
+    informado por ?course_id= ou localizado pelo course_path/course_name do arquivo.
+    Notas ja existentes (mesma aula, instante e conteudo) nao sao duplicadas."""
+    data = request.get_json(silent=True)
+    if data is None and 'file' in request.files:
+        try:
+            data = json.load(request.files['file'].stream)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            data = None
+    if not isinstance(data, dict) or not isinstance(data.get('notes'), list):
+        return jsonify({'error': 'Arquivo de exportacao invalido.'}), 400
+
+    course_id = request.args.get('course_id', None, type=int) or data.get('course_id')
+    if course_id is not None and not _is_id(course_id):
+        return jsonify({'error': 'course_id invalido.'}), 400
+    if course_id:
+        course = Course.query.get_or_404(course_id)
+    else:
+        course_path, course_name = data.get('course_path'), data.get('course_name')
+        course = (isinstance(course_path, str) and Course.query.filter_by(path=course_path).first()) \
+            or (isinstance(course_name, str) and Course.query.filter_by(name=course_name).first()) or None
+        if course is None:
+            return jsonify({'error': 'Curso de destino nao encontrado. Informe course_id.'}), 404
+
+    lessons = db.session.query(Lesson.id, Lesson.title, Lesson.hierarchy_path, Lesson.is_active) \
+        .filter(Lesson.course_id == course.id).all()
+    lesson_by_key = {}
+    # Aulas ativas tem prioridade sobre as desativadas com o mesmo caminho
+    for l in sorted(lessons, key=lambda l: l.is_active or 0):
+        lesson_by_key[(l.hierarchy_path or '', l.title)] = l.id
+
+    existing = set(db.session.query(Note.lesson_id, Note.timestamp, Note.content).join(
+        Lesson, Note.lesson_id == Lesson.id
+    ).filter(Lesson.course_id == course.id))
+
+    rows = []
+    results = []
+    for index, item in enumerate(data['notes']):
+        content = _note_content(item) if isinstance(item, dict) else None
+        if not content:
+            results.append({'index': index, 'status': 'error', 'error': 'Anotacao invalida.'})
+            continue
+        hierarchy_path, lesson_title = item.get('hierarchy_path') or '', item.get('lesson_title')
+        if not isinstance(hierarchy_path, str) or not isinstance(lesson_title, str):
+            results.append({'index': index, 'status': 'error', 'error': 'Caminho ou titulo da aula invalido.'})
+            continue
+        lesson_id = lesson_by_key.get((hierarchy_path, lesson_title))
+        if lesson_id is None:
+            results.append({'index': index, 'status': 'error', 'error': 'Aula nao encontrada no curso.',
+                            'lesson_title': lesson_title})
+            continue
+        try:
+            timestamp = _note_timestamp(item)
+        except (TypeError, ValueError):
+            results.append({'index': index, 'status': 'error', 'error': 'Timestamp invalido.'})
+            continue
+        key = (lesson_id, timestamp, content)
+        if key in existing:
+            results.append({'index': index, 'status': 'skipped', 'lesson_id': lesson_id})
+            continue
+        existing.add(key)
+
+        created_at = None
+        if item.get('created_at'):
+            try:
+                created_at = datetime.fromisoformat(item['created_at'])
+            except (TypeError, ValueError):
+                created_at = None
+        row = {'lesson_id': lesson_id, 'timestamp': timestamp, 'content': content}
+        if created_at:
+            row['created_at'] = created_at
+        rows.append(row)
+        results.append({'index': index, 'status': 'ok', 'lesson_id': lesson_id})
+
+    # Insercao em lote: um executemany e um unico commit
+    with_date = [r for r in rows if 'created_at' in r]
+    without_date = [r for r in rows if 'created_at' not in r]
+    if with_date:
+        db.session.execute(db.insert(Note), with_date)
+    if without_date:
+        db.session.execute(db.insert(Note), without_date)
+    db.session.commit()
+
+    return jsonify({
+        'course_id': course.id,
+        'imported': len(rows),
+        'skipped': sum(1 for r in results if r['status'] == 'skipped'),
+        'failed': sum(1 for r in results if r['status'] == 'error'),
+        'results': results,
+    }), 201
+
+
 @bp.route('/api/courses/<int:course_id>/annotated-lessons', methods=['GET'])
+@query_budget(1)
 def list_annotated_lessons(course_id):
     """Retorna as aulas que possuem anotacoes, com contagem de notas."""
     results = db.session.query(
@@ -101,115 +314,120 @@ def list_annotated_lessons(course_id):
     } for r in results])
 
 
-# -- Exportacao de anotacoes em PDF --
+# -- Exportacao de anotacoes (PDF, Markdown, HTML, Anki) --
+
+def _frontend_origin():
+    """Origem do frontend para os links das anotacoes: FRONTEND_URL, senao a origem da pagina que
+    pediu a exportacao (o frontend chama a API em outra porta), senao o proprio servidor."""
+    configured = current_app.config.get('FRONTEND_URL')
+    if configured:
+        return configured
+    origin = request.headers.get('Origin')
+    if origin and origin != 'null':
+        return origin
+    referrer = urlsplit(request.referrer or '')
+    if referrer.scheme in ('http', 'https') and referrer.netloc:
+        return f"{referrer.scheme}://{referrer.netloc}"
+    return request.host_url
+
+
+@profiled('export')
+def _export_response(doc, fmt):
+    """Gera a resposta de download para um documento da camada de consulta de notes_export."""
+    exporter = EXPORTERS[fmt]
+    doc['link_base'] = _frontend_origin()
+    doc['uploads_dir'] = os.path.join(current_app.root_path, 'uploads')
+    safe_name = secure_filename(doc['filename']) or doc['fallback_filename']
+    download_name = f"{safe_name}.{exporter['extension']}"
+
+    if exporter['kind'] == 'stream':
+        response = current_app.response_class(
+            stream_with_context(profiled_iter('export', exporter['render'](doc))), mimetype=exporter['mimetype'])
+        response.headers['Content-Disposition'] = f'attachment; filename="{download_name}"'
+        return response
+
+    if exporter['kind'] == 'file':
+        out_path = exporter['render'](doc)
+        response = send_file(out_path, mimetype=exporter['mimetype'], as_attachment=True,
+                             download_name=download_name)
+        response.call_on_close(lambda: os.remove(out_path))
+        return response
+
+    buf = exporter['render'](doc)
+    if not buf:
+        return jsonify({'error': f'Erro ao gerar {exporter["extension"].upper()}.'}), 500
+    return send_file(buf, mimetype=exporter['mimetype'], as_attachment=True, download_name=download_name)
+
+
+def _parse_export_date():
+    date_str = request.args.get('date')
+    if not date_str:
+        date_str = datetime.now().strftime('%Y-%m-%d')
+    try:
+        return datetime.strptime(date_str, '%Y-%m-%d')
+    except ValueError:
+        return None
 
-@bp.route('/api/lessons/<int:lesson_id>/notes/export-pdf', methods=['GET'])
-def export_lesson_notes_pdf(lesson_id):
-    """Exporta anotacoes de uma aula como PDF."""
-    lesson = Lesson.query.get_or_404(lesson_id)
-    notes = Note.query.filter_by(lesson_id=lesson_id).order_by(Note.timestamp.asc()).all()
 
-    if not notes:
+@bp.route('/api/lessons/<int:lesson_id>/notes/export/<fmt>', methods=['GET'])
+@query_budget(5)
+def export_lesson_notes(lesson_id, fmt):
+    """Exporta anotacoes de uma aula no formato escolhido (pdf, md, html, anki)."""
+    if fmt not in EXPORTERS:
+        return jsonify({'error': f'Formato de exportacao invalido: {fmt}'}), 400
+    doc = query_lesson_notes(Lesson.query.get_or_404(lesson_id))
+    if doc is None:
         return jsonify({'error': 'Nenhuma anotacao encontrada para esta aula.'}), 404
-
-    course = Course.query.get(lesson.course_id)
-    course_name = course.name if course else ""
-
-    # Montar caminho completo: Curso > Modulo > Aula
-    path_parts = []
-    if course_name:
-        path_parts.append(course_name)
-    if lesson.module:
-        module_parts = lesson.module.split("/")
-        path_parts.extend(p.strip() for p in module_parts[1:] if p.strip())
-    path_parts.append(lesson.title)
-    full_path = " &gt; ".join(path_parts)
-
-    notes_html = ""
-    for n in notes:
-        notes_html += f'''
-        <div class="note">
-            <p class="timestamp">{format_timestamp_pdf(n.timestamp)}</p>
-            {n.content}
-        </div>'''
-
-    html = f"""<!DOCTYPE html>
-<html><head><meta charset="utf-8"><style>{pdf_css()}</style></head>
-<body>
-    <h1>{full_path}</h1>
-    {notes_html}
-</body></html>"""
-
-    pdf_buf = generate_pdf(html)
-    if not pdf_buf:
-        return jsonify({'error': 'Erro ao gerar PDF.'}), 500
-
-    safe_title = secure_filename(lesson.title) or f"aula-{lesson_id}"
-    return send_file(pdf_buf, mimetype='application/pdf', as_attachment=True,
-                     download_name=f"notas-{safe_title}.pdf")
-
-
-@bp.route('/api/courses/<int:course_id>/notes/export-pdf', methods=['GET'])
-def export_course_notes_pdf(course_id):
-    """Exporta todas as anotacoes de um curso como PDF, agrupadas por modulo > aula."""
-    course = Course.query.get_or_404(course_id)
-
-    lessons_with_notes = db.session.query(Lesson).join(Note).filter(
-        Lesson.course_id == course_id,
-        Lesson.is_active == 1
-    ).order_by(Lesson.hierarchy_path.asc()).all()
-
-    if not lessons_with_notes:
+    return _export_response(doc, fmt)
+
+
+@bp.route('/api/courses/<int:course_id>/notes/export/<fmt>', methods=['GET'])
+@query_budget(4)
+def export_course_notes(course_id, fmt):
+    """Exporta todas as anotacoes de um curso, agrupadas por modulo > aula."""
+    if fmt not in EXPORTERS:
+        return jsonify({'error': f'Formato de exportacao invalido: {fmt}'}), 400
+    Course.query.get_or_404(course_id)
+    doc = query_course_notes(course_id)
+    if doc is None:
         return jsonify({'error': 'Nenhuma anotacao encontrada neste curso.'}), 404
+    return _export_response(doc, fmt)
 
-    modules = OrderedDict()
-    for lesson in lessons_with_notes:
-        module_key = lesson.module.split("/")[0] if lesson.module else "(Raiz)"
-        if module_key not in modules:
-            modules[module_key] = []
-        modules[module_key].append(lesson)
-
-    body_html = ""
-    for module_name, lessons in modules.items():
-        body_html += f'<h2>{module_name}</h2>'
-        for lesson in lessons:
-            notes = Note.query.filter_by(lesson_id=lesson.id).order_by(Note.timestamp.asc()).all()
-            if not notes:
-                continue
 
-            sub_path = "/".join(lesson.module.split("/")[1:]) if lesson.module and "/" in lesson.module else ""
-            display_title = f"{sub_path} &gt; {lesson.title}" if sub_path else lesson.title
+@bp.route('/api/notes/by-date/export/<fmt>', methods=['GET'])
+@query_budget(2)
+def export_daily_notes(fmt):
+    """Exporta anotacoes de um dia, agrupadas por curso > aula."""
+    if fmt not in EXPORTERS:
+        return jsonify({'error': f'Formato de exportacao invalido: {fmt}'}), 400
+    date_obj = _parse_export_date()
+    if date_obj is None:
+        return jsonify({'error': 'Formato de data invalido.'}), 400
+    doc = query_daily_notes(date_obj, date_obj + timedelta(days=1))
+    if doc is None:
+        return jsonify({'error': 'Nenhuma anotacao encontrada nesta data.'}), 404
+    return _export_response(doc, fmt)
 
-            body_html += f'<h3>{display_title}</h3>'
-            for n in notes:
-                body_html += f'''
-                <div class="note">
-                    <p class="timestamp">{format_timestamp_pdf(n.timestamp)}</p>
-                    {n.content}
-                </div>'''
 
-    html = f"""<!DOCTYPE html>
-<html><head><meta charset="utf-8"><style>{pdf_css()}</style></head>
-<body>
-    <h1>{course.name}</h1>
-    <p class="course-name">Anotacoes do curso</p>
-    {body_html}
-</body></html>"""
+@bp.route('/api/lessons/<int:lesson_id>/notes/export-pdf', methods=['GET'])
+@query_budget(5)
+def export_lesson_notes_pdf(lesson_id):
+    """Exporta anotacoes de uma aula como PDF."""
+    return export_lesson_notes(lesson_id, 'pdf')
 
-    pdf_buf = generate_pdf(html)
-    if not pdf_buf:
-        return jsonify({'error': 'Erro ao gerar PDF.'}), 500
 
-    safe_name = secure_filename(course.name) or f"curso-{course_id}"
-    return send_file(pdf_buf, mimetype='application/pdf', as_attachment=True,
-                     download_name=f"notas-{safe_name}.pdf")
+@bp.route('/api/courses/<int:course_id>/notes/export-pdf', methods=['GET'])
+@query_budget(4)
+def export_course_notes_pdf(course_id):
+    """Exporta todas as anotacoes de um curso como PDF, agrupadas por modulo > aula."""
+    return export_course_notes(course_id, 'pdf')
 
 
 # -- Upload de imagens para anotacoes --
 
 @bp.route('/api/upload-note-image', methods=['POST'])
 def upload_note_image():
-    """Recebe uma imagem e salva em uploads/note-images/."""
+    """Recebe uma imagem e salva em uploads/note-images/ com o hash do conteudo como nome."""
     if 'image' not in request.files:
         return jsonify({'error': 'Nenhuma imagem enviada.'}), 400
 
@@ -223,23 +441,46 @@ def upload_note_image():
     if ext not in allowed:
         return jsonify({'error': 'Tipo de arquivo nao permitido.'}), 400
 
-    # Garantir diretorio
-    upload_dir = os.path.join(current_app.root_path, 'uploads', 'note-images')
-    os.makedirs(upload_dir, exist_ok=True)
-
-    # Gerar nome unico
-    filename = f"{uuid.uuid4().hex}{ext}"
-    filepath = os.path.join(upload_dir, filename)
-    file.save(filepath)
+    # Gravar em blocos; imagens repetidas reaproveitam o arquivo existente
+    filename = store_content_addressed(file.stream, note_images_dir(current_app.root_path), ext)
+    enqueue_default_variants(os.path.join(current_app.root_path, 'uploads'), f"note-images/{filename}")
 
     # Retornar URL relativa que o frontend pode usar
     url = f"/uploads/note-images/{filename}"
     return jsonify({'url': url}), 201
 
 
+@bp.route('/api/note-images/gc', methods=['POST'])
+def start_note_images_gc():
+    """Remove em background as imagens que nenhuma anotacao (ou exportacao) referencia mais."""
+    if gc_progress.get('running'):
+        return jsonify({'error': 'Limpeza ja em andamento.', 'already_running': True}), 409
+
+    app_obj = current_app._get_current_object()
+
+    def gc_background():
+        with app_obj.app_context():
+            try:
+                gc_note_images(app_obj.root_path)
+            except Exception:
+                pass
+
+    thread = threading.Thread(target=gc_background)
+    thread.daemon = True
+    thread.start()
+
+    return jsonify({'message': 'Limpeza de imagens iniciada'}), 202
+
+
+@bp.route('/api/note-images/gc', methods=['GET'])
+def get_note_images_gc_progress():
+    return jsonify(gc_progress)
+
+
 # -- Revisao diaria de anotacoes --
 
 @bp.route('/api/notes/by-date', methods=['GET'])
+@query_budget(1)
 def list_notes_by_date():
     """Retorna anotacoes de um dia especifico, agrupadas por curso > aula."""
     date_str = request.args.get('date')
@@ -307,69 +548,7 @@ def list_notes_by_date():
 
 
 @bp.route('/api/notes/by-date/export-pdf', methods=['GET'])
+@query_budget(2)
 def export_daily_notes_pdf():
     """Exporta anotacoes de um dia como PDF."""
-    date_str = request.args.get('date')
-    if not date_str:
-        date_str = datetime.now().strftime('%Y-%m-%d')
-
-    try:
-        date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-    except ValueError:
-        return jsonify({'error': 'Formato de data invalido.'}), 400
-
-    next_day = date_obj + timedelta(days=1)
-
-    notes = db.session.query(Note, Lesson, Course).join(
-        Lesson, Note.lesson_id == Lesson.id
-    ).join(
-        Course, Lesson.course_id == Course.id
-    ).filter(
-        Note.created_at >= date_obj,
-        Note.created_at < next_day
-    ).order_by(Course.name.asc(), Lesson.hierarchy_path.asc(), Note.timestamp.asc()).all()
-
-    if not notes:
-        return jsonify({'error': 'Nenhuma anotacao encontrada nesta data.'}), 404
-
-    # Agrupar por curso > aula
-    courses = OrderedDict()
-    for note, lesson, course in notes:
-        if course.id not in courses:
-            courses[course.id] = {'name': course.name, 'lessons': OrderedDict()}
-        if lesson.id not in courses[course.id]['lessons']:
-            sub_parts = lesson.module.split("/")[1:] if lesson.module and "/" in lesson.module else []
-            sub_path = " > ".join(p.strip() for p in sub_parts if p.strip())
-            display = f"{sub_path} > {lesson.title}" if sub_path else lesson.title
-            courses[course.id]['lessons'][lesson.id] = {'display': display, 'notes': []}
-        courses[course.id]['lessons'][lesson.id]['notes'].append(note)
-
-    # Formatar data para exibicao
-    formatted_date = date_obj.strftime('%d/%m/%Y')
-
-    body_html = ""
-    for course_data in courses.values():
-        body_html += f'<h2>{course_data["name"]}</h2>'
-        for lesson_data in course_data['lessons'].values():
-            body_html += f'<h3>{lesson_data["display"]}</h3>'
-            for n in lesson_data['notes']:
-                body_html += f'''
-                <div class="note">
-                    <p class="timestamp">{format_timestamp_pdf(n.timestamp)}</p>
-                    {n.content}
-                </div>'''
-
-    html = f"""<!DOCTYPE html>
-<html><head><meta charset="utf-8"><style>{pdf_css()}</style></head>
-<body>
-    <h1>Revisao do dia {formatted_date}</h1>
-    <p class="course-name">{len(notes)} anotacoes em {len(courses)} curso(s)</p>
-    {body_html}
-</body></html>"""
-
-    pdf_buf = generate_pdf(html)
-    if not pdf_buf:
-        return jsonify({'error': 'Erro ao gerar PDF.'}), 500
-
-    return send_file(pdf_buf, mimetype='application/pdf', as_attachment=True,
-                     download_name=f"revisao-{date_str}.pdf")
+    return export_daily_notes('pdf')
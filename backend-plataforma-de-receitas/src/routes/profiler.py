@@ -0,0 +1,64 @@
+import os
+import math
+from flask import Blueprint, request, jsonify, current_app
+
+from helpers import profiler
+
+bp = Blueprint('profiler', __name__)
+
+
+def _profiles_dir():
+    return os.path.join(current_app.root_path, 'uploads', profiler.PROFILES_SUBDIR)
+
+
+def _disabled():
+    if current_app.config.get('PROFILER_ENABLED'):
+        return None
+    return jsonify({'error': 'Profiler desativado. Defina PROFILER_ENABLED=1 para usar.'}), 404
+
+
+@bp.route('/api/admin/profiler', methods=['GET'])
+def get_profiler_status():
+    disabled = _disabled()
+    if disabled:
+        return disabled
+    return jsonify({**profiler.profiler_status(), 'profiles': profiler.list_profiles(_profiles_dir())})
+
+
+@bp.route('/api/admin/profiler/start', methods=['POST'])
+def start_profiler():
+    """Inicia uma sessao de amostragem sobre um alvo: scan, export, add-all ou path (prefixo da rota)."""
+    disabled = _disabled()
+    if disabled:
+        return disabled
+    if profiler.profiler_status()['active']:
+        return jsonify({'error': 'Ja existe uma sessao de profiling ativa.'}), 409
+    data = request.get_json(silent=True) or {}
+    try:
+        interval_ms = float(data.get('interval_ms', profiler.DEFAULT_INTERVAL_MS))
+        duration_seconds = float(data.get('duration_seconds', profiler.DEFAULT_DURATION_SECONDS))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'interval_ms e duration_seconds devem ser numeros.'}), 400
+    # Infinity/NaN (ou 1e309) derrubariam a thread de amostragem no wait, sem gravar nem liberar a sessao
+    if not (math.isfinite(interval_ms) and math.isfinite(duration_seconds)):
+        return jsonify({'error': 'interval_ms e duration_seconds devem ser numeros finitos.'}), 400
+    path = data.get('path')
+    if path is not None and not isinstance(path, str):
+        return jsonify({'error': 'path deve ser texto.'}), 400
+
+    status, error = profiler.start_session(data.get('target', ''), _profiles_dir(), path_prefix=path,
+                                           interval_ms=interval_ms, duration_seconds=duration_seconds)
+    if error:
+        return jsonify({'error': error}), 400
+    return jsonify(status), 201
+
+
+@bp.route('/api/admin/profiler/stop', methods=['POST'])
+def stop_profiler():
+    disabled = _disabled()
+    if disabled:
+        return disabled
+    result = profiler.stop_session()
+    if result is None:
+        return jsonify({'error': 'Nenhuma sessao de profiling ativa.'}), 404
+    return jsonify(result)
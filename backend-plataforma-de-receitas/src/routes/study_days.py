@@ -1,12 +1,27 @@
-from flask import Blueprint, request, jsonify
-from datetime import date as date_cls, timedelta
+from flask import Blueprint, request, jsonify, current_app
+from datetime import date as date_cls
+import hashlib
 
-from app import db, FocusSession
+from app import db, StudyDay
+from helpers.focus_stats import get_streak
+from helpers.metrics import query_budget
 
 bp = Blueprint('study_days', __name__)
 
 
+def _heatmap_etag(year, start, end):
+    """ETag do ano: muda apenas quando algum dia daquele ano e criado, alterado ou removido."""
+    count, total, last_update = db.session.query(
+        db.func.count(StudyDay.id),
+        db.func.sum(StudyDay.total_seconds),
+        db.func.max(StudyDay.updated_at),
+    ).filter(StudyDay.date >= start, StudyDay.date <= end).one()
+    raw = f"{year}:{count}:{total or 0}:{last_update}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
 @bp.route('/api/study-days/heatmap', methods=['GET'])
+@query_budget(2)
 def study_heatmap():
     year = request.args.get('year', None, type=int)
     if not year:
@@ -15,40 +30,31 @@ def study_heatmap():
     start = f'{year}-01-01'
     end = f'{year}-12-31'
 
-    focus_rows = db.session.query(
-        FocusSession.date,
-        db.func.sum(FocusSession.duration_seconds).label('total_seconds')
-    ).filter(
-        FocusSession.mode == 'focus',
-        FocusSession.date >= start,
-        FocusSession.date <= end
-    ).group_by(FocusSession.date).all()
+    etag = _heatmap_etag(year, start, end)
+    if etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+
+    rows = db.session.query(StudyDay.date, StudyDay.total_seconds).filter(
+        StudyDay.date >= start,
+        StudyDay.date <= end,
+        StudyDay.session_count > 0
+    ).all()
 
     result = {}
-    for row in focus_rows:
+    for row in rows:
         result[row.date] = {
             'hours': round(row.total_seconds / 3600, 2),
         }
 
-    return jsonify(result)
+    response = jsonify(result)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 
 @bp.route('/api/study-days/streak', methods=['GET'])
+@query_budget(1)
 def study_day_streak():
-    focus_dates = db.session.query(
-        db.distinct(FocusSession.date)
-    ).filter(FocusSession.mode == 'focus').all()
-    all_dates = {row[0] for row in focus_dates}
-
-    today = date_cls.today()
-    streak = 0
-    current = today
-
-    if today.isoformat() not in all_dates:
-        current = today - timedelta(days=1)
-
-    while current.isoformat() in all_dates:
-        streak += 1
-        current -= timedelta(days=1)
-
-    return jsonify({'streak': streak})
+    return jsonify(get_streak())
@@ -1,12 +1,22 @@
 import os
 import json
-import glob as glob_mod
+import hashlib
+import time
 import threading
 from app import db, Lesson, Course, Note
 from video_utils import get_video_duration_v1
+from helpers import metrics
+from helpers.profiler import profiled
+from helpers.file_security import normalize_path, directory_index
+from helpers.lesson_content import invalidate_course_content
+from helpers.module_tree import rebuild_module_tree
 
 SUPPORTED_EXTENSIONS = (".mp4", ".avi", ".mov", ".wmv", ".flv", ".mkv", ".webm", ".pdf", ".ts", ".txt", ".html")
 SUBTITLE_EXTENSIONS = (".srt", ".vtt")
+# Hash de identidade: tamanho + 3 blocos (início, meio e fim) em vez do arquivo inteiro
+HASH_SAMPLE_SIZE = 64 * 1024
+# Caminhos/ids por consulta IN nas buscas em lote (limite de parâmetros do SQLite)
+LOOKUP_CHUNK_SIZE = 500
 
 # Progresso de escaneamento por course_id
 scan_progress = {}
@@ -15,6 +25,9 @@ scan_progress = {}
 _scan_locks = {}
 _locks_lock = threading.Lock()
 
+# Tempos de sondagem do scan em andamento na thread (cada scan roda numa thread)
+_scan_probes = threading.local()
+
 
 def get_scan_lock(course_id):
     with _locks_lock:
@@ -36,6 +49,7 @@ def count_files_recursive(directory):
     return total
 
 
+@profiled('scan')
 def list_and_register_lessons(course_path, course_id, extra_paths=None):
     lock = get_scan_lock(course_id)
     if not lock.acquire(blocking=False):
@@ -43,13 +57,11 @@ def list_and_register_lessons(course_path, course_id, extra_paths=None):
         return
 
     try:
+        started = time.perf_counter()
+        _scan_probes.timings = []
+
         # Construir mapa de lições existentes por caminho do arquivo
-        existing_lessons = Lesson.query.filter_by(course_id=course_id).all()
-        existing_by_path = {}
-        for lesson in existing_lessons:
-            file_path = lesson.video_url or lesson.pdf_url
-            if file_path:
-                existing_by_path[file_path] = lesson
+        existing_by_path = lessons_by_path(course_id)
 
         # Coletar todos os paths para escanear
         all_paths = [course_path]
@@ -63,158 +75,423 @@ def list_and_register_lessons(course_path, course_id, extra_paths=None):
 
         # Rastrear arquivos encontrados no disco
         found_file_paths = set()
+        new_files = []
+        # Legendas de cada pasta, indexadas a partir da mesma listagem do scan
+        subtitle_index = {}
 
         for path in all_paths:
             if os.path.isdir(path):
-                _merge_lessons_in_directory(path, course_id, "", existing_by_path, found_file_paths)
+                _merge_lessons_in_directory(path, course_id, "", existing_by_path, found_file_paths, new_files,
+                                            subtitle_index)
+
+        # Lições cujos arquivos não estão mais no caminho antigo: podem ter sido renomeadas/movidas
+        missing = [lesson for file_path, lesson in existing_by_path.items() if file_path not in found_file_paths]
+        register_new_files(course_id, new_files, missing, subtitle_index)
 
         # Soft delete: desativar lições cujos arquivos não existem mais no disco
-        for file_path, lesson in existing_by_path.items():
-            if file_path not in found_file_paths:
-                lesson.is_active = 0
+        for lesson in missing:
+            lesson.is_active = 0
 
+        # Árvore de módulos e contagens na mesma transação das lições
+        rebuild_module_tree(course_id)
         db.session.commit()
-
+        invalidate_course_content(course_id)
+
+        elapsed = time.perf_counter() - started
+        processed = scan_progress[course_id]["processed"]
+        files_per_second = processed / elapsed if elapsed > 0 else 0.0
+        probe_p95 = metrics.percentile(_scan_probes.timings, 0.95)
+        metrics.observe('scan_duration_seconds', elapsed)
+        metrics.inc('scan_files_total', processed)
+        metrics.set_gauge('scan_last_files_per_second', round(files_per_second, 2), course_id=course_id)
+        metrics.set_gauge('scan_last_probe_p95_seconds', round(probe_p95, 4), course_id=course_id)
+
+        scan_progress[course_id].update({
+            "elapsed_seconds": round(elapsed, 2),
+            "files_per_second": round(files_per_second, 1),
+            "probes": len(_scan_probes.timings),
+            "probe_p95_ms": round(probe_p95 * 1000, 1),
+        })
         scan_progress[course_id]["current_file"] = ""
         scan_progress[course_id]["done"] = True
     finally:
+        _scan_probes.timings = None
         lock.release()
 
 
-def _find_subtitles_for_video(video_path):
-    """Busca arquivos de legenda (.srt, .vtt) ao lado do vídeo.
-    Procura: nome_base.srt, nome_base.vtt, nome_base.*.srt, nome_base.*.vtt
+def probe_duration(file_path):
+    """Duração do vídeo via ffmpeg, medindo o tempo da sondagem."""
+    started = time.perf_counter()
+    try:
+        return get_video_duration_v1(file_path)
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.observe('ffmpeg_probe_seconds', elapsed)
+        timings = getattr(_scan_probes, 'timings', None)
+        if timings is not None:
+            timings.append(elapsed)
+
+
+def _subtitle_key(name):
+    """Chave do índice de legendas: nome normalizado e sem diferença de maiúsculas (Aula01.SRT = aula01.srt)."""
+    return normalize_path(name).casefold()
+
+
+def _build_subtitle_index(directory, names):
+    """Índice da pasta: nome base normalizado -> legendas, a partir de uma única listagem.
+    aula01.srt entra em "aula01"; aula01.pt-BR.srt entra em "aula01.pt-br" e em "aula01"
+    (mesmas regras de nome_base.ext e nome_base.*.ext, sem diferenciar maiúsculas)."""
+    index = {}
+    for name in sorted(names):
+        key = _subtitle_key(name)
+        ext = next((e for e in SUBTITLE_EXTENSIONS if key.endswith(e)), None)
+        if ext is None:
+            continue
+        path = normalize_path(os.path.join(directory, name))
+        stem = key[:-len(ext)]
+        # Nome exato primeiro, variantes com idioma depois (por extensão, como na busca antiga)
+        index.setdefault(stem, {}).setdefault(ext, ([], []))[0].append(path)
+        dot = stem.find(".", 1)
+        while dot != -1:
+            index.setdefault(stem[:dot], {}).setdefault(ext, ([], []))[1].append(path)
+            dot = stem.find(".", dot + 1)
+    return index
+
+
+def _subtitle_index_for(directory, subtitle_index):
+    index = subtitle_index.get(directory)
+    if index is None:
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            names = []
+        index = subtitle_index[directory] = _build_subtitle_index(directory, names)
+    return index
+
+
+def _subtitles_for(file_path, subtitle_index=None):
+    """Legendas (.srt, .vtt) ao lado do vídeo: nome_base.ext e nome_base.*.ext (código de idioma).
+    subtitle_index guarda o índice de cada pasta já listada; sem ele a pasta é listada na hora.
     Retorna JSON string com lista de caminhos encontrados, ou None."""
-    directory = os.path.dirname(video_path)
-    base_name = os.path.splitext(os.path.basename(video_path))[0]
+    # Detectar legendas para vídeos (não para PDFs, TXT, HTML)
+    if file_path.lower().endswith((".pdf", ".txt", ".html")):
+        return None
+    if subtitle_index is None:
+        subtitle_index = {}
+    index = _subtitle_index_for(os.path.dirname(file_path), subtitle_index)
+    entry = index.get(_subtitle_key(os.path.splitext(os.path.basename(file_path))[0]))
+    if not entry:
+        return None
     found = []
     for ext in SUBTITLE_EXTENSIONS:
-        # Legenda com nome exato: aula01.srt
-        exact = os.path.join(directory, base_name + ext)
-        if os.path.isfile(exact):
-            found.append(exact)
-        # Legenda com código de idioma: aula01.pt.srt, aula01.en.vtt
-        pattern = os.path.join(directory, base_name + ".*" + ext)
-        for match in glob_mod.glob(pattern):
-            if match not in found:
-                found.append(match)
+        exact, variants = entry.get(ext, ([], []))
+        found.extend(exact)
+        found.extend(variants)
     return json.dumps(found) if found else None
 
 
-def _merge_lessons_in_directory(directory, course_id, hierarchy_prefix, existing_by_path, found_file_paths):
+def file_identity(file_path):
+    """("dispositivo:inode", tamanho) do arquivo, ou (None, None) se não der para ler."""
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None, None
+    file_id = f"{st.st_dev}:{st.st_ino}" if st.st_ino else None
+    return file_id, st.st_size
+
+
+def sampled_hash(file_path, size=None):
+    """SHA-256 do tamanho e de blocos do início, meio e fim do arquivo.
+    Identifica o mesmo conteúdo após cópia entre discos (inode muda) lendo no máximo 192 KB."""
+    try:
+        if size is None:
+            size = os.path.getsize(file_path)
+        digest = hashlib.sha256(str(size).encode("ascii"))
+        with open(file_path, "rb") as f:
+            for offset in sorted({0, max(0, size // 2 - HASH_SAMPLE_SIZE // 2), max(0, size - HASH_SAMPLE_SIZE)}):
+                f.seek(offset)
+                digest.update(f.read(HASH_SAMPLE_SIZE))
+        return digest.hexdigest()
+    except OSError:
+        return None
+
+
+def record_file_identity(lesson, file_path):
+    """Guarda inode/tamanho; o hash de amostras só é (re)calculado se faltar ou o tamanho mudar."""
+    file_id, size = file_identity(file_path)
+    if size is None:
+        return
+    if lesson.content_hash is None or lesson.file_size != size:
+        lesson.content_hash = sampled_hash(file_path, size)
+    lesson.file_id = file_id
+    lesson.file_size = size
+
+
+def match_moved_lesson(file_path, candidates):
+    """Entre candidates (lições cujo arquivo sumiu do caminho antigo), encontra a que tem o mesmo
+    conteúdo de file_path: mesmo inode e tamanho (renomeação/movimentação no mesmo disco)
+    ou mesmo tamanho e hash de amostras (cópia). Retorna a lição ou None."""
+    file_id, size = file_identity(file_path)
+    if size is None:
+        return None
+    same_size = [c for c in candidates if c.file_size == size]
+    if not same_size:
+        return None
+
+    content_hash = None
+    if file_id:
+        for candidate in same_size:
+            if candidate.file_id == file_id:
+                # Inode pode ter sido reaproveitado por outro arquivo: conferir o hash se houver
+                if candidate.content_hash is None:
+                    return candidate
+                content_hash = sampled_hash(file_path, size)
+                if candidate.content_hash == content_hash:
+                    return candidate
+
+    hashed = [c for c in same_size if c.content_hash]
+    if not hashed:
+        return None
+    content_hash = content_hash or sampled_hash(file_path, size)
+    for candidate in hashed:
+        if candidate.content_hash == content_hash:
+            return candidate
+    return None
+
+
+def set_lesson_path(lesson, file_path):
+    file_path = normalize_path(file_path)
+    if lesson.pdf_url:
+        lesson.pdf_url = file_path
+    else:
+        lesson.video_url = file_path
+
+
+def register_new_files(course_id, new_files, candidates, subtitle_index=None):
+    """Registra arquivos novos [(caminho, hierarquia)]. Se o conteúdo corresponder a uma lição de
+    candidates, ela é movida para o novo caminho (progresso, notas e duração preservados, sem
+    sondar com ffmpeg); senão cria a lição. Lições reaproveitadas são removidas de candidates."""
+    unmatched = []
+    for file_path, hierarchy_prefix in new_files:
+        lesson = match_moved_lesson(file_path, candidates) if candidates else None
+        if lesson is not None:
+            candidates.remove(lesson)
+            set_lesson_path(lesson, file_path)
+            refresh_lesson(lesson, file_path, hierarchy_prefix, subtitle_index)
+        else:
+            unmatched.append((file_path, hierarchy_prefix))
+
+    # Sondar durações (ffmpeg) antes de qualquer escrita: no SQLite a transação de escrita só começa
+    # no primeiro flush, assim scans de vários cursos em paralelo não se bloqueiam durante a sondagem.
+    # Doadores e suas notas são buscados em lote, não uma consulta por arquivo.
+    with db.session.no_autoflush:
+        donors = _find_donors(course_id, [file_path for file_path, _ in unmatched])
+        donor_notes = _notes_by_lesson({donor.id for donor in donors.values()})
+    durations = {file_path: probe_duration(file_path)
+                 for file_path, _ in unmatched if not (file_path in donors and donors[file_path].duration_seconds)}
+
+    for file_path, hierarchy_prefix in unmatched:
+        donor = donors.get(file_path)
+        create_lesson(course_id, file_path, hierarchy_prefix, duration=durations.get(file_path),
+                      subtitle_index=subtitle_index, donor=donor,
+                      donor_notes=donor_notes.get(donor.id, ()) if donor else ())
+
+
+def refresh_lesson(lesson, file_path, hierarchy_prefix, subtitle_index=None):
+    """Atualiza título, hierarquia e legendas de uma lição existente (progresso e notas preservados)."""
+    lesson.title = os.path.splitext(os.path.basename(file_path))[0]
+    lesson.module = hierarchy_prefix
+    lesson.hierarchy_path = hierarchy_prefix
+    lesson.is_active = 1  # Reativar se estava desativada
+    lesson.subtitle_urls = _subtitles_for(file_path, subtitle_index)
+    record_file_identity(lesson, file_path)
+
+
+def _find_donors(course_id, file_paths):
+    """Lições de outros cursos com os mesmos arquivos (para copiar progresso e notas), por caminho.
+    Entre vários doadores do mesmo arquivo, prefere o que já tem duração."""
+    donors = {}
+    file_paths = list(file_paths)
+    for i in range(0, len(file_paths), LOOKUP_CHUNK_SIZE):
+        # Caminho gravado (NFC ou forma antiga) -> caminho pedido
+        chunk = {}
+        for file_path in file_paths[i:i + LOOKUP_CHUNK_SIZE]:
+            for form in _path_forms(file_path):
+                chunk[form] = file_path
+        rows = Lesson.query.filter(
+            Lesson.course_id != course_id,
+            db.or_(Lesson.video_url.in_(chunk), Lesson.pdf_url.in_(chunk))
+        ).order_by(Lesson.id)
+        for lesson in rows:
+            file_path = chunk.get(lesson.video_url) or chunk[lesson.pdf_url]
+            current = donors.get(file_path)
+            if current is None or (not current.duration_seconds and lesson.duration_seconds):
+                donors[file_path] = lesson
+    return donors
+
+
+def _notes_by_lesson(lesson_ids):
+    notes = {}
+    lesson_ids = list(lesson_ids)
+    for i in range(0, len(lesson_ids), LOOKUP_CHUNK_SIZE):
+        rows = Note.query.filter(Note.lesson_id.in_(lesson_ids[i:i + LOOKUP_CHUNK_SIZE])).order_by(Note.id)
+        for note in rows:
+            notes.setdefault(note.lesson_id, []).append(note)
+    return notes
+
+
+def create_lesson(course_id, file_path, hierarchy_prefix, duration=None, subtitle_index=None, donor=None,
+                  donor_notes=()):
+    """Registra uma nova lição; copia progresso e notas (donor_notes) do doador, a lição de outro
+    curso com o mesmo arquivo. duration já sondada pode ser passada para não chamar o ffmpeg aqui."""
+    title = os.path.splitext(os.path.basename(file_path))[0]
+    is_pdf = file_path.lower().endswith(".pdf")
+    video_url = "" if is_pdf else normalize_path(file_path)
+    pdf_url = normalize_path(file_path) if is_pdf else ""
+
+    if duration is None and not (donor and donor.duration_seconds):
+        duration = probe_duration(file_path)
+    if donor:
+        progress_status = donor.progress_status
+        isCompleted = donor.isCompleted
+        elapsed_seconds = donor.elapsed_seconds
+        duration = donor.duration_seconds or duration
+    else:
+        progress_status = 0
+        isCompleted = 0
+        elapsed_seconds = 0
+
+    lesson = Lesson(
+        course_id=course_id,
+        title=title,
+        module=hierarchy_prefix,
+        hierarchy_path=hierarchy_prefix,
+        video_url=video_url,
+        duration_seconds=duration,
+        progress_status=progress_status,
+        isCompleted=isCompleted,
+        elapsed_seconds=elapsed_seconds,
+        pdf_url=pdf_url,
+        subtitle_urls=_subtitles_for(file_path, subtitle_index),
+        is_active=1
+    )
+    record_file_identity(lesson, file_path)
+    db.session.add(lesson)
+
+    # Copiar notas do donor (a relação preenche lesson_id no flush, sem um flush por lição)
+    for note in donor_notes:
+        db.session.add(Note(
+            lesson=lesson,
+            timestamp=note.timestamp,
+            content=note.content
+        ))
+    return lesson
+
+
+def _merge_lessons_in_directory(directory, course_id, hierarchy_prefix, existing_by_path, found_file_paths, new_files,
+                                subtitle_index):
     try:
         entries = list(os.scandir(directory))
     except PermissionError:
         return
 
-    entries.sort(key=lambda e: (e.is_file(), os.path.splitext(e.name)[0]))
-
+    # Tipo de cada entrada lido uma única vez, logo após a listagem: uma entrada removida ou
+    # ilegível nesse intervalo fica de fora em vez de interromper o scan do curso
+    listed = []
     for entry in entries:
-        if entry.is_dir():
+        try:
+            listed.append((entry, entry.is_dir(), entry.is_file()))
+        except OSError:
+            continue
+    listed.sort(key=lambda item: (item[2], os.path.splitext(item[0].name)[0]))
+    subtitle_index[directory] = _build_subtitle_index(directory, [entry.name for entry, is_dir, _ in listed if not is_dir])
+    # A mesma listagem alimenta o índice de nomes normalizados usado por resolve_path
+    directory_index(directory, [entry.name for entry, _, _ in listed])
+
+    for entry, is_dir, is_file in listed:
+        if is_dir:
             new_hierarchy_prefix = f"{hierarchy_prefix}/{entry.name}" if hierarchy_prefix else entry.name
-            _merge_lessons_in_directory(entry.path, course_id, new_hierarchy_prefix, existing_by_path, found_file_paths)
-        elif entry.is_file() and entry.name.lower().endswith(SUPPORTED_EXTENSIONS):
-            title = os.path.splitext(entry.name)[0]
-            is_pdf = entry.name.lower().endswith(".pdf")
+            _merge_lessons_in_directory(entry.path, course_id, new_hierarchy_prefix, existing_by_path, found_file_paths, new_files,
+                                        subtitle_index)
+        elif is_file and entry.name.lower().endswith(SUPPORTED_EXTENSIONS):
             file_path = entry.path
+            # Caminhos guardados em NFC; file_path (forma do disco) segue para leitura do arquivo
+            stored_path = normalize_path(file_path)
 
             if course_id in scan_progress:
                 scan_progress[course_id]["current_file"] = entry.name
                 scan_progress[course_id]["current_module"] = hierarchy_prefix
 
-            found_file_paths.add(file_path)
-
-            # Detectar legendas para vídeos (não para PDFs, TXT, HTML)
-            subtitle_json = None
-            is_document = entry.name.lower().endswith((".pdf", ".txt", ".html"))
-            if not is_document:
-                subtitle_json = _find_subtitles_for_video(file_path)
+            found_file_paths.add(stored_path)
 
-            if file_path in existing_by_path:
+            lesson = existing_by_path.get(stored_path)
+            if lesson is not None:
                 # Lição existente: preservar progresso e notas, atualizar hierarquia
-                lesson = existing_by_path[file_path]
-                lesson.title = title
-                lesson.module = hierarchy_prefix
-                lesson.hierarchy_path = hierarchy_prefix
-                lesson.is_active = 1  # Reativar se estava desativada
-                lesson.subtitle_urls = subtitle_json
+                if (lesson.video_url or lesson.pdf_url) != stored_path:
+                    set_lesson_path(lesson, file_path)  # caminho antigo gravado em NFD
+                refresh_lesson(lesson, file_path, hierarchy_prefix, subtitle_index)
             else:
-                # Nova lição: tentar copiar progresso de outro curso com mesmo arquivo
-                video_url = "" if is_pdf else file_path
-                pdf_url = file_path if is_pdf else ""
-
-                donor = Lesson.query.filter(
-                    Lesson.course_id != course_id,
-                    db.or_(
-                        db.and_(Lesson.video_url == file_path, Lesson.video_url != ""),
-                        db.and_(Lesson.pdf_url == file_path, Lesson.pdf_url != "")
-                    )
-                ).first()
-
-                if donor:
-                    progressStatus = donor.progressStatus
-                    isCompleted = donor.isCompleted
-                    time_elapsed = donor.time_elapsed
-                    duration = donor.duration or str(get_video_duration_v1(file_path))
-                else:
-                    progressStatus = 'not_started'
-                    isCompleted = 0
-                    time_elapsed = '0'
-                    duration = str(get_video_duration_v1(file_path))
-
-                lesson = Lesson(
-                    course_id=course_id,
-                    title=title,
-                    module=hierarchy_prefix,
-                    hierarchy_path=hierarchy_prefix,
-                    video_url=video_url,
-                    duration=duration,
-                    progressStatus=progressStatus,
-                    isCompleted=isCompleted,
-                    time_elapsed=time_elapsed,
-                    pdf_url=pdf_url,
-                    subtitle_urls=subtitle_json,
-                    is_active=1
-                )
-                db.session.add(lesson)
-                db.session.flush()  # Para obter lesson.id
-
-                # Copiar notas do donor
-                if donor:
-                    donor_notes = Note.query.filter_by(lesson_id=donor.id).all()
-                    for note in donor_notes:
-                        new_note = Note(
-                            lesson_id=lesson.id,
-                            timestamp=note.timestamp,
-                            content=note.content
-                        )
-                        db.session.add(new_note)
+                # Criação fica para depois do scan: o arquivo pode ser uma lição renomeada/movida
+                new_files.append((file_path, hierarchy_prefix))
 
             if course_id in scan_progress:
                 scan_progress[course_id]["processed"] += 1
 
 
-def scan_data_directory_and_register_courses(scan_path):
-    entries = list(os.scandir(scan_path))
-    added = 0
-
-    for entry in entries:
-        if entry.is_dir():
-            if Course.query.filter(Course.path == entry.path).first():
-                continue
-
-            course = Course(
+def _path_forms(path):
+    """Formas em que um caminho pode estar gravado: NFC (atual) e a original do disco (lições antigas)."""
+    return {normalize_path(path), path}
+
+
+def lessons_by_path(course_id, directory=None):
+    """Mapa caminho do arquivo (NFC) -> lição do curso (opcionalmente só dentro de directory)."""
+    query = Lesson.query.filter_by(course_id=course_id)
+    if directory:
+        prefixes = _path_forms(directory.rstrip("/\\") + os.sep)
+        query = query.filter(db.or_(*[column.startswith(prefix, autoescape=True)
+                                      for prefix in prefixes for column in (Lesson.video_url, Lesson.pdf_url)]))
+    result = {}
+    for lesson in query:
+        file_path = lesson.video_url or lesson.pdf_url
+        if file_path:
+            result[normalize_path(file_path)] = lesson
+    return result
+
+
+def inactive_lessons_by_size(course_id, sizes):
+    """Lições desativadas do curso com algum dos tamanhos: candidatas a arquivo movido."""
+    sizes = [size for size in set(sizes) if size is not None]
+    if not sizes:
+        return []
+    return Lesson.query.filter(Lesson.course_id == course_id, Lesson.is_active == 0,
+                               Lesson.file_size.in_(sizes)).all()
+
+
+def register_lessons_in_directory(course_id, directory, hierarchy_prefix):
+    """Registra/reativa as lições de uma única pasta (e subpastas), sem reescanear o curso inteiro.
+    Não faz commit."""
+    new_files = []
+    subtitle_index = {}
+    _merge_lessons_in_directory(directory, course_id, hierarchy_prefix,
+                                lessons_by_path(course_id, directory), set(), new_files, subtitle_index)
+    candidates = inactive_lessons_by_size(course_id, (file_identity(path)[1] for path, _ in new_files))
+    register_new_files(course_id, new_files, candidates, subtitle_index)
+
+
+def register_courses_in_directory(scan_path):
+    """Cria numa única transação um curso para cada subpasta ainda não cadastrada.
+    Retorna os cursos criados; o scan das aulas fica a cargo de quem chamou."""
+    known_paths = {path for (path,) in db.session.query(Course.path)}
+    courses = []
+    for entry in sorted(os.scandir(scan_path), key=lambda e: e.name):
+        if entry.is_dir() and entry.path not in known_paths:
+            courses.append(Course(
                 name=entry.name,
                 path=entry.path,
                 isCoverUrl=0,
                 fileCover=None,
                 urlCover=None
-            )
-
-            db.session.add(course)
-            db.session.commit()
-
-            list_and_register_lessons(course.path, course.id)
-            added += 1
-
-    return added
+            ))
+    db.session.add_all(courses)
+    db.session.commit()
+    return courses
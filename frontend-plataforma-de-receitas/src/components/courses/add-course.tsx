@@ -1,4 +1,4 @@
-import { useRef, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import {
   Dialog,
   DialogContent,
@@ -27,6 +27,17 @@ type Props = {
   onCreate: () => void;
 };
 
+type ImportBatchProgress = {
+  batch_id: string;
+  total_courses: number;
+  done_courses: number;
+  failed_courses: number[];
+  total_files: number;
+  processed_files: number;
+  percentage: number;
+  done: boolean;
+};
+
 export default function AddCourse({ onCreate }: Props) {
   const [courseName, setCourseName] = useState("");
   const [imageURL, setImageURL] = useState("");
@@ -42,9 +53,40 @@ export default function AddCourse({ onCreate }: Props) {
 
   const [isOpen, setIsOpen] = useState(false);
 
+  const [importBatch, setImportBatch] = useState<ImportBatchProgress | null>(null);
+
   const { apiUrl } = useApiUrl();
   const { activeScans, startScan } = useScanProgress();
 
+  // Acompanhar a importação em lote (os cursos são escaneados em paralelo no backend)
+  const importBatchId = importBatch?.batch_id;
+  const onCreateRef = useRef(onCreate);
+  onCreateRef.current = onCreate;
+  useEffect(() => {
+    if (!importBatchId) return;
+    const intervalId = window.setInterval(async () => {
+      try {
+        const res = await fetch(`${apiUrl}/api/courses/import-batches/${importBatchId}`);
+        if (!res.ok) return;
+        const data: ImportBatchProgress = await res.json();
+        setImportBatch(data);
+        if (data.done) {
+          clearInterval(intervalId);
+          setImportBatch(null);
+          if (data.failed_courses.length > 0) {
+            toast.error(`${data.failed_courses.length} curso(s) com erro no escaneamento.`);
+          } else {
+            toast.success(`${data.total_courses} curso(s) escaneado(s)!`, { duration: 3000 });
+          }
+          onCreateRef.current();
+        }
+      } catch {
+        // silenciar erros de rede
+      }
+    }, 1000);
+    return () => clearInterval(intervalId);
+  }, [apiUrl, importBatchId]);
+
   const automaticallyAddCourses = async () => {
     if (!autoScanPath.trim()) {
       toast.error("Informe o caminho da pasta com os cursos.");
@@ -69,7 +111,17 @@ export default function AddCourse({ onCreate }: Props) {
 
       const result = await response.json();
       if (result.added > 0) {
-        toast.success(`${result.added} curso(s) adicionado(s)!`, { duration: 3000 });
+        toast.success(`${result.added} curso(s) adicionado(s)! Escaneando aulas...`, { duration: 3000 });
+        setImportBatch({
+          batch_id: result.batch_id,
+          total_courses: result.added,
+          done_courses: 0,
+          failed_courses: [],
+          total_files: 0,
+          processed_files: 0,
+          percentage: 0,
+          done: false,
+        });
       } else {
         toast.info("Nenhum curso novo encontrado nessa pasta.", { duration: 3000 });
       }
@@ -195,7 +247,22 @@ export default function AddCourse({ onCreate }: Props) {
           </div>
         </div>
       ))}
-      {isLoading && activeScans.length === 0 && (
+      {importBatch && (
+        <div className="flex-1 bg-neutral-100 dark:bg-neutral-800 px-4 py-3 rounded-md border border-purple-200 dark:border-purple-800">
+          <div className="flex items-center gap-2 mb-2">
+            <FolderSync className="h-4 w-4 text-purple-500 animate-spin" />
+            <p className="text-sm font-medium flex-1 truncate">
+              Importando cursos: {importBatch.done_courses} / {importBatch.total_courses}
+            </p>
+            <span className="text-sm font-bold tabular-nums">{importBatch.percentage}%</span>
+          </div>
+          <Progress value={importBatch.percentage} className="mb-2" />
+          <p className="text-xs text-muted-foreground tabular-nums">
+            {importBatch.processed_files.toLocaleString()} / {importBatch.total_files.toLocaleString()} arquivos
+          </p>
+        </div>
+      )}
+      {isLoading && activeScans.length === 0 && !importBatch && (
         <div className="flex justify-center bg-neutral-100 dark:bg-neutral-800 px-4 py-2 rounded-md text-sm items-center">
           <Loader2 className="animate-spin h-4 mr-2" />
           <p>Processando aulas (pode demorar)...</p>
@@ -45,7 +45,7 @@ export default function CourseItem({
   const courseCover = course.isCoverUrl
     ? course.urlCover
     : course.fileCover
-    ? `${apiUrl}/uploads/${course.fileCover}`
+    ? `${apiUrl}/uploads/${course.fileCover}?w=640`
     : noImage;
 
   const handleToggleFavorite = async (e: React.MouseEvent) => {
@@ -22,12 +22,25 @@ export default function DeleteCourse({ course, onUpdate }: Props) {
 
   const { apiUrl } = useApiUrl();
 
+  const waitForDeletion = async () => {
+    // A exclusao roda em background no backend; acompanhar ate concluir
+    for (;;) {
+      const res = await axios.get(`${apiUrl}/api/courses/${course.id}/delete-progress`);
+      if (res.data.done) return res.data;
+      await new Promise((resolve) => setTimeout(resolve, 500));
+    }
+  };
+
   const onDelete = async () => {
     try {
-      const res = await axios.delete(`${apiUrl}/api/courses/${course.id}`);
-      const data = res.data;
+      await axios.delete(`${apiUrl}/api/courses/${course.id}`);
+      setShowConfirm(false);
+      onUpdate();
+      const data = await waitForDeletion();
 
-      if (data.notes_exported) {
+      if (data.error) {
+        toast.error("Erro ao excluir o curso.");
+      } else if (data.notes_exported) {
         toast.success(`Excluído! ${data.notes_exported} anotações foram salvas em arquivo.`, {
           duration: 5000,
         });
@@ -5,10 +5,12 @@ import { Card, CardContent } from "@/components/ui/card";
 import { Badge } from "@/components/ui/badge";
 import { Button } from "@/components/ui/button";
 import { MODE_LABELS } from "./constants";
-import { getFocusSessions, deleteFocusSession } from "@/services/focusSessions";
+import { getFocusSessionsPage, getFocusStats, deleteFocusSession } from "@/services/focusSessions";
 import useApiUrl from "@/hooks/useApiUrl";
 import type { FocusSession, TimerMode } from "@/models/models";
 
+const PAGE_SIZE = 50;
+
 function formatDuration(seconds: number): string {
   const h = Math.floor(seconds / 3600);
   const m = Math.floor((seconds % 3600) / 60);
@@ -28,30 +30,54 @@ export function SessionHistory() {
     return `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, "0")}-${String(d.getDate()).padStart(2, "0")}`;
   });
   const [sessions, setSessions] = useState<FocusSession[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
+  // Totais do dia vêm do servidor: a lista pode ter só as primeiras páginas
+  const [totals, setTotals] = useState({ sessions: 0, seconds: 0 });
 
-  const loadSessions = () => {
-    setLoading(true);
-    getFocusSessions(apiUrl, date)
-      .then(setSessions)
-      .catch(() => setSessions([]))
-      .finally(() => setLoading(false));
+  const loadTotals = () => {
+    getFocusStats(apiUrl, date, date)
+      .then((stats) => setTotals({ sessions: stats.total_sessions, seconds: stats.total_seconds }))
+      .catch(() => setTotals({ sessions: 0, seconds: 0 }));
   };
 
   useEffect(() => {
-    loadSessions();
+    let cancelled = false;
+    setLoading(true);
+    setNextCursor(null);
+    getFocusSessionsPage(apiUrl, { from: date, to: date, limit: PAGE_SIZE })
+      .then((page) => {
+        if (cancelled) return;
+        setSessions(page.data);
+        setNextCursor(page.next_cursor);
+      })
+      .catch(() => !cancelled && setSessions([]))
+      .finally(() => !cancelled && setLoading(false));
+    loadTotals();
+    return () => { cancelled = true; };
   }, [apiUrl, date]);
 
+  const loadMore = () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    getFocusSessionsPage(apiUrl, { from: date, to: date, limit: PAGE_SIZE, cursor: nextCursor })
+      .then((page) => {
+        setSessions((prev) => [...prev, ...page.data]);
+        setNextCursor(page.next_cursor);
+      })
+      .catch(() => {})
+      .finally(() => setLoadingMore(false));
+  };
+
   const handleDelete = async (id: number) => {
     try {
       await deleteFocusSession(apiUrl, id);
       setSessions((prev) => prev.filter((s) => s.id !== id));
+      loadTotals();
     } catch {}
   };
 
-  const focusSessions = sessions.filter((s) => s.mode === "focus");
-  const totalSeconds = focusSessions.reduce((sum, s) => sum + s.duration_seconds, 0);
-
   return (
     <div className="space-y-4">
       <div className="flex items-center gap-3">
@@ -62,9 +88,9 @@ export function SessionHistory() {
           onChange={(e) => setDate(e.target.value)}
           className="w-auto"
         />
-        {focusSessions.length > 0 && (
+        {totals.sessions > 0 && (
           <span className="text-sm text-muted-foreground">
-            {focusSessions.length} sessões - {formatDuration(totalSeconds)} de foco
+            {totals.sessions} sessões - {formatDuration(totals.seconds)} de foco
           </span>
         )}
       </div>
@@ -101,6 +127,12 @@ export function SessionHistory() {
           </Card>
         ))}
       </div>
+
+      {!loading && nextCursor && (
+        <Button variant="outline" size="sm" className="w-full" onClick={loadMore} disabled={loadingMore}>
+          {loadingMore ? "Carregando..." : "Carregar mais"}
+        </Button>
+      )}
     </div>
   );
 }
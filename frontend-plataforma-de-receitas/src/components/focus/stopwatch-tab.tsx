@@ -4,7 +4,7 @@ import { Button } from "@/components/ui/button";
 import { Input } from "@/components/ui/input";
 import useStopwatch from "@/hooks/useStopwatch";
 import useApiUrl from "@/hooks/useApiUrl";
-import { createFocusSession } from "@/services/focusSessions";
+import { queueFocusSession } from "@/services/focusSessionQueue";
 import { toast } from "sonner";
 
 const QUICK_LABELS = ["Anki", "Leitura", "Revisão", "Exercícios"];
@@ -80,9 +80,9 @@ export function StopwatchTab() {
     }
 
     setSaving(true);
+    const now = new Date();
     try {
-      const now = new Date();
-      await createFocusSession(apiUrl, {
+      await queueFocusSession(apiUrl, {
         subject_name: label,
         subject_id: toSlug(label),
         started_at: sessionStartedAt?.toISOString() || now.toISOString(),
@@ -95,7 +95,9 @@ export function StopwatchTab() {
       toast.success(`${label} - ${formatTime(elapsedMs)} salvo!`);
       reset();
     } catch {
-      toast.error("Erro ao salvar sessão.");
+      // A sessão ficou na fila local e será reenviada quando o backend responder
+      toast.warning(`${label} - ${formatTime(elapsedMs)} salvo localmente, será sincronizado depois.`);
+      reset();
     } finally {
       setSaving(false);
     }
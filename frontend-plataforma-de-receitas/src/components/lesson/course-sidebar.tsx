@@ -2,7 +2,7 @@ import CoursePercentage from "@/components/course-percentage";
 import LastWatchedCard from "@/components/lesson/last-watched-card";
 import ModuleList from "@/components/lesson/module-list";
 import NoteList from "@/components/lesson/note-list";
-import { NestedModules } from "@/models/models";
+import { ModuleTree } from "@/models/models";
 import { type ModuleLinks } from "@/services/moduleLinks";
 import { Tabs, TabsContent, TabsList, TabsTrigger } from "@/components/ui/tabs";
 import { Input } from "@/components/ui/input";
@@ -19,7 +19,7 @@ interface CourseSidebarProps {
   onTabChange: (value: string) => void;
   lessonSearch: string;
   onLessonSearchChange: (value: string) => void;
-  filteredModules: NestedModules;
+  moduleTree: ModuleTree | null;
   onUpdate: () => void;
   onBatchToggle: (lessonIds: number[], isCompleted: boolean) => void;
   moduleLinks: ModuleLinks;
@@ -43,7 +43,7 @@ export function CourseSidebar({
   onTabChange,
   lessonSearch,
   onLessonSearchChange,
-  filteredModules,
+  moduleTree,
   onUpdate,
   onBatchToggle,
   moduleLinks,
@@ -120,15 +120,17 @@ export function CourseSidebar({
             </div>
           </div>
           {!lessonSearch && <LastWatchedCard courseId={courseId} />}
-          <ModuleList
-            modules={filteredModules}
-            onUpdate={onUpdate}
-            onBatchToggle={onBatchToggle}
-            courseId={courseId}
-            moduleLinks={moduleLinks}
-            onModuleLinksChange={onModuleLinksChange}
-            apiUrl={apiUrl}
-          />
+          {moduleTree && (
+            <ModuleList
+              tree={moduleTree}
+              onUpdate={onUpdate}
+              onBatchToggle={onBatchToggle}
+              courseId={courseId}
+              moduleLinks={moduleLinks}
+              onModuleLinksChange={onModuleLinksChange}
+              apiUrl={apiUrl}
+            />
+          )}
         </TabsContent>
         <TabsContent value="anotacoes" forceMount className="mt-0 data-[state=inactive]:hidden">
           <NoteList
@@ -70,9 +70,9 @@ export default function LastWatchedCard({ courseId }: Props) {
               {ext}
             </code>
           )}
-          {lesson.duration && lesson.duration !== "0" && (
+          {lesson.duration > 0 && (
             <span className="text-[10px] text-muted-foreground">
-              {formatDuration(Number(lesson.duration))}
+              {formatDuration(lesson.duration)}
             </span>
           )}
         </div>
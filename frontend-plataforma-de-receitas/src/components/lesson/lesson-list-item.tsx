@@ -96,9 +96,9 @@ const LessonListItem = memo(function LessonListItem({
               {fileExt}
             </code>
 
-            {lesson.duration != "0" && (
+            {lesson.duration > 0 && (
               <code className="px-1.5 py-0.5 bg-neutral-100 dark:bg-neutral-800 text-muted-foreground border border-neutral-200 dark:border-neutral-700 rounded text-[10px] shrink-0">
-                {formatDuration(Number(lesson.duration))}
+                {formatDuration(lesson.duration)}
               </code>
             )}
 
@@ -16,10 +16,9 @@ const isDocumentFile = (url: string): boolean => {
   );
 };
 
+// Conteúdo servido pelo id da aula (backend resolve e valida o caminho, com cache)
 const getResourcePath = (lesson: Lesson): string => {
-  return `/serve-content?path=${encodeURIComponent(
-    lesson.pdf_url || lesson.video_url || ""
-  )}`;
+  return `/api/lessons/${lesson.id}/content`;
 };
 
 const getFileExt = (lesson: Lesson): string => {
@@ -56,7 +55,8 @@ function buildSubtitleTracks(
       ? LANGUAGE_LABELS[langCode] || langCode
       : "Legenda";
     const language = langCode || "pt";
-    const src = `${apiUrl}/serve-content?path=${encodeURIComponent(filePath)}`;
+    // Backend converte SRT para WebVTT (UTF-8) e mantém em cache
+    const src = `${apiUrl}/api/subtitles?path=${encodeURIComponent(filePath)}`;
     return { src, label, language, default: index === 0 };
   });
 }
@@ -75,6 +75,8 @@ type Props = {
   onOpenNotesPip?: () => void;
   isNotesPipOpen?: boolean;
   onLessonCompleted?: () => void;
+  // Instante inicial (link de anotação); sem ele, o vídeo retoma do progresso salvo
+  startAt?: number | null;
 };
 
 export default function LessonViewer({
@@ -88,6 +90,7 @@ export default function LessonViewer({
   onOpenNotesPip,
   isNotesPipOpen = false,
   onLessonCompleted,
+  startAt = null,
 }: Props) {
   const [elapsedTime, setElapsedTime] = useState<number>(
     lesson?.time_elapsed || 0
@@ -203,6 +206,12 @@ export default function LessonViewer({
   useEffect(() => {
     if (!lesson) return;
 
+    if (startAt != null) {
+      setElapsedTime(startAt);
+      currentLessonIdRef.current = lesson.id;
+      return;
+    }
+
     const fetchElapsedTime = async () => {
       try {
         const res = await api.get(`${apiUrl}/api/lessons/${lesson.id}`);
@@ -451,9 +460,8 @@ export default function LessonViewer({
                         onClick={() => {
                           // Se a aula atual é vídeo, abre PDF flutuante
                           if (!isDocument) {
-                            const docUrl = doc.pdf_url || doc.video_url || "";
                             setFloatingPdf({
-                              src: `${apiUrl}/serve-content?path=${encodeURIComponent(docUrl)}`,
+                              src: `${apiUrl}${getResourcePath(doc)}`,
                               title: doc.title,
                             });
                             setMateriaisOpen(false);
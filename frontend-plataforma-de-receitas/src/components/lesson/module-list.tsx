@@ -1,4 +1,4 @@
-import { Lesson, NestedModules } from "@/models/models";
+import { Lesson, ModuleTree, ModuleTreeNode } from "@/models/models";
 import {
   Accordion,
   AccordionContent,
@@ -7,10 +7,7 @@ import {
 } from "../ui/accordion";
 import LessonListItem from "./lesson-list-item";
 import useSelectedLesson from "@/hooks/useSelectedLesson";
-
-import {
-  calculateCompletionPercentage,
-} from "@/utils/utils";
+import { collectModuleLessons, findModulePath } from "@/services/moduleTree";
 
 import { toast } from "sonner";
 import ProgressCard from "../progress-card";
@@ -30,7 +27,7 @@ import { useEffect, useMemo, useState, useCallback, useRef } from "react";
 import { createModuleLink, updateModuleLink, deleteModuleLink, getDistinctLabels, type ModuleLinks } from "@/services/moduleLinks";
 
 type Props = {
-  modules: NestedModules;
+  tree: ModuleTree;
   onUpdate: () => void;
   onBatchToggle?: (lessonIds: number[], isCompleted: boolean) => void;
   courseId: string;
@@ -39,86 +36,6 @@ type Props = {
   apiUrl?: string;
 };
 
-// --- Tree helpers ---
-
-type SubgroupNode = {
-  title: string;
-  lessons: Lesson[];
-  children: SubgroupNode[];
-};
-
-type GroupedNode = {
-  title: string;
-  allLessons: Lesson[];
-  directLessons: Lesson[];
-  subFolders: GroupedNode[];
-};
-
-function buildSubgroupTree(entries: [string, Lesson[]][]): SubgroupNode[] {
-  if (entries.length === 0) return [];
-
-  const groups = new Map<string, { main: Lesson[]; childEntries: [string, Lesson[]][] }>();
-
-  for (const [path, lessons] of entries) {
-    const slashIdx = path.indexOf("/");
-    const first = slashIdx === -1 ? path : path.substring(0, slashIdx);
-    const rest = slashIdx === -1 ? null : path.substring(slashIdx + 1);
-
-    if (!groups.has(first)) {
-      groups.set(first, { main: [], childEntries: [] });
-    }
-    const g = groups.get(first)!;
-    if (rest === null) {
-      g.main.push(...lessons);
-    } else {
-      g.childEntries.push([rest, lessons]);
-    }
-  }
-
-  const nodes: SubgroupNode[] = [];
-  for (const [title, { main, childEntries }] of groups) {
-    nodes.push({
-      title,
-      lessons: main,
-      children: buildSubgroupTree(childEntries),
-    });
-  }
-
-  nodes.sort((a, b) =>
-    a.title.localeCompare(b.title, undefined, { numeric: true, sensitivity: "base" })
-  );
-  return nodes;
-}
-
-/** If a node has no direct lessons and exactly one child, merge with the child (keeping parent title). */
-function flattenSingleChildNodes(nodes: SubgroupNode[]): SubgroupNode[] {
-  return nodes.map((node) => {
-    const flatChildren = flattenSingleChildNodes(node.children);
-    if (node.lessons.length === 0 && flatChildren.length === 1) {
-      return { ...flatChildren[0], title: node.title };
-    }
-    return { ...node, children: flatChildren };
-  });
-}
-
-function getAllNodeLessons(node: SubgroupNode): Lesson[] {
-  return [...node.lessons, ...node.children.flatMap(getAllNodeLessons)];
-}
-
-function nodeToGrouped(node: SubgroupNode): GroupedNode {
-  return {
-    title: node.title,
-    allLessons: getAllNodeLessons(node),
-    directLessons: node.lessons,
-    subFolders: node.children.map(nodeToGrouped),
-  };
-}
-
-function toGroupedNodes(entries: [string, Lesson[]][]): GroupedNode[] {
-  const tree = flattenSingleChildNodes(buildSubgroupTree(entries));
-  return tree.map(nodeToGrouped);
-}
-
 function getSubfolderIcon(name: string) {
   const lower = name.toLowerCase();
   if (lower.includes("anexo")) return Paperclip;
@@ -126,20 +43,15 @@ function getSubfolderIcon(name: string) {
   return FolderOpen;
 }
 
-/** Encontra todas as chaves de sub-folders no caminho até uma aula específica. */
-function findSubFolderPathToLesson(node: GroupedNode, lessonId: number, keyPrefix: string): string[] {
-  for (const sub of node.subFolders) {
-    if (sub.allLessons.some((l) => l.id === lessonId)) {
-      const subKey = `${keyPrefix}/${sub.title}`;
-      return [subKey, ...findSubFolderPathToLesson(sub, lessonId, subKey)];
-    }
-  }
-  return [];
+// Estado do checkbox "marcar todas" a partir das contagens do nó
+function nodeCheckedState(node: ModuleTreeNode): boolean | "indeterminate" {
+  if (node.lesson_count > 0 && node.completed_count >= node.lesson_count) return true;
+  return node.completed_count > 0 ? "indeterminate" : false;
 }
 
 // --- Component ---
 
-export default function ModuleList({ modules, onUpdate, onBatchToggle, courseId, moduleLinks = {}, onModuleLinksChange, apiUrl }: Props) {
+export default function ModuleList({ tree, onUpdate, onBatchToggle, courseId, moduleLinks = {}, onModuleLinksChange, apiUrl }: Props) {
   const { selectLesson, selectedLesson } = useSelectedLesson();
   const activeLessonRef = useRef<HTMLDivElement>(null);
 
@@ -227,31 +139,10 @@ export default function ModuleList({ modules, onUpdate, onBatchToggle, courseId,
     }
   }, [apiUrl, dialogModule, moduleLinks, onModuleLinksChange]);
 
-  // Seções ordenadas (memoizado para índice estável)
-  const sortedSections = useMemo(() =>
-    Object.entries(modules).sort((a, b) =>
-      a[0].localeCompare(b[0], undefined, { numeric: true, sensitivity: "base" })
-    ),
-    [modules]
-  );
-
-  // Pré-computar groupedNodes para todas as seções (evita recálculo a cada render)
-  const sectionGroupedNodes = useMemo(() =>
-    sortedSections.map(([, subgroups]) => {
-      const subgroupEntries = Object.entries(subgroups).sort((a, b) =>
-        a[0].localeCompare(b[0], undefined, { numeric: true, sensitivity: "base" })
-      );
-      return toGroupedNodes(subgroupEntries);
-    }),
-    [sortedSections]
-  );
-
-  // Estado controlado: seções abertas (outer accordion)
+  // Estado controlado: módulos de topo abertos (accordion)
   const [openSections, setOpenSections] = useState<string[]>([]);
-  // Estado controlado: subgrupo aberto por seção (inner accordions)
-  const [openGroups, setOpenGroups] = useState<Record<string, string | undefined>>({});
 
-  // Estado dos sub-folders colapsáveis (overrides manuais do usuário)
+  // Estado das subpastas colapsáveis, por caminho do módulo (overrides manuais do usuário)
   const [subFolderState, setSubFolderState] = useState<Map<string, boolean>>(new Map());
 
   const toggleSubFolder = useCallback((key: string, currentlyExpanded: boolean) => {
@@ -262,41 +153,24 @@ export default function ModuleList({ modules, onUpdate, onBatchToggle, courseId,
     });
   }, []);
 
-  // Auto-abrir seção e subgrupo da aula selecionada
+  // Nós da árvore que contêm a aula selecionada (módulo de topo até a subpasta)
+  const activePath = useMemo(
+    () => (selectedLesson ? findModulePath(tree.modules, selectedLesson.id) : []),
+    [tree, selectedLesson?.id]
+  );
+  const activeNodeIds = useMemo(() => new Set(activePath.map((node) => node.id)), [activePath]);
+
+  // Auto-abrir o módulo e as subpastas da aula selecionada
   useEffect(() => {
     if (!selectedLesson) return;
 
-    const activeSectionIndex = sortedSections.findIndex(([, subgroups]) =>
-      Object.values(subgroups).flat().some((l) => l.id === selectedLesson.id)
-    );
-
-    if (activeSectionIndex < 0) return;
-
-    const sectionValue = `section-${activeSectionIndex}`;
-
-    // Abrir a seção se não estiver aberta
-    setOpenSections((prev) =>
-      prev.includes(sectionValue) ? prev : [...prev, sectionValue]
-    );
-
-    // Encontrar o subgrupo ativo dentro da seção
-    const groupedNodes = sectionGroupedNodes[activeSectionIndex];
-    const activeNodeIndex = groupedNodes.findIndex((node) =>
-      node.allLessons.some((l) => l.id === selectedLesson.id)
-    );
-
-    if (activeNodeIndex >= 0 && groupedNodes.length > 1) {
-      setOpenGroups((prev) => ({
-        ...prev,
-        [sectionValue]: `group-${activeSectionIndex}-${activeNodeIndex}`,
-      }));
-    }
+    if (activePath.length > 0) {
+      const sectionValue = `section-${activePath[0].id}`;
+      setOpenSections((prev) =>
+        prev.includes(sectionValue) ? prev : [...prev, sectionValue]
+      );
 
-    // Auto-expandir sub-folders no caminho da aula selecionada (recursivo)
-    if (activeNodeIndex >= 0) {
-      const activeNode = groupedNodes[activeNodeIndex];
-      const sectionTitle = sortedSections[activeSectionIndex][0];
-      const pathKeys = findSubFolderPathToLesson(activeNode, selectedLesson.id, `${sectionTitle}/${activeNode.title}`);
+      const pathKeys = activePath.slice(1).map((node) => node.path);
       if (pathKeys.length > 0) {
         setSubFolderState((prev) => {
           let changed = false;
@@ -336,7 +210,7 @@ export default function ModuleList({ modules, onUpdate, onBatchToggle, courseId,
       });
     };
     tryScroll(0);
-  }, [selectedLesson?.id, sortedSections, sectionGroupedNodes]);
+  }, [selectedLesson?.id, activePath]);
 
   const handleCompleteLesson = useCallback(() => {
     try {
@@ -346,29 +220,12 @@ export default function ModuleList({ modules, onUpdate, onBatchToggle, courseId,
     }
   }, [onUpdate]);
 
-  const toggleAllLessons = useCallback((lessons: Lesson[], markCompleted: boolean) => {
+  const toggleAllLessons = useCallback((node: ModuleTreeNode, markCompleted: boolean) => {
     if (onBatchToggle) {
-      onBatchToggle(lessons.map((l) => l.id), markCompleted);
+      onBatchToggle(collectModuleLessons(node).map((l) => l.id), markCompleted);
     }
   }, [onBatchToggle]);
 
-  function getAllLessonsFromSection(subgroups: { [key: string]: Lesson[] }): Lesson[] {
-    return Object.values(subgroups).flat();
-  }
-
-  function sectionContainsLesson(subgroups: { [key: string]: Lesson[] }, lessonId?: number): boolean {
-    if (!lessonId) return false;
-    return Object.values(subgroups).flat().some((l) => l.id === lessonId);
-  }
-
-  function isAllCompleted(lessons: Lesson[]): boolean {
-    return lessons.length > 0 && lessons.every((l) => l.isCompleted);
-  }
-
-  function isSomeCompleted(lessons: Lesson[]): boolean {
-    return lessons.some((l) => l.isCompleted) && !lessons.every((l) => l.isCompleted);
-  }
-
   function renderLessonItem(lesson: Lesson, index: number) {
     const isActive = lesson.id === selectedLesson?.id;
     return (
@@ -386,71 +243,109 @@ export default function ModuleList({ modules, onUpdate, onBatchToggle, courseId,
     );
   }
 
-  function renderGroupedContent(node: GroupedNode, nodeKey: string, startCounter: number = 0) {
-    let counter = startCounter;
+  // Menu de contexto com os links de questões do módulo (chave = caminho do módulo)
+  function renderLinksMenu(key: string, title: string, iconClassName: string) {
+    return (
+      <div className="relative shrink-0" onClick={(e) => e.stopPropagation()}>
+        <button
+          onClick={() => setMenuOpen(menuOpen === key ? null : key)}
+          className="p-1 rounded hover:bg-accent text-muted-foreground hover:text-foreground transition-colors"
+          title={title}
+        >
+          <MoreVertical className={iconClassName} />
+        </button>
+        {menuOpen === key && (
+          <div
+            ref={menuRef}
+            className="absolute right-0 top-full mt-1 z-50 min-w-[200px] bg-popover border rounded-md shadow-md py-1 animate-in fade-in-0 zoom-in-95"
+          >
+            {(moduleLinks[key] || []).map((link) => (
+              <button
+                key={link.id}
+                onClick={() => {
+                  window.open(link.url, "_blank", "noopener,noreferrer");
+                  setMenuOpen(null);
+                }}
+                className="w-full flex items-center gap-2 px-3 py-2 text-xs hover:bg-accent transition-colors text-left"
+              >
+                <ExternalLink className="h-3.5 w-3.5 shrink-0" />
+                <span className="truncate">{link.label}</span>
+              </button>
+            ))}
+            {(moduleLinks[key] || []).length > 0 && (
+              <div className="border-t my-1" />
+            )}
+            <button
+              onClick={() => handleOpenLinkDialog(key)}
+              className="w-full flex items-center gap-2 px-3 py-2 text-xs hover:bg-accent transition-colors text-left text-muted-foreground"
+            >
+              <Link2 className="h-3.5 w-3.5 shrink-0" />
+              Gerenciar links
+            </button>
+          </div>
+        )}
+      </div>
+    );
+  }
+
+  // Aulas do próprio nó, depois as subpastas (mesma ordem da árvore do servidor)
+  function renderNodeContent(node: ModuleTreeNode) {
     let foundFirstIncomplete = false;
 
     return (
       <div className="ml-2 border-l-2 border-neutral-200 dark:border-neutral-700 pl-1">
-        {node.directLessons.map((lesson) => {
-          counter++;
-          return renderLessonItem(lesson, counter);
-        })}
-        {node.subFolders.map((sub) => {
-          const SubIcon = getSubfolderIcon(sub.title);
-          const subAllCompleted = isAllCompleted(sub.allLessons);
-          const subSomeCompleted = isSomeCompleted(sub.allLessons);
-          const subKey = `${nodeKey}/${sub.title}`;
+        {node.lessons.map((lesson, i) => renderLessonItem(lesson, i + 1))}
+        {node.children.map((sub) => {
+          const SubIcon = getSubfolderIcon(sub.name);
+          const checked = nodeCheckedState(sub);
 
-          // Default: primeiro sub-folder incompleto fica expandido
+          // Default: primeira subpasta incompleta fica expandida
           let defaultExpanded = false;
-          if (!subAllCompleted && !foundFirstIncomplete) {
+          if (checked !== true && !foundFirstIncomplete) {
             defaultExpanded = true;
             foundFirstIncomplete = true;
           }
 
-          const isExpanded = subFolderState.has(subKey)
-            ? subFolderState.get(subKey)!
+          const isExpanded = subFolderState.has(sub.path)
+            ? subFolderState.get(sub.path)!
             : defaultExpanded;
 
-          // Sempre contar aulas para numeração correta
-          const subStartCounter = counter;
-          counter += sub.allLessons.length;
-
           return (
-            <div key={sub.title}>
+            <div key={sub.id}>
               <div
                 className={cn(
                   "flex items-center gap-2 px-3 py-2 mt-1 border-t border-dashed cursor-pointer rounded-sm transition-colors",
                   "hover:bg-accent/50",
+                  activeNodeIds.has(sub.id) && "bg-purple-50/30 dark:bg-purple-900/10",
                 )}
-                onClick={() => toggleSubFolder(subKey, isExpanded)}
+                onClick={() => toggleSubFolder(sub.path, isExpanded)}
               >
                 {isExpanded ? (
                   <ChevronDown className="h-3 w-3 text-muted-foreground shrink-0" />
                 ) : (
                   <ChevronRight className="h-3 w-3 text-muted-foreground shrink-0" />
                 )}
-                {subAllCompleted ? (
+                {checked === true ? (
                   <CheckCircle2 className="h-3.5 w-3.5 text-green-500 shrink-0" />
                 ) : (
                   <SubIcon className="h-3.5 w-3.5 text-muted-foreground shrink-0" />
                 )}
-                <span className="text-xs font-medium text-muted-foreground flex-1 truncate">
-                  {sub.title}
+                <span className="text-xs font-medium text-muted-foreground flex-1 truncate" title={sub.name}>
+                  {sub.name}
                 </span>
                 <span className="text-[10px] text-muted-foreground shrink-0">
-                  {sub.allLessons.filter((l) => l.isCompleted).length}/{sub.allLessons.length}
+                  {sub.completed_count}/{sub.lesson_count}
                 </span>
                 <div className="shrink-0" onClick={(e) => e.stopPropagation()}>
                   <Checkbox
-                    checked={subAllCompleted ? true : subSomeCompleted ? "indeterminate" : false}
-                    onCheckedChange={(checked) => toggleAllLessons(sub.allLessons, checked === true)}
-                    title={subAllCompleted ? "Desmarcar todas" : "Marcar todas como concluídas"}
+                    checked={checked}
+                    onCheckedChange={(value) => toggleAllLessons(sub, value === true)}
+                    title={checked === true ? "Desmarcar todas" : "Marcar todas como concluídas"}
                   />
                 </div>
+                {renderLinksMenu(sub.path, "Opções", "h-3 w-3")}
               </div>
-              {isExpanded && renderGroupedContent(sub, subKey, subStartCounter)}
+              {isExpanded && renderNodeContent(sub)}
             </div>
           );
         })}
@@ -460,38 +355,36 @@ export default function ModuleList({ modules, onUpdate, onBatchToggle, courseId,
 
   return (
     <div>
+      {/* Aulas soltas na raiz do curso */}
+      {tree.lessons.length > 0 && (
+        <div className="p-2">
+          {tree.lessons.map((lesson, i) => renderLessonItem(lesson, i + 1))}
+        </div>
+      )}
       <Accordion
         type="multiple"
         className="w-full"
         value={openSections}
         onValueChange={setOpenSections}
       >
-        {sortedSections.map(([sectionTitle, subgroups], sectionIndex) => {
-            const allSectionLessons = getAllLessonsFromSection(subgroups);
-            const sectionCompletion = calculateCompletionPercentage(allSectionLessons);
-            const isCompleteSection = sectionCompletion === 100;
-            const isActiveSection = sectionContainsLesson(subgroups, selectedLesson?.id);
-
-            const groupedNodes = sectionGroupedNodes[sectionIndex];
-            const isSingleFlat = groupedNodes.length === 1 && groupedNodes[0].subFolders.length === 0;
-            const sectionAllCompleted = isAllCompleted(allSectionLessons);
-            const sectionSomeCompleted = isSomeCompleted(allSectionLessons);
-            const sectionValue = `section-${sectionIndex}`;
+        {tree.modules.map((node) => {
+            const checked = nodeCheckedState(node);
+            const sectionValue = `section-${node.id}`;
 
             return (
               <AccordionItem
                 className={cn(
                   "p-2 transition-colors",
-                  isActiveSection && "bg-purple-50/50 dark:bg-purple-900/10"
+                  activeNodeIds.has(node.id) && "bg-purple-50/50 dark:bg-purple-900/10"
                 )}
                 value={sectionValue}
                 key={sectionValue}
               >
-                <AccordionTrigger title={sectionTitle} className="hover:no-underline py-3">
+                <AccordionTrigger title={node.name} className="hover:no-underline py-3">
                   <div className="w-full space-y-1.5">
                     <div className="flex items-start gap-2 px-2">
                       <div className="mt-1 shrink-0">
-                        {isCompleteSection ? (
+                        {checked === true ? (
                           <CheckCircle2 className="h-4 w-4 text-green-500" />
                         ) : (
                           <FolderOpen className="h-4 w-4 text-muted-foreground" />
@@ -499,183 +392,28 @@ export default function ModuleList({ modules, onUpdate, onBatchToggle, courseId,
                       </div>
                       <div className="flex-1 min-w-0">
                         <span className="block text-sm text-left font-semibold leading-snug">
-                          {sectionTitle}
+                          {node.name}
                         </span>
                       </div>
                     </div>
                     <div className="flex items-center gap-2 px-2">
-                      <ProgressCard value={sectionCompletion} compact />
+                      <ProgressCard value={node.completion_percentage} compact />
                       <span className="text-[10px] text-muted-foreground shrink-0 whitespace-nowrap">
-                        {allSectionLessons.filter((l) => l.isCompleted).length}/{allSectionLessons.length}
+                        {node.completed_count}/{node.lesson_count}
                       </span>
                       <div className="shrink-0" onClick={(e) => e.stopPropagation()}>
                         <Checkbox
-                          checked={sectionAllCompleted ? true : sectionSomeCompleted ? "indeterminate" : false}
-                          onCheckedChange={(checked) => toggleAllLessons(allSectionLessons, checked === true)}
-                          title={sectionAllCompleted ? "Desmarcar todas do módulo" : "Marcar todas do módulo como concluídas"}
+                          checked={checked}
+                          onCheckedChange={(value) => toggleAllLessons(node, value === true)}
+                          title={checked === true ? "Desmarcar todas do módulo" : "Marcar todas do módulo como concluídas"}
                         />
                       </div>
-                      {/* Menu de contexto do módulo */}
-                      <div className="relative shrink-0" onClick={(e) => e.stopPropagation()}>
-                        <button
-                          onClick={() => setMenuOpen(menuOpen === sectionTitle ? null : sectionTitle)}
-                          className="p-1 rounded hover:bg-accent text-muted-foreground hover:text-foreground transition-colors"
-                          title="Opções do módulo"
-                        >
-                          <MoreVertical className="h-3.5 w-3.5" />
-                        </button>
-                        {menuOpen === sectionTitle && (
-                          <div
-                            ref={menuRef}
-                            className="absolute right-0 top-full mt-1 z-50 min-w-[200px] bg-popover border rounded-md shadow-md py-1 animate-in fade-in-0 zoom-in-95"
-                          >
-                            {(moduleLinks[sectionTitle] || []).map((link) => (
-                              <button
-                                key={link.id}
-                                onClick={() => {
-                                  window.open(link.url, "_blank", "noopener,noreferrer");
-                                  setMenuOpen(null);
-                                }}
-                                className="w-full flex items-center gap-2 px-3 py-2 text-xs hover:bg-accent transition-colors text-left"
-                              >
-                                <ExternalLink className="h-3.5 w-3.5 shrink-0" />
-                                <span className="truncate">{link.label}</span>
-                              </button>
-                            ))}
-                            {(moduleLinks[sectionTitle] || []).length > 0 && (
-                              <div className="border-t my-1" />
-                            )}
-                            <button
-                              onClick={() => handleOpenLinkDialog(sectionTitle)}
-                              className="w-full flex items-center gap-2 px-3 py-2 text-xs hover:bg-accent transition-colors text-left text-muted-foreground"
-                            >
-                              <Link2 className="h-3.5 w-3.5 shrink-0" />
-                              Gerenciar links
-                            </button>
-                          </div>
-                        )}
-                      </div>
+                      {renderLinksMenu(node.path, "Opções do módulo", "h-3.5 w-3.5")}
                     </div>
                   </div>
                 </AccordionTrigger>
                 <AccordionContent>
-                  {isSingleFlat ? (
-                    <div className="ml-3 border-l-2 border-neutral-200 dark:border-neutral-700 pl-1">
-                      {groupedNodes[0].allLessons.map((lesson, i) =>
-                        renderLessonItem(lesson, i + 1)
-                      )}
-                    </div>
-                  ) : (
-                    <Accordion
-                      type="single"
-                      collapsible
-                      className="w-full ml-1 border-l-2 border-neutral-200 dark:border-neutral-700"
-                      value={openGroups[sectionValue] || ""}
-                      onValueChange={(val) =>
-                        setOpenGroups((prev) => ({ ...prev, [sectionValue]: val }))
-                      }
-                    >
-                      {groupedNodes.map((node, nodeIndex) => {
-                        const nodeCompletion = calculateCompletionPercentage(node.allLessons);
-                        const isCompleteNode = nodeCompletion === 100;
-                        const isActiveNode = node.allLessons.some((l) => l.id === selectedLesson?.id);
-                        const allCompleted = isAllCompleted(node.allLessons);
-                        const someCompleted = isSomeCompleted(node.allLessons);
-                        const nodeKey = `${sectionTitle}/${node.title}`;
-
-                        return (
-                          <AccordionItem
-                            className={cn(
-                              "p-1 ml-2 border-l-2 border-transparent",
-                              isActiveNode
-                                ? "border-purple-500 bg-purple-50/30 dark:bg-purple-900/10"
-                                : "border-neutral-200 dark:border-neutral-700"
-                            )}
-                            value={`group-${sectionIndex}-${nodeIndex}`}
-                            key={`group-${sectionIndex}-${nodeIndex}`}
-                          >
-                            <AccordionTrigger title={node.title} className="hover:no-underline py-3">
-                              <div className="w-full space-y-1.5 px-1">
-                                <div className="flex items-start gap-2">
-                                  <div className="mt-1 shrink-0">
-                                    {isCompleteNode ? (
-                                      <CheckCircle2 className="h-3.5 w-3.5 text-green-500" />
-                                    ) : (
-                                      <FolderOpen className="h-3.5 w-3.5 text-muted-foreground" />
-                                    )}
-                                  </div>
-                                  <span className="block text-xs text-left flex-1 leading-snug">
-                                    {node.title}
-                                  </span>
-                                </div>
-                                <div className="flex items-center gap-2">
-                                  <ProgressCard value={nodeCompletion} compact />
-                                  <span className="text-[10px] text-muted-foreground shrink-0 whitespace-nowrap">
-                                    {node.allLessons.filter((l) => l.isCompleted).length}/{node.allLessons.length}
-                                  </span>
-                                  <div
-                                    className="shrink-0"
-                                    onClick={(e) => e.stopPropagation()}
-                                  >
-                                    <Checkbox
-                                      checked={allCompleted ? true : someCompleted ? "indeterminate" : false}
-                                      onCheckedChange={(checked) => {
-                                        toggleAllLessons(node.allLessons, checked === true);
-                                      }}
-                                      title={allCompleted ? "Desmarcar todas" : "Marcar todas como concluídas"}
-                                    />
-                                  </div>
-                                  {/* Menu de contexto do subgrupo */}
-                                  <div className="relative shrink-0" onClick={(e) => e.stopPropagation()}>
-                                    <button
-                                      onClick={() => setMenuOpen(menuOpen === nodeKey ? null : nodeKey)}
-                                      className="p-1 rounded hover:bg-accent text-muted-foreground hover:text-foreground transition-colors"
-                                      title="Opções"
-                                    >
-                                      <MoreVertical className="h-3 w-3" />
-                                    </button>
-                                    {menuOpen === nodeKey && (
-                                      <div
-                                        ref={menuRef}
-                                        className="absolute right-0 top-full mt-1 z-50 min-w-[200px] bg-popover border rounded-md shadow-md py-1 animate-in fade-in-0 zoom-in-95"
-                                      >
-                                        {(moduleLinks[nodeKey] || []).map((link) => (
-                                          <button
-                                            key={link.id}
-                                            onClick={() => {
-                                              window.open(link.url, "_blank", "noopener,noreferrer");
-                                              setMenuOpen(null);
-                                            }}
-                                            className="w-full flex items-center gap-2 px-3 py-2 text-xs hover:bg-accent transition-colors text-left"
-                                          >
-                                            <ExternalLink className="h-3.5 w-3.5 shrink-0" />
-                                            <span className="truncate">{link.label}</span>
-                                          </button>
-                                        ))}
-                                        {(moduleLinks[nodeKey] || []).length > 0 && (
-                                          <div className="border-t my-1" />
-                                        )}
-                                        <button
-                                          onClick={() => handleOpenLinkDialog(nodeKey)}
-                                          className="w-full flex items-center gap-2 px-3 py-2 text-xs hover:bg-accent transition-colors text-left text-muted-foreground"
-                                        >
-                                          <Link2 className="h-3.5 w-3.5 shrink-0" />
-                                          Gerenciar links
-                                        </button>
-                                      </div>
-                                    )}
-                                  </div>
-                                </div>
-                              </div>
-                            </AccordionTrigger>
-                            <AccordionContent>
-                              {renderGroupedContent(node, `${sectionTitle}/${node.title}`)}
-                            </AccordionContent>
-                          </AccordionItem>
-                        );
-                      })}
-                    </Accordion>
-                  )}
+                  {renderNodeContent(node)}
                 </AccordionContent>
               </AccordionItem>
             );
@@ -3,9 +3,20 @@ import useApiUrl from "@/hooks/useApiUrl";
 import { useEffect, useRef, useState, memo } from "react";
 import { Button } from "../ui/button";
 import TiptapEditor from "../ui/tiptap-editor";
-import { BookOpen, Clock, Download, Loader2, MessageSquareText, Pencil, StickyNote, Trash2 } from "lucide-react";
+import { BookOpen, CheckSquare, Clock, Download, Loader2, MessageSquareText, Pencil, StickyNote, Trash2, Upload, X } from "lucide-react";
 import { toast } from "sonner";
-import { getNotes, createNote, updateNote, deleteNote, exportLessonNotesPdf, exportCourseNotesPdf } from "@/services/notes";
+import {
+  getNotes,
+  createNote,
+  updateNote,
+  deleteNote,
+  exportLessonNotesPdf,
+  exportCourseNotes,
+  bulkNoteOperations,
+  importExportedNotes,
+  type NotesExportFormat,
+} from "@/services/notes";
+import { Checkbox } from "../ui/checkbox";
 import { Tooltip, TooltipContent, TooltipProvider, TooltipTrigger } from "../ui/tooltip";
 import {
   AlertDialog,
@@ -55,6 +66,13 @@ function buildAnnotatedTree(lessons: AnnotatedLesson[]) {
     }));
 }
 
+const COURSE_EXPORT_FORMATS: { format: NotesExportFormat; label: string }[] = [
+  { format: "pdf", label: "PDF" },
+  { format: "md", label: "Markdown" },
+  { format: "html", label: "HTML" },
+  { format: "anki", label: "Baralho Anki" },
+];
+
 const HTML_TAG_REGEX = /<[a-z][\s\S]*?>/i;
 
 function NoteContent({ content }: { content: string }) {
@@ -90,6 +108,15 @@ export default memo(function NoteList({ lessonId, courseId, playerTimeRef, onSee
   const [isSaving, setIsSaving] = useState(false);
   const inputAreaRef = useRef<HTMLDivElement>(null);
   const [annotatedLessons, setAnnotatedLessons] = useState<AnnotatedLesson[]>([]);
+  // Seleção de várias notas para excluir de uma vez
+  const [isSelecting, setIsSelecting] = useState(false);
+  const [selectedIds, setSelectedIds] = useState<Set<number>>(new Set());
+  const [isDeletingSelected, setIsDeletingSelected] = useState(false);
+  // Exportação do curso (menu de formatos) e importação de arquivo exportado
+  const [exportMenuOpen, setExportMenuOpen] = useState(false);
+  const exportMenuRef = useRef<HTMLDivElement>(null);
+  const importInputRef = useRef<HTMLInputElement>(null);
+  const [isImporting, setIsImporting] = useState(false);
 
   const fetchNotes = async () => {
     if (!lessonId) return;
@@ -117,10 +144,24 @@ export default memo(function NoteList({ lessonId, courseId, playerTimeRef, onSee
     setNewContent("");
     setCapturedTime(null);
     setEditingId(null);
+    setIsSelecting(false);
+    setSelectedIds(new Set());
     fetchNotes();
     fetchAnnotatedLessons();
   }, [lessonId]);
 
+  // Fechar menu de exportação ao clicar fora
+  useEffect(() => {
+    if (!exportMenuOpen) return;
+    const handleClick = (e: MouseEvent) => {
+      if (exportMenuRef.current && !exportMenuRef.current.contains(e.target as Node)) {
+        setExportMenuOpen(false);
+      }
+    };
+    document.addEventListener("mousedown", handleClick);
+    return () => document.removeEventListener("mousedown", handleClick);
+  }, [exportMenuOpen]);
+
   // Refresh quando anotação rápida é salva
   useEffect(() => {
     if (refreshTrigger && refreshTrigger > 0) {
@@ -206,15 +247,74 @@ export default memo(function NoteList({ lessonId, courseId, playerTimeRef, onSee
     }
   };
 
-  const handleExportCourse = async () => {
+  const handleExportCourse = async (format: NotesExportFormat) => {
     if (!courseId) return;
+    setExportMenuOpen(false);
     try {
-      await exportCourseNotesPdf(apiUrl, courseId);
+      await exportCourseNotes(apiUrl, courseId, format);
     } catch {
       toast.error("Erro ao exportar anotações do curso.");
     }
   };
 
+  const toggleSelected = (noteId: number) => {
+    setSelectedIds((prev) => {
+      const next = new Set(prev);
+      if (next.has(noteId)) next.delete(noteId);
+      else next.add(noteId);
+      return next;
+    });
+  };
+
+  const stopSelecting = () => {
+    setIsSelecting(false);
+    setSelectedIds(new Set());
+  };
+
+  const handleDeleteSelected = async () => {
+    if (selectedIds.size === 0 || isDeletingSelected) return;
+    setIsDeletingSelected(true);
+    try {
+      const result = await bulkNoteOperations(
+        apiUrl,
+        [...selectedIds].map((id) => ({ op: "delete" as const, id }))
+      );
+      if (result.failed > 0) {
+        toast.error(`${result.failed} anotação(ões) não puderam ser excluídas.`);
+      }
+      stopSelecting();
+      fetchNotes();
+      fetchAnnotatedLessons();
+      onNoteSaved?.();
+    } catch {
+      toast.error("Erro ao excluir anotações.");
+    } finally {
+      setIsDeletingSelected(false);
+    }
+  };
+
+  const handleImportFile = async (file: File | undefined) => {
+    if (!file || !courseId) return;
+    setIsImporting(true);
+    try {
+      const result = await importExportedNotes(apiUrl, file, Number(courseId));
+      toast.success(
+        `${result.imported} anotação(ões) importada(s)` +
+          (result.skipped ? `, ${result.skipped} já existente(s)` : "") +
+          (result.failed ? `, ${result.failed} sem aula correspondente` : "") +
+          "."
+      );
+      fetchNotes();
+      fetchAnnotatedLessons();
+      onNoteSaved?.();
+    } catch {
+      toast.error("Arquivo de anotações inválido.");
+    } finally {
+      setIsImporting(false);
+      if (importInputRef.current) importInputRef.current.value = "";
+    }
+  };
+
   if (!lessonId) {
     return (
       <div className="flex flex-col items-center justify-center gap-3 p-8 text-muted-foreground">
@@ -289,7 +389,66 @@ export default memo(function NoteList({ lessonId, courseId, playerTimeRef, onSee
           </div>
         ) : (
           <div className="p-2 space-y-2">
-            <div className="flex justify-end">
+            <div className="flex items-center justify-end gap-1">
+              {isSelecting ? (
+                <>
+                  <span className="text-xs text-muted-foreground mr-auto px-1">
+                    {selectedIds.size} selecionada(s)
+                  </span>
+                  <AlertDialog>
+                    <AlertDialogTrigger asChild>
+                      <Button
+                        size="sm"
+                        variant="ghost"
+                        className="h-7 text-xs text-red-500 hover:text-red-700"
+                        disabled={selectedIds.size === 0 || isDeletingSelected}
+                      >
+                        {isDeletingSelected ? <Loader2 className="h-3.5 w-3.5 animate-spin" /> : <Trash2 className="h-3.5 w-3.5" />}
+                        Excluir
+                      </Button>
+                    </AlertDialogTrigger>
+                    <AlertDialogContent>
+                      <AlertDialogHeader>
+                        <AlertDialogTitle>Excluir anotações</AlertDialogTitle>
+                        <AlertDialogDescription>
+                          Tem certeza que deseja excluir {selectedIds.size} anotação(ões)? Esta ação não pode ser desfeita.
+                        </AlertDialogDescription>
+                      </AlertDialogHeader>
+                      <AlertDialogFooter>
+                        <AlertDialogCancel>Cancelar</AlertDialogCancel>
+                        <AlertDialogAction onClick={handleDeleteSelected}>
+                          Excluir
+                        </AlertDialogAction>
+                      </AlertDialogFooter>
+                    </AlertDialogContent>
+                  </AlertDialog>
+                  <Button
+                    size="icon"
+                    variant="ghost"
+                    className="h-7 w-7 text-muted-foreground hover:text-foreground"
+                    onClick={stopSelecting}
+                    title="Cancelar seleção"
+                  >
+                    <X className="h-3.5 w-3.5" />
+                  </Button>
+                </>
+              ) : (
+                <TooltipProvider>
+                  <Tooltip>
+                    <TooltipTrigger asChild>
+                      <Button
+                        size="icon"
+                        variant="ghost"
+                        className="h-7 w-7 text-muted-foreground hover:text-foreground"
+                        onClick={() => setIsSelecting(true)}
+                      >
+                        <CheckSquare className="h-3.5 w-3.5" />
+                      </Button>
+                    </TooltipTrigger>
+                    <TooltipContent>Selecionar anotações</TooltipContent>
+                  </Tooltip>
+                </TooltipProvider>
+              )}
               <TooltipProvider>
                 <Tooltip>
                   <TooltipTrigger asChild>
@@ -314,6 +473,13 @@ export default memo(function NoteList({ lessonId, courseId, playerTimeRef, onSee
                 {/* Header: timestamp + actions */}
                 <div className="flex items-center justify-between mb-2">
                   <div className="flex items-center gap-2">
+                    {isSelecting && (
+                      <Checkbox
+                        checked={selectedIds.has(note.id)}
+                        onCheckedChange={() => toggleSelected(note.id)}
+                        title="Selecionar anotação"
+                      />
+                    )}
                     <button
                       onClick={() => onSeek(note.timestamp)}
                       className="inline-flex items-center gap-1 text-xs font-mono bg-purple-100 dark:bg-purple-500/15 text-purple-600 dark:text-purple-400 px-2 py-0.5 rounded-full hover:bg-purple-200 dark:hover:bg-purple-500/25 transition-colors cursor-pointer"
@@ -396,29 +562,72 @@ export default memo(function NoteList({ lessonId, courseId, playerTimeRef, onSee
       </div>
 
       {/* Aulas com anotações - navegação por hierarquia */}
-      {annotatedLessons.length > 1 && onNavigateToLesson && (
+      {courseId && (
         <div className="border-t p-3">
           <div className="flex items-center justify-between mb-2">
             <p className="text-xs font-medium text-muted-foreground flex items-center gap-1.5">
               <MessageSquareText className="h-3 w-3" />
-              Aulas com anotações
+              {annotatedLessons.length > 1 && onNavigateToLesson ? "Aulas com anotações" : "Anotações do curso"}
             </p>
-            <TooltipProvider>
-              <Tooltip>
-                <TooltipTrigger asChild>
-                  <Button
-                    size="icon"
-                    variant="ghost"
-                    className="h-6 w-6 text-muted-foreground hover:text-foreground"
-                    onClick={handleExportCourse}
-                  >
-                    <Download className="h-3 w-3" />
-                  </Button>
-                </TooltipTrigger>
-                <TooltipContent>Exportar todas as anotações do curso</TooltipContent>
-              </Tooltip>
-            </TooltipProvider>
+            <div className="flex items-center gap-0.5">
+              <input
+                ref={importInputRef}
+                type="file"
+                accept=".json,application/json"
+                className="hidden"
+                onChange={(e) => handleImportFile(e.target.files?.[0])}
+              />
+              <TooltipProvider>
+                <Tooltip>
+                  <TooltipTrigger asChild>
+                    <Button
+                      size="icon"
+                      variant="ghost"
+                      className="h-6 w-6 text-muted-foreground hover:text-foreground"
+                      onClick={() => importInputRef.current?.click()}
+                      disabled={isImporting}
+                    >
+                      {isImporting ? <Loader2 className="h-3 w-3 animate-spin" /> : <Upload className="h-3 w-3" />}
+                    </Button>
+                  </TooltipTrigger>
+                  <TooltipContent>Importar anotações exportadas (.json)</TooltipContent>
+                </Tooltip>
+              </TooltipProvider>
+              {annotatedLessons.length > 0 && (
+                <div className="relative" ref={exportMenuRef}>
+                  <TooltipProvider>
+                    <Tooltip>
+                      <TooltipTrigger asChild>
+                        <Button
+                          size="icon"
+                          variant="ghost"
+                          className="h-6 w-6 text-muted-foreground hover:text-foreground"
+                          onClick={() => setExportMenuOpen((open) => !open)}
+                        >
+                          <Download className="h-3 w-3" />
+                        </Button>
+                      </TooltipTrigger>
+                      <TooltipContent>Exportar todas as anotações do curso</TooltipContent>
+                    </Tooltip>
+                  </TooltipProvider>
+                  {exportMenuOpen && (
+                    <div className="absolute right-0 bottom-full mb-1 z-50 min-w-[160px] bg-popover border rounded-md shadow-md py-1 animate-in fade-in-0 zoom-in-95">
+                      {COURSE_EXPORT_FORMATS.map(({ format, label }) => (
+                        <button
+                          key={format}
+                          onClick={() => handleExportCourse(format)}
+                          className="w-full flex items-center gap-2 px-3 py-2 text-xs hover:bg-accent transition-colors text-left"
+                        >
+                          {label}
+                        </button>
+                      ))}
+                    </div>
+                  )}
+                </div>
+              )}
+            </div>
           </div>
+          {annotatedLessons.length > 1 && onNavigateToLesson && (
           <div className="space-y-1 max-h-48 overflow-y-auto">
             {buildAnnotatedTree(annotatedLessons).map((group) => (
               <div key={group.title}>
@@ -454,6 +663,7 @@ export default memo(function NoteList({ lessonId, courseId, playerTimeRef, onSee
               </div>
             ))}
           </div>
+          )}
         </div>
       )}
     </div>
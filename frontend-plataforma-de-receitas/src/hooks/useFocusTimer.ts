@@ -16,7 +16,14 @@ import {
   DEFAULT_DAILY_HOURS,
   SUBJECT_COLORS,
 } from "@/components/focus/constants";
-import { getCycleConfig, saveCycleConfig, createFocusSession, getTimerState, saveTimerState, getFocusSessions } from "@/services/focusSessions";
+import { getCycleConfig, saveCycleConfig, getFocusSessions } from "@/services/focusSessions";
+import {
+  queueFocusSession,
+  enqueueFocusSession,
+  beaconFocusSessionQueue,
+  startFocusSessionQueueSync,
+} from "@/services/focusSessionQueue";
+import { loadTimerState, pushTimerState, beaconTimerState, subscribeTimerState } from "@/services/timerStateSync";
 
 /** Minimum elapsed time (ms) to count as a valid focus session */
 const MIN_SESSION_MS = 60_000;
@@ -701,10 +708,10 @@ const useFocusTimer = create<FocusStore>()(
               }
 
               // 2. Load timer+cycle state from backend (DEPOIS — usa config já atualizada)
-              const backendState = await getTimerState(apiUrl).catch(() => null);
+              const backendState = await loadTimerState(apiUrl).catch(() => null);
               if (!backendState) {
                 const current = useFocusTimer.getState();
-                saveTimerState(apiUrl, { timer: current.timer, cycle: current.cycle }).catch(() => {});
+                pushTimerState(apiUrl, { timer: current.timer, cycle: current.cycle }).catch(() => {});
               } else {
                 const bt = backendState.timer;
                 const bc = backendState.cycle;
@@ -780,6 +787,9 @@ const useFocusTimer = create<FocusStore>()(
                 }
               }
 
+              // 4. Receber alterações feitas em outras abas/dispositivos
+              startTimerStateSubscription(apiUrl);
+
               useFocusTimer.setState({ syncStatus: "synced" });
             } catch {
               // Backend inacessível — manter estado do localStorage
@@ -822,6 +832,19 @@ useFocusTimer.subscribe((state) => {
 // Auto-save timer+cycle state to backend with debounce (cross-browser persistence)
 let _saveTimerTimeout: ReturnType<typeof setTimeout> | null = null;
 let _lastTimerJson = "";
+let _unsubscribeTimerState: (() => void) | null = null;
+
+// Aplica um estado vindo do servidor sem reenviá-lo (evita eco entre abas)
+function applyRemoteTimerState(remote: { timer: TimerState; cycle: CycleState }) {
+  _lastTimerJson = JSON.stringify({ timer: remote.timer, cycle: remote.cycle });
+  if (_saveTimerTimeout) clearTimeout(_saveTimerTimeout);
+  useFocusTimer.setState({ timer: remote.timer, cycle: remote.cycle });
+}
+
+function startTimerStateSubscription(apiUrl: string) {
+  if (_unsubscribeTimerState || typeof EventSource === "undefined") return;
+  _unsubscribeTimerState = subscribeTimerState(apiUrl, applyRemoteTimerState);
+}
 
 useFocusTimer.subscribe((state) => {
   const json = JSON.stringify({ timer: state.timer, cycle: state.cycle });
@@ -831,8 +854,13 @@ useFocusTimer.subscribe((state) => {
   if (_saveTimerTimeout) clearTimeout(_saveTimerTimeout);
   _saveTimerTimeout = setTimeout(() => {
     useFocusTimer.setState({ syncStatus: "syncing" });
-    saveTimerState(getApiUrl(), { timer: state.timer, cycle: state.cycle })
-      .then(() => useFocusTimer.setState({ syncStatus: "synced" }))
+    // Envia apenas o delta desde a última versão confirmada pelo servidor
+    pushTimerState(getApiUrl(), { timer: state.timer, cycle: state.cycle })
+      .then(({ conflict }) => {
+        // Outra aba/dispositivo alterou antes: o estado do servidor prevalece
+        if (conflict && conflict.timer) applyRemoteTimerState(conflict);
+        useFocusTimer.setState({ syncStatus: "synced" });
+      })
       .catch(() => useFocusTimer.setState({ syncStatus: "error" }));
   }, 500);
 });
@@ -840,6 +868,8 @@ useFocusTimer.subscribe((state) => {
 // Salvamento de sessão de foco no nível da store.
 // Roda independente de qual componente React está montado,
 // garantindo que sessões sejam salvas mesmo quando o usuário navega para fora de /foco.
+startFocusSessionQueueSync(getApiUrl);
+
 let _sessionPrevPomodoroCount = useFocusTimer.getState().timer.pomodoroCount;
 let _sessionStartIso: string | null = null;
 let _sessionSubjectName: string | null = null;
@@ -873,7 +903,8 @@ useFocusTimer.subscribe((state) => {
       const durationSeconds = Math.min(realElapsedSeconds, Math.round(_sessionDurationMs / 1000));
       const dateStr = getTodayStr();
 
-      createFocusSession(getApiUrl(), {
+      // Vai para a fila local e é enviada em lote; se o backend estiver fora, reenvia depois
+      queueFocusSession(getApiUrl(), {
         subject_name: _sessionSubjectName,
         subject_id: _sessionSubjectId,
         started_at: _sessionStartIso,
@@ -883,7 +914,7 @@ useFocusTimer.subscribe((state) => {
         completed: true,
         date: dateStr,
       }).catch(() => {
-        // Falha silenciosa - o usuário verá dados faltando no heatmap
+        // Sessão continua na fila local até o próximo envio
       });
 
       _sessionStartIso = null;
@@ -919,8 +950,7 @@ if (typeof window !== "undefined") {
     const apiUrl = getApiUrl();
 
     // Salvar estado do timer via sendBeacon (funciona mesmo ao fechar a página)
-    const payload = JSON.stringify({ timer: finalTimer, cycle: state.cycle });
-    navigator.sendBeacon(`${apiUrl}/api/focus/timer-state`, new Blob([payload], { type: "application/json" }));
+    beaconTimerState(apiUrl, { timer: finalTimer, cycle: state.cycle });
 
     // Salvar sessão parcial se estava em foco e durou o suficiente
     if (
@@ -942,12 +972,12 @@ if (typeof window !== "undefined") {
           completed: false,
           date: getTodayStr(),
         };
-        navigator.sendBeacon(
-          `${apiUrl}/api/focus/sessions`,
-          new Blob([JSON.stringify(session)], { type: "application/json" })
-        );
+        enqueueFocusSession(session);
       }
     }
+
+    // Enviar a fila pendente (inclui a sessão parcial acima)
+    beaconFocusSessionQueue(apiUrl);
   });
 }
 
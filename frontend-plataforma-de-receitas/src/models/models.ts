@@ -20,16 +20,48 @@ export type Lesson = {
   title: string;
   video_url: string;
   time_elapsed?: number;
-  duration: string;
+  duration: number;
   pdf_url: string;
   subtitle_urls?: string[];
 };
 
+export type ContinueWatchingItem = Pick<
+  Lesson,
+  "id" | "title" | "module" | "hierarchy_path" | "video_url" | "pdf_url" | "time_elapsed" | "duration"
+> & {
+  progress_percentage: number;
+  last_accessed_at: string;
+  course: Pick<Course, "id" | "name" | "isCoverUrl" | "fileCover" | "urlCover">;
+};
+
 export type Module = Record<string, any>;
 
 export type Modules = { [k: string]: Lesson[] };
 
-export type NestedModules = { [section: string]: { [subgroup: string]: Lesson[] } };
+// Árvore de módulos de /api/courses/<id>/modules?lessons=1 (contagens incluem as subpastas)
+export type ModuleTreeNode = {
+  id: number;
+  name: string;
+  path: string;
+  depth: number;
+  lesson_count: number;
+  completed_count: number;
+  duration_seconds: number;
+  completion_percentage: number;
+  links: { id: number; label: string; url: string }[];
+  lessons: Lesson[];
+  children: ModuleTreeNode[];
+};
+
+export type ModuleTree = {
+  course_id: number;
+  lesson_count: number;
+  completed_count: number;
+  duration_seconds: number;
+  completion_percentage: number;
+  lessons: Lesson[];
+  modules: ModuleTreeNode[];
+};
 
 export type Hierarchy = {
   [key: string]: Hierarchy | Lesson[];
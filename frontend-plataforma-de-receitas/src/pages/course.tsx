@@ -3,14 +3,13 @@ import { CourseSidebar } from "@/components/lesson/course-sidebar";
 import useApiUrl from "@/hooks/useApiUrl";
 import useCourseCompletion from "@/hooks/useCourseCompletion";
 import useSelectedLesson from "@/hooks/useSelectedLesson";
-import { Lesson, NestedModules } from "@/models/models";
-import { getLessons } from "@/services/getLessons";
+import { ModuleTree } from "@/models/models";
+import { getModuleTree, flattenModuleTree, filterModuleTree, setLessonsCompleted } from "@/services/moduleTree";
 import { getModuleLinks, type ModuleLinks } from "@/services/moduleLinks";
 import api from "@/lib/api";
-import { sortLessons } from "@/utils/sort-lessons";
 import { setLastViewedLesson } from "@/utils/utils";
 import { useEffect, useMemo, useRef, useState, useCallback } from "react";
-import { useParams, Link } from "react-router-dom";
+import { useParams, useSearchParams, Link } from "react-router-dom";
 import { ChevronRight, Home } from "lucide-react";
 import { Group as PanelGroup, Panel, Separator as PanelResizeHandle, useDefaultLayout } from "react-resizable-panels";
 import LessonSkeleton from "@/components/lesson/lesson-skeleton";
@@ -20,7 +19,7 @@ import type { MediaPlayerInstance } from "@vidstack/react";
 const ACTIVE_TAB_KEY = "course-sidebar-tab";
 
 export default function CoursePage() {
-  const [lessons, setLessons] = useState<Lesson[]>([]);
+  const [moduleTree, setModuleTree] = useState<ModuleTree | null>(null);
   const [isLoading, setIsLoading] = useState(false);
   const playerTimeRef = useRef<number>(0);
   const playerInstanceRef = useRef<MediaPlayerInstance | null>(null);
@@ -49,6 +48,9 @@ export default function CoursePage() {
   });
 
   const { courseId } = useParams<{ courseId: string }>();
+  const [searchParams, setSearchParams] = useSearchParams();
+  // Link de anotação exportada: /cursos/:id?aula=<id da aula>&t=<segundos>
+  const [linkTarget, setLinkTarget] = useState<{ lessonId: number; time: number; selected: boolean } | null>(null);
   const { selectedLesson, clearSelection, selectLesson } = useSelectedLesson();
   const { apiUrl } = useApiUrl();
 
@@ -60,11 +62,8 @@ export default function CoursePage() {
         setIsLoading(true);
       }
 
-      const lessons: Lesson[] = await getLessons(apiUrl, Number(courseId));
-
-      sortLessons(lessons);
-
-      setLessons(lessons);
+      // Sidebar lido da árvore de módulos mantida pelo scan (aulas completas e contagens em cada nó)
+      setModuleTree(await getModuleTree(apiUrl, Number(courseId)));
     } catch {
       toast.error("Erro ao carregar aulas. Tente novamente.");
     } finally {
@@ -74,23 +73,8 @@ export default function CoursePage() {
     }
   }
 
-  const modules = useMemo<NestedModules>(() => {
-    const nested: NestedModules = {};
-    lessons.forEach((l) => {
-      const parts = l.module.split("/");
-      const section = parts[0] || "(Raiz)";
-      const subgroup = parts.length >= 2 ? parts.slice(1).join("/") : "(Geral)";
-
-      if (!nested[section]) {
-        nested[section] = {};
-      }
-      if (!nested[section][subgroup]) {
-        nested[section][subgroup] = [];
-      }
-      nested[section][subgroup].push(l);
-    });
-    return nested;
-  }, [lessons]);
+  // Lista plana em pré-ordem (mesma ordem do sidebar): próxima aula, links e popup de anotações
+  const lessons = useMemo(() => (moduleTree ? flattenModuleTree(moduleTree) : []), [moduleTree]);
 
   useEffect(() => {
     onFetch();
@@ -100,6 +84,41 @@ export default function CoursePage() {
     }
   }, [courseId, apiUrl]);
 
+  useEffect(() => {
+    const lessonId = Number(searchParams.get("aula"));
+    if (!lessonId) return;
+    setLinkTarget({ lessonId, time: Math.max(Number(searchParams.get("t")) || 0, 0), selected: false });
+    setSearchParams({}, { replace: true });
+  }, [searchParams]);
+
+  // Abrir a aula do link assim que as aulas do curso carregarem
+  useEffect(() => {
+    if (!linkTarget || linkTarget.selected || lessons.length === 0) return;
+    const lesson = lessons.find((l) => l.id === linkTarget.lessonId);
+    if (!lesson) {
+      toast.error("A aula deste link não existe mais neste curso.");
+      setLinkTarget(null);
+      return;
+    }
+    selectLesson(lesson);
+    setLinkTarget({ ...linkTarget, selected: true });
+  }, [linkTarget, lessons, selectLesson]);
+
+  // Ao trocar de aula, o instante do link deixa de valer
+  useEffect(() => {
+    if (linkTarget?.selected && selectedLesson?.id !== linkTarget.lessonId) {
+      setLinkTarget(null);
+    }
+  }, [selectedLesson?.id]);
+
+  const linkStartAt = linkTarget?.selected && selectedLesson?.id === linkTarget.lessonId ? linkTarget.time : null;
+
+  const handlePlayerReady = useCallback((player: MediaPlayerInstance) => {
+    playerInstanceRef.current = player;
+    // O player já abriu no instante do link; depois disso vale o progresso salvo
+    setLinkTarget((target) => (target?.selected ? null : target));
+  }, []);
+
   // Auto-scroll para aula ativa ao carregar
   useEffect(() => {
     if (!selectedLesson || !sidebarRef.current) return;
@@ -123,43 +142,22 @@ export default function CoursePage() {
     }
   }, [selectedLesson?.id, courseId, lessons]);
 
-  // Lista plana na ordem dos módulos (mesma ordem do sidebar)
-  const lessonsInModuleOrder = useMemo(() => {
-    const result: Lesson[] = [];
-    const sortedSections = Object.entries(modules).sort((a, b) =>
-      a[0].localeCompare(b[0], undefined, { numeric: true, sensitivity: "base" })
-    );
-    for (const [, subgroups] of sortedSections) {
-      const sortedSubs = Object.entries(subgroups).sort((a, b) =>
-        a[0].localeCompare(b[0], undefined, { numeric: true, sensitivity: "base" })
-      );
-      for (const [, subs] of sortedSubs) {
-        result.push(...subs);
-      }
-    }
-    return result;
-  }, [modules]);
-
   const nextLesson = useMemo(() => {
     if (!selectedLesson) return null;
-    const idx = lessonsInModuleOrder.findIndex((l) => l.id === selectedLesson.id);
+    const idx = lessons.findIndex((l) => l.id === selectedLesson.id);
     if (idx < 0) return null;
     // Pular documentos (PDF, HTML, TXT) e encontrar o próximo vídeo
-    for (let i = idx + 1; i < lessonsInModuleOrder.length; i++) {
-      const url = (lessonsInModuleOrder[i].pdf_url || lessonsInModuleOrder[i].video_url || "").toLowerCase();
+    for (let i = idx + 1; i < lessons.length; i++) {
+      const url = (lessons[i].pdf_url || lessons[i].video_url || "").toLowerCase();
       if (!url.endsWith(".pdf") && !url.endsWith(".html") && !url.endsWith(".txt")) {
-        return lessonsInModuleOrder[i];
+        return lessons[i];
       }
     }
     return null;
-  }, [selectedLesson, lessonsInModuleOrder]);
+  }, [selectedLesson, lessons]);
 
   const handleBatchToggle = useCallback((lessonIds: number[], isCompleted: boolean) => {
-    setLessons((prev) =>
-      prev.map((l) =>
-        lessonIds.includes(l.id) ? { ...l, isCompleted: isCompleted ? 1 : 0 } : l
-      )
-    );
+    setModuleTree((prev) => prev && setLessonsCompleted(prev, lessonIds, isCompleted));
     fetchCompletion(apiUrl, Number(courseId));
     api.post(`${apiUrl}/api/batch-update-lessons`, { lessonIds, isCompleted }).catch(() => {
       onFetch(true);
@@ -321,21 +319,10 @@ export default function CoursePage() {
     return () => window.removeEventListener("keydown", handleKeyDown);
   }, [handleTabChange]);
 
-  const filteredModules = useMemo(() => {
-    if (!lessonSearch.trim()) return modules;
-    const term = lessonSearch.toLowerCase();
-    const result: NestedModules = {};
-    for (const [section, subgroups] of Object.entries(modules)) {
-      for (const [sub, lessons] of Object.entries(subgroups)) {
-        const matched = lessons.filter((l) => l.title.toLowerCase().includes(term));
-        if (matched.length > 0) {
-          if (!result[section]) result[section] = {};
-          result[section][sub] = matched;
-        }
-      }
-    }
-    return result;
-  }, [modules, lessonSearch]);
+  const filteredTree = useMemo(() => {
+    if (!moduleTree || !lessonSearch.trim()) return moduleTree;
+    return filterModuleTree(moduleTree, lessonSearch.toLowerCase());
+  }, [moduleTree, lessonSearch]);
 
   // Aulas da mesma subpasta (siblings) para navegação rápida acima do player
   const siblingLessons = useMemo(() => {
@@ -407,7 +394,8 @@ export default function CoursePage() {
                 lesson={selectedLesson}
                 nextLesson={nextLesson}
                 playerTimeRef={playerTimeRef}
-                onPlayerReady={(p) => { playerInstanceRef.current = p; }}
+                onPlayerReady={handlePlayerReady}
+                startAt={linkStartAt}
                 siblingLessons={siblingLessons}
                 allLessons={lessons}
                 onSelectLesson={selectLesson}
@@ -434,7 +422,7 @@ export default function CoursePage() {
               onTabChange={handleTabChange}
               lessonSearch={lessonSearch}
               onLessonSearchChange={setLessonSearch}
-              filteredModules={filteredModules}
+              moduleTree={filteredTree}
               onUpdate={handleSidebarUpdate}
               onBatchToggle={handleBatchToggle}
               moduleLinks={moduleLinks}
@@ -456,7 +444,8 @@ export default function CoursePage() {
               lesson={selectedLesson}
               nextLesson={nextLesson}
               playerTimeRef={playerTimeRef}
-              onPlayerReady={(p) => { playerInstanceRef.current = p; }}
+              onPlayerReady={handlePlayerReady}
+              startAt={linkStartAt}
               siblingLessons={siblingLessons}
               allLessons={lessons}
               onSelectLesson={selectLesson}
@@ -476,7 +465,7 @@ export default function CoursePage() {
             onTabChange={handleTabChange}
             lessonSearch={lessonSearch}
             onLessonSearchChange={setLessonSearch}
-            filteredModules={filteredModules}
+            moduleTree={filteredTree}
             onUpdate={handleSidebarUpdate}
             onBatchToggle={handleBatchToggle}
             moduleLinks={moduleLinks}
@@ -8,8 +8,9 @@ import {
   SelectTrigger,
   SelectValue,
 } from "@/components/ui/select";
-import { Course } from "@/models/models";
+import { ContinueWatchingItem, Course } from "@/models/models";
 import { getAllCourses } from "@/services/getAllCourses";
+import { getContinueWatching } from "@/services/continueWatching";
 import useApiUrl from "@/hooks/useApiUrl";
 import useScanProgress from "@/hooks/useScanProgress";
 import { useEffect, useMemo, useState } from "react";
@@ -28,6 +29,7 @@ export default function HomeScreen() {
   const [searchTerm, setSearchTerm] = useState("");
   const [sortMode, setSortMode] = useState<"name-asc" | "name-desc" | "recent" | "oldest">("name-asc");
   const [showFavorites, setShowFavorites] = useState(false);
+  const [continueItem, setContinueItem] = useState<ContinueWatchingItem | null>(null);
   const { apiUrl } = useApiUrl();
   const navigate = useNavigate();
   const { activeScans, startScan, setOnScanComplete } = useScanProgress();
@@ -47,6 +49,9 @@ export default function HomeScreen() {
 
   useEffect(() => {
     loadCourses();
+    getContinueWatching(apiUrl)
+      .then((items) => setContinueItem(items[0] ?? null))
+      .catch(() => setContinueItem(null));
   }, [apiUrl]);
 
   useEffect(() => {
@@ -80,8 +85,9 @@ export default function HomeScreen() {
     }
   };
 
-  // Encontra a última aula assistida globalmente (a mais recente entre todos os cursos)
+  // Última aula em andamento segundo o servidor; sem registro, a mais recente do localStorage
   const lastWatched = useMemo(() => {
+    if (continueItem) return { course: continueItem.course, lesson: continueItem };
     if (!courses) return null;
     let best: { course: typeof courses[0]; lesson: Lesson; viewedAt: number } | null = null;
     for (const course of courses) {
@@ -91,7 +97,7 @@ export default function HomeScreen() {
       }
     }
     return best ? { course: best.course, lesson: best.lesson } : null;
-  }, [courses]);
+  }, [courses, continueItem]);
 
   const filteredCourses = useMemo(() => {
     if (!courses) return null;
@@ -273,9 +279,9 @@ export default function HomeScreen() {
                       {ext}
                     </code>
                   )}
-                  {lesson.duration && lesson.duration !== "0" && (
+                  {lesson.duration > 0 && (
                     <span className="text-[10px] text-muted-foreground tabular-nums">
-                      {formatDuration(Number(lesson.duration))}
+                      {formatDuration(lesson.duration)}
                     </span>
                   )}
                 </div>
@@ -0,0 +1,7 @@
+import api from "@/lib/api";
+import type { ContinueWatchingItem } from "@/models/models";
+
+export async function getContinueWatching(apiUrl: string, limit: number = 1) {
+  const res = await api.get<ContinueWatchingItem[]>(`${apiUrl}/api/continue`, { params: { limit } });
+  return res.data;
+}
@@ -0,0 +1,140 @@
+import api from "@/lib/api";
+import { toast } from "sonner";
+import type { FocusSession } from "@/models/models";
+
+// Fila local de sessões de foco: cada sessão ganha uma client_key e fica no localStorage
+// até o backend confirmar. O envio é em lotes de até BATCH_MAX_SESSIONS (limite do backend) e o
+// backend ignora chaves repetidas, então reenviar após uma falha nunca duplica sessões.
+
+export type QueuedFocusSession = Omit<FocusSession, "id"> & { client_key: string };
+
+type BatchResult = {
+  created: (FocusSession & { client_key: string })[];
+  duplicates: string[];
+  errors: { index: number; client_key: string | null; error: string }[];
+};
+
+const STORAGE_KEY = "focus-session-queue";
+// Sessões recusadas pelo backend (payload inválido): saem da fila, mas ficam guardadas aqui
+const REJECTED_STORAGE_KEY = "focus-session-rejected";
+const RETRY_INTERVAL_MS = 60_000;
+// Mesmo limite de BATCH_MAX_SESSIONS em routes/focus.py
+const BATCH_MAX_SESSIONS = 1000;
+// sendBeacon aceita ~64 KB por chamada
+const BEACON_MAX_SESSIONS = 200;
+
+let _flushing: Promise<void> | null = null;
+let _retryTimer: ReturnType<typeof setInterval> | null = null;
+
+function newClientKey() {
+  if (typeof crypto !== "undefined" && "randomUUID" in crypto) return crypto.randomUUID();
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+}
+
+function readQueue(): QueuedFocusSession[] {
+  try {
+    const raw = localStorage.getItem(STORAGE_KEY);
+    return raw ? (JSON.parse(raw) as QueuedFocusSession[]) : [];
+  } catch {
+    return [];
+  }
+}
+
+function writeQueue(queue: QueuedFocusSession[]) {
+  localStorage.setItem(STORAGE_KEY, JSON.stringify(queue));
+}
+
+export function pendingFocusSessions() {
+  return readQueue();
+}
+
+// Guarda a sessão na fila (sobrevive a recarregar a página) e retorna a entrada criada
+export function enqueueFocusSession(session: Omit<FocusSession, "id">): QueuedFocusSession {
+  const entry = { ...session, client_key: newClientKey() };
+  writeQueue([...readQueue(), entry]);
+  return entry;
+}
+
+function keepRejected(rejected: (QueuedFocusSession & { error: string })[]) {
+  try {
+    const raw = localStorage.getItem(REJECTED_STORAGE_KEY);
+    const previous = raw ? (JSON.parse(raw) as unknown[]) : [];
+    localStorage.setItem(REJECTED_STORAGE_KEY, JSON.stringify([...previous, ...rejected]));
+  } catch {}
+  const first = rejected[0];
+  toast.error(
+    rejected.length === 1
+      ? "Uma sessão de foco não foi salva."
+      : `${rejected.length} sessões de foco não foram salvas.`,
+    { description: `${first.subject_name} (${first.date}): ${first.error}` }
+  );
+}
+
+async function sendChunk(apiUrl: string, chunk: QueuedFocusSession[]) {
+  const res = await api.post(`${apiUrl}/api/focus/sessions/batch`, { sessions: chunk });
+  const result = res.data as BatchResult;
+  const errors = new Map(
+    result.errors.filter((e) => !!e.client_key).map((e) => [e.client_key as string, e.error])
+  );
+  const done = new Set<string>([
+    ...result.created.map((s) => s.client_key),
+    ...result.duplicates,
+    ...errors.keys(),
+  ]);
+  // Entradas adicionadas durante o envio continuam na fila
+  writeQueue(readQueue().filter((s) => !done.has(s.client_key)));
+  const rejected = chunk
+    .filter((s) => errors.has(s.client_key))
+    .map((s) => ({ ...s, error: errors.get(s.client_key) as string }));
+  if (rejected.length > 0) keepRejected(rejected);
+}
+
+// Envia a fila em lotes de até BATCH_MAX_SESSIONS, um de cada vez. Sessões criadas ou duplicadas
+// saem da fila; as recusadas pelo backend também, avisando o usuário. Em falha de rede o envio
+// para e o restante da fila fica intacto.
+export function flushFocusSessionQueue(apiUrl: string): Promise<void> {
+  if (_flushing) return _flushing;
+  const queue = readQueue();
+  if (queue.length === 0) return Promise.resolve();
+
+  _flushing = (async () => {
+    for (let i = 0; i < queue.length; i += BATCH_MAX_SESSIONS) {
+      await sendChunk(apiUrl, queue.slice(i, i + BATCH_MAX_SESSIONS));
+    }
+  })().finally(() => {
+    _flushing = null;
+  });
+  return _flushing;
+}
+
+export async function queueFocusSession(apiUrl: string, session: Omit<FocusSession, "id">) {
+  enqueueFocusSession(session);
+  await flushFocusSessionQueue(apiUrl);
+}
+
+// Ao fechar a página: envia a fila via sendBeacon. Se o beacon não chegar, a fila
+// continua no localStorage e vai no próximo envio (a client_key evita duplicar).
+export function beaconFocusSessionQueue(apiUrl: string) {
+  const queue = readQueue();
+  for (let i = 0; i < queue.length; i += BEACON_MAX_SESSIONS) {
+    const sent = navigator.sendBeacon(
+      `${apiUrl}/api/focus/sessions/batch`,
+      new Blob([JSON.stringify({ sessions: queue.slice(i, i + BEACON_MAX_SESSIONS) })], {
+        type: "application/json",
+      })
+    );
+    // Cota do navegador esgotada: o restante vai no próximo envio
+    if (!sent) break;
+  }
+}
+
+// Reenvia a fila quando a conexão volta e periodicamente enquanto houver pendências
+export function startFocusSessionQueueSync(getApiUrl: () => string) {
+  if (typeof window === "undefined" || _retryTimer) return;
+  const flush = () => {
+    if (readQueue().length > 0) flushFocusSessionQueue(getApiUrl()).catch(() => {});
+  };
+  window.addEventListener("online", flush);
+  _retryTimer = setInterval(flush, RETRY_INTERVAL_MS);
+  flush();
+}
@@ -1,5 +1,5 @@
 import api from "@/lib/api";
-import type { FocusSession, CycleConfig, TimerState, CycleState } from "@/models/models";
+import type { FocusSession, CycleConfig } from "@/models/models";
 
 export async function getFocusSessions(apiUrl: string, date?: string) {
   const params = date ? { date } : {};
@@ -7,9 +7,24 @@ export async function getFocusSessions(apiUrl: string, date?: string) {
   return res.data as FocusSession[];
 }
 
-export async function createFocusSession(apiUrl: string, session: Omit<FocusSession, "id">) {
-  const res = await api.post(`${apiUrl}/api/focus/sessions`, session);
-  return res.data as FocusSession;
+export type FocusSessionFilters = {
+  from?: string;
+  to?: string;
+  subject_id?: string;
+  mode?: string;
+  limit?: number;
+  cursor?: string | null;
+};
+
+export async function getFocusSessionsPage(apiUrl: string, filters: FocusSessionFilters) {
+  const params: Record<string, string | number> = { limit: filters.limit ?? 50 };
+  if (filters.from) params.from = filters.from;
+  if (filters.to) params.to = filters.to;
+  if (filters.subject_id) params.subject_id = filters.subject_id;
+  if (filters.mode) params.mode = filters.mode;
+  if (filters.cursor) params.cursor = filters.cursor;
+  const res = await api.get(`${apiUrl}/api/focus/sessions`, { params });
+  return res.data as { data: FocusSession[]; next_cursor: string | null };
 }
 
 export async function deleteFocusSession(apiUrl: string, id: number) {
@@ -42,13 +57,3 @@ export async function getCycleConfig(apiUrl: string): Promise<CycleConfig | null
 export async function saveCycleConfig(apiUrl: string, config: CycleConfig) {
   await api.put(`${apiUrl}/api/focus/cycle-config`, config);
 }
-
-export async function getTimerState(apiUrl: string): Promise<{ timer: TimerState; cycle: CycleState } | null> {
-  const res = await api.get(`${apiUrl}/api/focus/timer-state`);
-  if (!res.data || !res.data.timer) return null;
-  return res.data as { timer: TimerState; cycle: CycleState };
-}
-
-export async function saveTimerState(apiUrl: string, state: { timer: TimerState; cycle: CycleState }) {
-  await api.put(`${apiUrl}/api/focus/timer-state`, state);
-}
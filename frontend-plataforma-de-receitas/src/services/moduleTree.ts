@@ -0,0 +1,89 @@
+import api from "@/lib/api";
+import type { Lesson, ModuleTree, ModuleTreeNode } from "@/models/models";
+
+export async function getModuleTree(apiUrl: string, courseId: number, withLessons: boolean = true) {
+  const res = await api.get<ModuleTree>(`${apiUrl}/api/courses/${courseId}/modules`, {
+    params: withLessons ? { lessons: 1 } : undefined,
+  });
+  return res.data;
+}
+
+// Aulas da árvore em pré-ordem (aulas soltas do curso, depois cada módulo e suas subpastas)
+export function flattenModuleTree(tree: ModuleTree): Lesson[] {
+  const result: Lesson[] = [...tree.lessons];
+  const visit = (node: ModuleTreeNode) => {
+    result.push(...node.lessons);
+    node.children.forEach(visit);
+  };
+  tree.modules.forEach(visit);
+  return result;
+}
+
+// Aulas de um nó e de todas as suas subpastas
+export function collectModuleLessons(node: ModuleTreeNode): Lesson[] {
+  return [...node.lessons, ...node.children.flatMap(collectModuleLessons)];
+}
+
+// Caminho de nós (do módulo de topo até a subpasta) que contém a aula
+export function findModulePath(nodes: ModuleTreeNode[], lessonId: number): ModuleTreeNode[] {
+  for (const node of nodes) {
+    if (node.lessons.some((l) => l.id === lessonId)) return [node];
+    const path = findModulePath(node.children, lessonId);
+    if (path.length > 0) return [node, ...path];
+  }
+  return [];
+}
+
+// Busca por título: mantém só os nós com aulas que casam (as contagens continuam as do nó inteiro)
+export function filterModuleTree(tree: ModuleTree, term: string): ModuleTree {
+  const matches = (l: Lesson) => l.title.toLowerCase().includes(term);
+  const visit = (nodes: ModuleTreeNode[]): ModuleTreeNode[] =>
+    nodes.flatMap((node) => {
+      const lessons = node.lessons.filter(matches);
+      const children = visit(node.children);
+      return lessons.length > 0 || children.length > 0 ? [{ ...node, lessons, children }] : [];
+    });
+  return { ...tree, lessons: tree.lessons.filter(matches), modules: visit(tree.modules) };
+}
+
+// Atualização otimista: marca as aulas e ajusta as contagens dos nós pela diferença,
+// até a próxima leitura da árvore trazer os valores do servidor
+export function setLessonsCompleted(tree: ModuleTree, lessonIds: number[], isCompleted: boolean): ModuleTree {
+  const ids = new Set(lessonIds);
+  const value = isCompleted ? 1 : 0;
+  const update = (lessons: Lesson[]) => {
+    let changed = 0;
+    const next = lessons.map((l) => {
+      if (!ids.has(l.id) || Boolean(l.isCompleted) === isCompleted) return l;
+      changed++;
+      return { ...l, isCompleted: value };
+    });
+    return { next, changed };
+  };
+  const withCount = <T extends { lesson_count: number; completed_count: number }>(item: T, changed: number): T => {
+    const completed = item.completed_count + (isCompleted ? changed : -changed);
+    return {
+      ...item,
+      completed_count: completed,
+      completion_percentage: item.lesson_count ? (completed / item.lesson_count) * 100 : 0,
+    };
+  };
+  const visit = (node: ModuleTreeNode): { node: ModuleTreeNode; changed: number } => {
+    const own = update(node.lessons);
+    let changed = own.changed;
+    const children = node.children.map((child) => {
+      const result = visit(child);
+      changed += result.changed;
+      return result.node;
+    });
+    return { node: withCount({ ...node, lessons: own.next, children }, changed), changed };
+  };
+  const root = update(tree.lessons);
+  let changed = root.changed;
+  const modules = tree.modules.map((node) => {
+    const result = visit(node);
+    changed += result.changed;
+    return result.node;
+  });
+  return withCount({ ...tree, lessons: root.next, modules }, changed);
+}
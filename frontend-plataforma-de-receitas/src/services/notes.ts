@@ -39,21 +39,6 @@ export async function exportLessonNotesPdf(apiUrl: string, lessonId: number): Pr
   URL.revokeObjectURL(url);
 }
 
-export async function exportCourseNotesPdf(apiUrl: string, courseId: string): Promise<void> {
-  const res = await api.get(`${apiUrl}/api/courses/${courseId}/notes/export-pdf`, {
-    responseType: 'blob',
-  });
-  const contentDisposition = res.headers['content-disposition'];
-  const match = contentDisposition?.match(/filename="?(.+?)"?$/);
-  const filename = match?.[1] || `notas-curso-${courseId}.pdf`;
-  const url = URL.createObjectURL(res.data);
-  const a = document.createElement('a');
-  a.href = url;
-  a.download = filename;
-  a.click();
-  URL.revokeObjectURL(url);
-}
-
 export type DailyNoteEntry = {
   id: number;
   lesson_id: number;
@@ -106,3 +91,65 @@ export async function exportDailyNotesPdf(apiUrl: string, date: string): Promise
   a.click();
   URL.revokeObjectURL(url);
 }
+
+export type NotesExportFormat = "pdf" | "md" | "html" | "anki";
+
+const EXPORT_EXTENSIONS: Record<NotesExportFormat, string> = {
+  pdf: "pdf",
+  md: "md",
+  html: "html",
+  anki: "apkg",
+};
+
+export async function exportCourseNotes(
+  apiUrl: string,
+  courseId: string,
+  format: NotesExportFormat
+): Promise<void> {
+  const res = await api.get(`${apiUrl}/api/courses/${courseId}/notes/export/${format}`, {
+    responseType: 'blob',
+  });
+  const contentDisposition = res.headers['content-disposition'];
+  const match = contentDisposition?.match(/filename="?(.+?)"?$/);
+  const filename = match?.[1] || `notas-curso-${courseId}.${EXPORT_EXTENSIONS[format]}`;
+  const url = URL.createObjectURL(res.data);
+  const a = document.createElement('a');
+  a.href = url;
+  a.download = filename;
+  a.click();
+  URL.revokeObjectURL(url);
+}
+
+export type NoteBulkOperation =
+  | { op: "create"; lesson_id: number; timestamp: number; content: string }
+  | { op: "update"; id: number; content: string }
+  | { op: "delete"; id: number };
+
+export type NoteBulkResult = {
+  index: number;
+  op?: string;
+  status: "ok" | "skipped" | "error";
+  id?: number;
+  lesson_id?: number;
+  error?: string;
+};
+
+export async function bulkNoteOperations(apiUrl: string, operations: NoteBulkOperation[]) {
+  const res = await api.post(`${apiUrl}/api/notes/bulk`, { operations });
+  return res.data as { applied: number; failed: number; results: NoteBulkResult[] };
+}
+
+export async function importExportedNotes(apiUrl: string, file: File, courseId?: number) {
+  const formData = new FormData();
+  formData.append("file", file);
+  const res = await api.post(`${apiUrl}/api/notes/import`, formData, {
+    params: courseId ? { course_id: courseId } : {},
+  });
+  return res.data as {
+    course_id: number;
+    imported: number;
+    skipped: number;
+    failed: number;
+    results: NoteBulkResult[];
+  };
+}
@@ -8,5 +8,5 @@ export async function getHeatmapData(apiUrl: string, year: number) {
 
 export async function getStudyStreak(apiUrl: string) {
   const res = await api.get(`${apiUrl}/api/study-days/streak`);
-  return res.data as { streak: number };
+  return res.data as { streak: number; longest: number; longest_start?: string; longest_end?: string };
 }
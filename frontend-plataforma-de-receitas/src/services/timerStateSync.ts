@@ -0,0 +1,127 @@
+import api from "@/lib/api";
+import type { TimerState, CycleState } from "@/models/models";
+
+// Sincronização do estado do timer por deltas versionados.
+// O backend guarda uma versão que cresce a cada alteração; enviamos apenas o JSON Patch
+// entre o último estado confirmado e o atual, junto com a versão esperada.
+
+export type SyncedTimerState = { timer: TimerState; cycle: CycleState };
+
+type JsonValue = unknown;
+type PatchOp = { op: "add" | "remove" | "replace"; path: string; value?: JsonValue };
+
+export const clientId = Math.random().toString(36).slice(2) + Date.now().toString(36);
+
+let serverVersion = 0;
+let serverState: JsonValue = {};
+
+function escapePointer(key: string) {
+  return key.replace(/~/g, "~0").replace(/\//g, "~1");
+}
+
+function isPlainObject(value: JsonValue): value is Record<string, JsonValue> {
+  return typeof value === "object" && value !== null && !Array.isArray(value);
+}
+
+// Diff simples: recursivo em objetos, arrays e valores primitivos são substituídos inteiros
+export function diffJson(before: JsonValue, after: JsonValue, path = ""): PatchOp[] {
+  if (isPlainObject(before) && isPlainObject(after)) {
+    const ops: PatchOp[] = [];
+    for (const key of Object.keys(before)) {
+      if (!(key in after)) ops.push({ op: "remove", path: `${path}/${escapePointer(key)}` });
+    }
+    for (const key of Object.keys(after)) {
+      const childPath = `${path}/${escapePointer(key)}`;
+      if (!(key in before)) {
+        if (after[key] !== undefined) ops.push({ op: "add", path: childPath, value: after[key] });
+      } else {
+        ops.push(...diffJson(before[key], after[key], childPath));
+      }
+    }
+    return ops;
+  }
+  if (JSON.stringify(before) === JSON.stringify(after)) return [];
+  return [{ op: "replace", path, value: after }];
+}
+
+export function getTimerStateVersion() {
+  return serverVersion;
+}
+
+export async function loadTimerState(apiUrl: string): Promise<SyncedTimerState | null> {
+  const res = await api.get(`${apiUrl}/api/focus/timer-state`, { params: { with_version: 1 } });
+  serverVersion = res.data.version ?? 0;
+  serverState = res.data.state ?? {};
+  const state = res.data.state;
+  if (!state || !state.timer) return null;
+  return state as SyncedTimerState;
+}
+
+// Envia o delta; em conflito (outra aba/dispositivo escreveu antes) devolve o estado do servidor
+export async function pushTimerState(
+  apiUrl: string,
+  state: SyncedTimerState
+): Promise<{ conflict: SyncedTimerState | null }> {
+  const snapshot = JSON.parse(JSON.stringify(state));
+  const patch = diffJson(serverState, snapshot);
+  if (patch.length === 0) return { conflict: null };
+
+  try {
+    const res = await api.patch(`${apiUrl}/api/focus/timer-state`, {
+      expected_version: serverVersion,
+      patch,
+      client_id: clientId,
+    });
+    serverVersion = res.data.version;
+    serverState = snapshot;
+    return { conflict: null };
+  } catch (error: unknown) {
+    const response = (error as { response?: { status: number; data: { version: number; state: JsonValue } } })
+      .response;
+    if (response?.status === 409) {
+      serverVersion = response.data.version;
+      serverState = response.data.state ?? {};
+      return { conflict: serverState as SyncedTimerState };
+    }
+    throw error;
+  }
+}
+
+// Estado enviado via sendBeacon ao fechar a página; rejeitado se outra aba já alterou
+export function beaconTimerState(apiUrl: string, state: SyncedTimerState) {
+  const url = `${apiUrl}/api/focus/timer-state?expected_version=${serverVersion}&client_id=${clientId}`;
+  navigator.sendBeacon(url, new Blob([JSON.stringify(state)], { type: "application/json" }));
+}
+
+// Recebe alterações feitas por outros clientes (Server-Sent Events)
+export function subscribeTimerState(
+  apiUrl: string,
+  onRemoteChange: (state: SyncedTimerState) => void
+): () => void {
+  const source = new EventSource(`${apiUrl}/api/focus/timer-state/events?since=${serverVersion}`);
+
+  source.onmessage = async (event) => {
+    const data = JSON.parse(event.data) as {
+      version: number;
+      patches?: { version: number; client_id: string | null }[];
+      state?: SyncedTimerState;
+    };
+    if (data.version <= serverVersion) return;
+
+    const ownChanges = data.patches && data.patches.every((p) => p.client_id === clientId);
+    if (ownChanges) {
+      serverVersion = data.version;
+      return;
+    }
+    if (data.state) {
+      serverVersion = data.version;
+      serverState = data.state;
+      if (data.state.timer) onRemoteChange(data.state);
+      return;
+    }
+    const remote = await loadTimerState(apiUrl).catch(() => null);
+    if (remote) onRemoteChange(remote);
+  };
+
+  return () => source.close();
+}
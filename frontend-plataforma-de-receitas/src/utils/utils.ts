@@ -38,17 +38,6 @@ export function flattenHierarchy(hierarchy: Hierarchy): Lesson[] {
   return lessons;
 }
 
-export function calculateCompletionPercentage(lessons: Lesson[]): number {
-  const totalLessons = lessons.length;
-  if (totalLessons === 0) return 0;
-  const completedLessons = lessons.filter(
-    (lesson) => lesson.isCompleted === 1
-  ).length;
-  const percentage = (completedLessons / totalLessons) * 100;
-
-  return percentage;
-}
-
 export function calculateCourseProgress(lessons: Lesson[]) {
   if (lessons.length === 0) return 0;
   const completed = lessons.filter((l) => l.isCompleted);